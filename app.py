@@ -3,13 +3,16 @@ Flask Web Application for Multilingual Text-to-Speech Translation
 This provides a web interface for the TTS translation functionality.
 """
 
-from flask import Flask, render_template, request, jsonify, send_file, send_from_directory
+from flask import Flask, Response, g, render_template, request, jsonify, send_file, send_from_directory, stream_with_context
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 import os
 import sys
 from datetime import datetime
 import hashlib
-import base64
+import json
+import functools
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 
 # Add project root to path
@@ -23,11 +26,24 @@ load_dotenv(env_path)
 from services.translation_service import TranslationService
 from services.speech_service import SpeechService
 from services.pitch_service import apply_pitch
+from services.sentence_cache import SentencePipeline, join_audio, join_sentences, split_sentences
+from services.single_flight import SingleFlight
+from services.speculation import SpeculativePrefetcher
+from services.rate_limiter import AdmissionTimeout, RateLimitedError
+from services.language_config import LANGUAGE_CONFIG, LANGUAGE_CODE_TO_NAME
+from services.prompt_bundle import PromptBundle
+from services.voice_catalog import VoiceCatalog
+from services.text_normalizer import canonicalize, normalize_for_speech
+from services.audio_buffer import AudioBuffer
+from services.audio_postprocess import PostProcessSettings, postprocess_applies, postprocess_audio
+from services.audio_encoding import AUDIO_MIME_TYPES, DEFAULT_FORMAT, audio_duration, mimetype_for, normalize_format
+from services import auth, cpu_pool, scheduler, timings, tracing
+from services.usage import QuotaExceeded, get_meter
 from services.azure_tts_service import (
-    AZURE_VOICES,
     get_available_genders,
     get_voice_for_gender,
-    synthesize_speech,
+    stream_speech,
+    synthesize_speech_timed,
 )
 
 # Check if React build exists
@@ -38,7 +54,13 @@ if not os.path.exists(build_path):
     print("   For now, Flask will serve API endpoints only.")
 
 app = Flask(__name__, static_folder=build_path if os.path.exists(build_path) else None, static_url_path='')
-CORS(app)  # Enable CORS for frontend-backend communication
+# X-Forwarded-For is only honoured behind a known number of reverse proxies
+# (TRUSTED_PROXY_HOPS); otherwise any client could pick its own identity.
+_trusted_proxy_hops = int(os.getenv('TRUSTED_PROXY_HOPS', '0'))
+if _trusted_proxy_hops > 0:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=_trusted_proxy_hops, x_proto=_trusted_proxy_hops)
+# Enable CORS for frontend-backend communication; expose the headers clients read
+CORS(app, expose_headers=['X-Audio-Filename', 'X-Source-Lang', 'Retry-After'])
 
 # Ensure directories exist
 os.makedirs('static', exist_ok=True)
@@ -47,25 +69,37 @@ os.makedirs('output', exist_ok=True)
 # Initialize services
 translation_service = TranslationService()
 speech_service = SpeechService(output_dir='output')
+sentence_pipeline = SentencePipeline(translation_service)
+# Identical concurrent requests share one synthesis. Set SINGLE_FLIGHT_LOCK_DIR
+# to also coalesce across gunicorn workers on the same host.
+single_flight = SingleFlight(lock_dir=os.getenv('SINGLE_FLIGHT_LOCK_DIR') or None)
+# Opt-in (PREFETCH=1) background warm-up of likely follow-up variants. It fills
+# the same caches but coalesces on its own SingleFlight, so a skipped or failed
+# speculative call is never handed to a live request waiting on the same key.
+prefetcher = SpeculativePrefetcher()
+speculative_pipeline = SentencePipeline(
+    translation_service,
+    audio_cache=sentence_pipeline.audio_cache,
+    translation_cache=sentence_pipeline.translation_cache,
+    single_flight=SingleFlight(),
+)
+# Per-user daily usage, counted in memory and flushed to SQLite (USAGE_DB)
+usage_meter = get_meter()
 
-# Language configuration aligned with Azure Neural voices
-LANGUAGE_CONFIG = {
-    'as': {'name': 'Assamese', 'voices': AZURE_VOICES['Assamese']},
-    'bn': {'name': 'Bengali', 'voices': AZURE_VOICES['Bengali']},
-    'en': {'name': 'English (India)', 'voices': AZURE_VOICES['English (India)']},
-    'gu': {'name': 'Gujarati', 'voices': AZURE_VOICES['Gujarati']},
-    'hi': {'name': 'Hindi', 'voices': AZURE_VOICES['Hindi']},
-    'kn': {'name': 'Kannada', 'voices': AZURE_VOICES['Kannada']},
-    'ml': {'name': 'Malayalam', 'voices': AZURE_VOICES['Malayalam']},
-    'mr': {'name': 'Marathi', 'voices': AZURE_VOICES['Marathi']},
-    'or': {'name': 'Odia', 'voices': AZURE_VOICES['Odia']},
-    'pa': {'name': 'Punjabi', 'voices': AZURE_VOICES['Punjabi']},
-    'ta': {'name': 'Tamil', 'voices': AZURE_VOICES['Tamil']},
-    'te': {'name': 'Telugu', 'voices': AZURE_VOICES['Telugu']},
-    'ur': {'name': 'Urdu', 'voices': AZURE_VOICES['Urdu']},
-}
+# Voice catalog and its JSON responses are built once at startup
+voice_catalog = VoiceCatalog(
+    LANGUAGE_CONFIG,
+    openai_voices=SpeechService.get_available_voices(),
+    piper_voice_dir=os.path.join(project_root, 'voices'),
+)
 
-LANGUAGE_CODE_TO_NAME = {code: config['name'] for code, config in LANGUAGE_CONFIG.items()}
+# Pre-rendered prompts compiled by compile_prompt_catalog.py (optional)
+prompt_bundle = None
+if os.getenv('PROMPT_BUNDLE'):
+    try:
+        prompt_bundle = PromptBundle(os.getenv('PROMPT_BUNDLE'))
+    except Exception as exc:
+        print(f"⚠️ WARNING: Could not load prompt bundle: {exc}")
 
 
 def _slugify(value: str) -> str:
@@ -81,7 +115,328 @@ def _slugify(value: str) -> str:
     return slug or 'default'
 
 
+def _azure_prosody(pitch_change: int, rate_change: int):
+    """Clamp UI pitch (semitones) and rate (percent) and format them for SSML."""
+    pitch_change = max(-3, min(3, pitch_change))
+    rate_change = max(-50, min(50, rate_change))
+    pitch_ssml = "default" if pitch_change == 0 else f"{pitch_change:+d}st"
+    rate_ssml = "default" if rate_change == 0 else f"{rate_change:+d}%"
+    return pitch_ssml, rate_ssml
+
+
+def _resolve_azure_voice(language_details, voice_gender):
+    """Pick the Azure voice for a language/gender, or None if none is configured."""
+    try:
+        return get_voice_for_gender(language_details['name'], voice_gender)
+    except KeyError:
+        # Fall back to first configured voice if mapping is missing.
+        voices = language_details.get('voices') or {}
+        return next(iter(voices.values())) if voices else None
+
+
+def _to_int(value, default=0):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+# Accept header values mapped onto output formats, in server preference order
+_ACCEPT_FORMATS = {
+    'audio/mpeg': 'mp3',
+    'audio/ogg': 'ogg',
+    'audio/opus': 'ogg',
+    'audio/wav': 'wav',
+    'audio/x-wav': 'wav',
+}
+
+
+def _negotiate_audio_format(data):
+    """Output format from the 'audio_format' field, else the Accept header, else MP3."""
+    field = data.get('audio_format')
+    requested = normalize_format(field) if isinstance(field, str) else None
+    if requested:
+        return requested
+    best = request.accept_mimetypes.best_match(list(_ACCEPT_FORMATS))
+    return _ACCEPT_FORMATS.get(best, DEFAULT_FORMAT)
+
+
+def _traced(name):
+    """Run a view under a request trace when tracing is requested (see services/tracing.py)."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            enabled = tracing.tracing_requested(request.headers, request.get_json(silent=True))
+            with tracing.request_trace(name, enabled):
+                return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _traced_stream(name, events, enabled):
+    """Keep a request trace open while a streamed response is being generated."""
+    with tracing.request_trace(name, enabled):
+        yield from events
+
+
+def _with_timings(payload):
+    """Attach the active trace's per-stage timings to a response payload."""
+    trace = tracing.current_trace()
+    if trace is not None:
+        payload['timings'] = trace.summary()
+    return payload
+
+
+def _sse(event, payload):
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+def _retry_after(exc):
+    return max(1, int(round(getattr(exc, 'retry_after', None) or 1)))
+
+
+def _busy_response(exc):
+    """503 with Retry-After for requests rejected or throttled by the provider quota."""
+    retry_after = _retry_after(exc)
+    response = jsonify({'error': str(exc), 'retry_after': retry_after})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+
+def _quota_response(exc):
+    """429 with Retry-After (seconds until the daily quota resets)."""
+    retry_after = max(1, int(round(exc.retry_after)))
+    response = jsonify({'error': str(exc), 'quota': exc.metric, 'retry_after': retry_after})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+
+def _finish_clip(audio_bytes, audio_format, words=()):
+    """Trim and fade the edges of a clip joined from per-sentence segments.
+
+    Only WAV clips: a compressed clip would need a second lossy encode, which
+    costs more than a 10 ms fade gains. Returns the clip and its word timings,
+    moved earlier by the leading silence the trim removed.
+    """
+    if audio_format != 'wav' or not postprocess_applies(audio_format):
+        return audio_bytes, list(words)
+    with tracing.span('postprocess', stage='edges'):
+        processed = cpu_pool.run_on_buffer(
+            postprocess_audio, audio_bytes, audio_format, PostProcessSettings.from_env().edges()
+        )
+    return processed.audio, timings.shift(words, -processed.trimmed_ms)
+
+
+def _render_azure_clip(spoken_sentences, language_name, voice, pitch_ssml, rate_ssml, content_hash, audio_format):
+    """Synthesize sentences with an Azure voice and persist the joined clip."""
+    try:
+        with tracing.span('synthesize', sentences=len(spoken_sentences), voice=voice):
+            audio_bytes, words = sentence_pipeline.synthesize_timed(
+                spoken_sentences,
+                lambda sentence: synthesize_speech_timed(
+                    text=sentence,
+                    voice=voice,
+                    pitch=pitch_ssml,
+                    rate=rate_ssml,
+                    audio_format=audio_format,
+                ),
+                voice=voice,
+                pitch=pitch_ssml,
+                rate=rate_ssml,
+                audio_format=audio_format,
+                provider='azure',
+            )
+    except (AdmissionTimeout, RateLimitedError):
+        raise
+    except Exception as exc:
+        raise RuntimeError(f'Azure speech synthesis failed: {exc}') from exc
+    audio_bytes, words = _finish_clip(audio_bytes, audio_format, words)
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"speech_{_slugify(language_name)}_{timestamp}_{content_hash[:8]}.{audio_format}"
+    file_path = os.path.join('output', filename)
+
+    try:
+        with tracing.span('write_file', filename=filename):
+            with open(file_path, 'wb') as file_handle:
+                file_handle.write(audio_bytes)
+        tracing.note('write_file', nbytes=len(audio_bytes))
+    except Exception as exc:
+        raise RuntimeError(f'Failed to persist audio: {exc}') from exc
+
+    # Shared through single_flight, so the clip is referenced by path, not embedded
+    return {
+        'filename': filename,
+        'file_path': file_path,
+        'audio_seconds': audio_duration(audio_bytes, audio_format),
+        'word_timings': words,
+        'subtitles': _write_subtitles(filename, words),
+    }
+
+
+# Subtitle formats written next to each clip, with their MIME types
+_SUBTITLE_TYPES = {
+    'vtt': 'text/vtt',
+    'srt': 'application/x-subrip',
+}
+
+
+def _clip_base64(rendered):
+    """Base64 of a rendered clip, read from the file its result references."""
+    if not rendered.get('file_path'):
+        return None
+    clip = AudioBuffer.from_file(rendered['file_path'])
+    try:
+        return clip.b64encode()
+    finally:
+        clip.release()
+
+
+def _write_subtitles(audio_filename, words):
+    """Write WebVTT and SRT files for a clip's word timings; returns their URLs."""
+    if not words:
+        return None
+    base = os.path.splitext(audio_filename)[0]
+    rendered = {'vtt': timings.to_webvtt(words), 'srt': timings.to_srt(words)}
+    urls = {}
+    for extension, content in rendered.items():
+        with open(os.path.join('output', f'{base}.{extension}'), 'w', encoding='utf-8') as file_handle:
+            file_handle.write(content)
+        urls[extension] = f'/api/subtitles/{base}.{extension}'
+    return urls
+
+
+def _client_id():
+    # remote_addr is the forwarded client address only when ProxyFix is configured
+    return request.remote_addr or 'anonymous'
+
+
+# Endpoints whose provider calls queue behind interactive traffic by default
+BULK_ENDPOINTS = {'translate_and_speak_multi'}
+
+
+def _tenant():
+    """Who the request is accounted and scheduled for: signed-in user, API key or client."""
+    user_id = auth.user_from_authorization(request.headers.get('Authorization'))
+    if user_id:
+        return f'user:{user_id}'
+    key_id = auth.key_id_for_api_key(request.headers.get('X-API-Key'))
+    if key_id:
+        return f'key:{key_id}'
+    return f'client:{_client_id()}'
+
+
+# Typical speaking rate, used to reserve audio seconds before synthesis
+_EXPECTED_CHARS_PER_SECOND = 15
+
+
+def _admit_usage(translated_chars=0, synthesized_chars=0):
+    """Reserve the request's expected usage against the caller's daily quota.
+
+    Raises QuotaExceeded. The reservation is settled by ``usage_meter.record`` and
+    whatever is left is released when the request ends.
+    """
+    reservation = usage_meter.check(
+        g.tenant,
+        translated_chars=translated_chars,
+        synthesized_chars=synthesized_chars,
+        audio_seconds=synthesized_chars / _EXPECTED_CHARS_PER_SECOND,
+    )
+    g.usage_reservation = reservation
+    return reservation
+
+
+@app.before_request
+def _enter_work_context():
+    """Tag the request's provider calls with its priority class and tenant.
+
+    The class comes from the endpoint. Clients may ask for ``bulk`` (header
+    ``X-Priority`` or payload ``priority``) to yield to interactive traffic,
+    but can never raise a bulk endpoint to interactive.
+    """
+    priority = scheduler.BULK if request.endpoint in BULK_ENDPOINTS else scheduler.INTERACTIVE
+    data = request.get_json(silent=True) if request.is_json else None
+    requested = request.headers.get('X-Priority') or (data.get('priority') if isinstance(data, dict) else None)
+    if requested == scheduler.BULK:
+        priority = scheduler.BULK
+    g.tenant = _tenant()
+    g.work_context = scheduler.enter_context(priority, g.tenant)
+
+
+@app.teardown_request
+def _exit_work_context(_exc):
+    usage_meter.release(g.pop('usage_reservation', None))
+    token = g.pop('work_context', None)
+    if token is not None:
+        try:
+            scheduler.exit_context(token)
+        except ValueError:
+            # Streamed responses may finish in a different context.
+            pass
+
+
+def _warm_azure_variant(sentences, source_lang_code, target_lang, voice, pitch_ssml, rate_ssml, audio_format):
+    """Fill the translation and audio caches for one variant without persisting a clip."""
+    if source_lang_code != target_lang:
+        prefetcher.require_headroom('google')
+    translated_sentences = speculative_pipeline.translate(sentences, target_lang, source_lang_code)
+    spoken_sentences = [normalize_for_speech(sentence, target_lang) for sentence in translated_sentences]
+    speculative_pipeline.synthesize(
+        spoken_sentences,
+        prefetcher.guard('azure', lambda sentence: synthesize_speech_timed(
+            text=sentence,
+            voice=voice,
+            pitch=pitch_ssml,
+            rate=rate_ssml,
+            audio_format=audio_format,
+        )),
+        voice=voice,
+        pitch=pitch_ssml,
+        rate=rate_ssml,
+        audio_format=audio_format,
+        provider='azure',
+    )
+
+
+def _schedule_prefetch(input_text, source_lang_code, target_lang, voice_gender, pitch_ssml, rate_ssml, audio_format):
+    """Queue the other gender and the likeliest next languages after a served Azure request."""
+    if not prefetcher.enabled:
+        return
+    prefetcher.transitions.record(_client_id(), target_lang)
+    if len(input_text) > prefetcher.max_chars:
+        return
+
+    # Registry keys are lowercase ('male'); requests say 'Male'.
+    served_gender = voice_gender.strip().lower() if isinstance(voice_gender, str) else ''
+    variants = [
+        (target_lang, gender)
+        for gender in get_available_genders(LANGUAGE_CONFIG[target_lang]['name'])
+        if gender.lower() != served_gender
+    ]
+    variants += [
+        (lang, voice_gender)
+        for lang in prefetcher.transitions.likely_next(target_lang, prefetcher.languages, LANGUAGE_CONFIG)
+    ]
+
+    sentences = split_sentences(input_text)
+    text_hash = hashlib.md5(input_text.encode()).hexdigest()
+    for lang, gender in variants:
+        voice = _resolve_azure_voice(LANGUAGE_CONFIG[lang], gender)
+        if not voice:
+            continue
+        prefetcher.submit(
+            (text_hash, lang, voice, pitch_ssml, rate_ssml, audio_format),
+            functools.partial(
+                _warm_azure_variant, sentences, source_lang_code, lang, voice, pitch_ssml, rate_ssml, audio_format
+            ),
+        )
+
+
 @app.route('/api/translate-and-speak', methods=['POST'])
+@_traced('translate_and_speak')
 def translate_and_speak():
     """
     API endpoint that handles text translation and TTS conversion.
@@ -91,32 +446,29 @@ def translate_and_speak():
         "target_lang": "te",
         "voice_gender": "Male",
         "age_tone": "Adult",
-        "tts_engine": "piper"
+        "tts_engine": "piper",
+        "audio_format": "ogg"   (optional: mp3, ogg (Opus) or wav; else negotiated from Accept)
+        "trace": true           (optional: return per-stage "timings", also via X-Trace: 1)
     }
     """
     try:
         data = request.get_json()
         
-        if not data:
+        if not isinstance(data, dict) or not data:
             return jsonify({'error': 'No data provided'}), 400
         
-        input_text = data.get('text', '').strip()
+        # Canonical form ("Rs 100" == "₹100") drives detection, translation and cache keys
+        input_text = canonicalize(data.get('text', '').strip())
         target_lang = data.get('target_lang', '').strip().lower()
         voice_gender = data.get('voice_gender', 'Male')
         age_tone = data.get('age_tone', 'Adult')
         requested_engine = data.get('tts_engine', 'azure')
         raw_rate = data.get('rate', 0)
         raw_pitch = data.get('pitch', 0)
+        audio_format = _negotiate_audio_format(data)
 
-        try:
-            pitch_change = int(raw_pitch)
-        except (TypeError, ValueError):
-            pitch_change = 0
-
-        try:
-            rate_change = int(raw_rate)
-        except (TypeError, ValueError):
-            rate_change = 0
+        pitch_change = _to_int(raw_pitch)
+        rate_change = _to_int(raw_rate)
 
         if requested_engine:
             requested_engine = requested_engine.strip().lower()
@@ -130,76 +482,77 @@ def translate_and_speak():
             return jsonify({'error': 'No target language provided'}), 400
         
         # Detect source language
-        detected_lang = translation_service.detect_language(input_text)
+        with tracing.span('detect_language', chars=len(input_text)):
+            detected_lang = translation_service.detect_language(input_text)
         source_lang_code = detected_lang['code']
         source_lang_name = detected_lang['name']
+
+        # Admission against the caller's daily quota, before any provider call
+        translated_chars = len(input_text) if source_lang_code != target_lang else 0
+        try:
+            reservation = _admit_usage(translated_chars=translated_chars, synthesized_chars=len(input_text))
+        except QuotaExceeded as exc:
+            return _quota_response(exc)
         
-        # Translate text (only if source != target)
-        if source_lang_code == target_lang:
-            translation_result = {
-                'translated_text': input_text,
-                'source_lang': source_lang_code,
-                'target_lang': target_lang,
-                'original_text': input_text
-            }
-        else:
-            translation_result = translation_service.translate_text(
-                input_text,
+        # Translate sentence by sentence so edits only re-translate what changed
+        with tracing.span('translate', source=source_lang_code, target=target_lang):
+            translated_sentences = sentence_pipeline.translate(
+                split_sentences(input_text),
                 target_lang,
-                source_lang_code=source_lang_code
+                source_lang_code,
             )
-        
-        translated_text = translation_result['translated_text']
+        translated_text = input_text if source_lang_code == target_lang else join_sentences(translated_sentences, input_text)
         target_lang_details = LANGUAGE_CONFIG.get(target_lang)
         if requested_engine == 'azure':
             if target_lang_details is None:
                 return jsonify({'error': f"Unsupported target language '{target_lang}' for Azure TTS."}), 400
 
-            voices = target_lang_details.get('voices') or {}
             available_genders = get_available_genders(target_lang_details['name'])
 
-            pitch_change = max(-3, min(3, pitch_change))
-            rate_change = max(-50, min(50, rate_change))
-
-            pitch_ssml = "default" if pitch_change == 0 else f"{pitch_change:+d}st"
-            rate_ssml = "default" if rate_change == 0 else f"{rate_change:+d}%"
-
-            try:
-                selected_voice = get_voice_for_gender(
-                    target_lang_details['name'],
-                    voice_gender,
-                )
-            except KeyError:
-                # Fall back to first configured voice if mapping is missing.
-                selected_voice = next(iter(voices.values())) if voices else None
+            pitch_ssml, rate_ssml = _azure_prosody(pitch_change, rate_change)
+            selected_voice = _resolve_azure_voice(target_lang_details, voice_gender)
 
             if not selected_voice:
                 return jsonify({'error': f"No Azure voices configured for '{target_lang_details['name']}'."}), 400
 
-            try:
-                audio_bytes = synthesize_speech(
-                    text=translated_text,
-                    voice=selected_voice,
-                    pitch=pitch_ssml,
-                    rate=rate_ssml,
-                )
-            except Exception as exc:
-                return jsonify({'error': f'Azure speech synthesis failed: {exc}'}), 500
-
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            content_hash = hashlib.md5(f"{translated_text}_{target_lang}_{pitch_ssml}_{rate_ssml}".encode()).hexdigest()[:8]
-            filename = f"speech_{_slugify(target_lang_details['name'])}_{timestamp}_{content_hash}.mp3"
-            file_path = os.path.join('output', filename)
+            spoken_sentences = [normalize_for_speech(sentence, target_lang) for sentence in translated_sentences]
+            normalized_text = join_sentences(spoken_sentences, input_text)
+            content_hash = hashlib.md5(
+                f"{normalized_text}_{target_lang}_{pitch_ssml}_{rate_ssml}_{audio_format}".encode()
+            ).hexdigest()
 
             try:
-                with open(file_path, 'wb') as file_handle:
-                    file_handle.write(audio_bytes)
-            except Exception as exc:
-                return jsonify({'error': f'Failed to persist audio: {exc}'}), 500
+                rendered = single_flight.do(
+                    f"azure-{selected_voice}-{content_hash}",
+                    lambda: _render_azure_clip(
+                        spoken_sentences,
+                        target_lang_details['name'],
+                        selected_voice,
+                        pitch_ssml,
+                        rate_ssml,
+                        content_hash,
+                        audio_format,
+                    ),
+                )
+            except (AdmissionTimeout, RateLimitedError) as exc:
+                return _busy_response(exc)
+            except RuntimeError as exc:
+                return jsonify({'error': str(exc)}), 500
 
-            audio_base64 = base64.b64encode(audio_bytes).decode('utf-8')
+            filename = rendered['filename']
+            audio_base64 = _clip_base64(rendered)
+            usage_meter.record(
+                g.tenant,
+                reservation,
+                translated_chars=translated_chars,
+                synthesized_chars=len(normalized_text),
+                audio_seconds=rendered['audio_seconds'],
+            )
+            _schedule_prefetch(
+                input_text, source_lang_code, target_lang, voice_gender, pitch_ssml, rate_ssml, audio_format
+            )
 
-            return jsonify({
+            return jsonify(_with_timings({
                 'success': True,
                 'source_lang': source_lang_code,
                 'source_lang_name': source_lang_name,
@@ -210,13 +563,17 @@ def translate_and_speak():
                 'filename': filename,
                 'tts_engine': 'azure',
                 'audio_base64': audio_base64,
-                'normalized_text': translated_text,
+                'audio_format': audio_format,
+                'mime': AUDIO_MIME_TYPES[audio_format],
+                'normalized_text': normalized_text,
+                'word_timings': rendered['word_timings'],
+                'subtitles': rendered['subtitles'],
                 'voice_name': selected_voice,
                 'available_genders': list(available_genders.keys()),
                 'pitch': pitch_ssml,
                 'rate': rate_ssml,
                 'message': 'Translation and speech generation successful!'
-            })
+            }))
 
         # Fallback to legacy providers for non-Azure engines
         tts_engine = requested_engine
@@ -229,76 +586,516 @@ def translate_and_speak():
         target_lang_name = LANGUAGE_CODE_TO_NAME.get(target_lang, target_lang.upper())
         normalized_pitch = max(-3, min(3, pitch_change))
         provider_pitch = str(normalized_pitch) if normalized_pitch != 0 else None
-        selected_voice = speech_service.get_voice_by_gender_and_age(voice_gender, age_tone)
+        selected_voice = speech_service.get_voice_by_gender_and_age(
+            voice_gender,
+            age_tone,
+            tts_engine=tts_engine,
+            lang_code=target_lang,
+        )
 
         # Create hash for deduplication
         settings_hash = f"{voice_gender}_{age_tone}_{tts_engine}_{selected_voice}"
-        content_hash = hashlib.md5(f"{translated_text}_{target_lang}_{settings_hash}".encode()).hexdigest()[:8]
-
-        # Generate unique filename
-        target_lang_name_lower = target_lang_name.lower()
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        gender_slug = _slugify(voice_gender)
-        age_slug = _slugify(age_tone)
-        engine_slug = _slugify(tts_engine)
-        voice_slug = _slugify(selected_voice)
-        extension = getattr(provider, 'output_extension', 'mp3')
-        filename = (
-            f"speech_{target_lang_name_lower}_{engine_slug}_{gender_slug}_{age_slug}_{voice_slug}_{timestamp}_{content_hash}.{extension}"
-        )
+        content_hash = hashlib.md5(
+            f"{translated_text}_{target_lang}_{settings_hash}_{pitch_change}_{raw_rate}_{audio_format}".encode()
+        ).hexdigest()
 
-        # Generate audio file
-        speech_result = speech_service.synthesize(
-            text=translated_text,
-            lang_code=target_lang,
-            filename=filename,
-            tts_engine=tts_engine,
-            voice=selected_voice,
-            gender=voice_gender,
-            rate=raw_rate,
-            pitch=provider_pitch
-        )
+        def _render_legacy():
+            # Generate unique filename
+            target_lang_name_lower = target_lang_name.lower()
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            gender_slug = _slugify(voice_gender)
+            age_slug = _slugify(age_tone)
+            engine_slug = _slugify(tts_engine)
+            voice_slug = _slugify(selected_voice)
+            extension = audio_format
+            filename = (
+                f"speech_{target_lang_name_lower}_{engine_slug}_{gender_slug}_{age_slug}_{voice_slug}_{timestamp}_{content_hash[:8]}.{extension}"
+            )
+
+            # Generate audio file
+            with tracing.span('synthesize', engine=tts_engine, voice=selected_voice):
+                speech_result = speech_service.synthesize(
+                    text=translated_text,
+                    lang_code=target_lang,
+                    filename=filename,
+                    tts_engine=tts_engine,
+                    voice=selected_voice,
+                    gender=voice_gender,
+                    rate=raw_rate,
+                    pitch=provider_pitch,
+                    audio_format=audio_format,
+                )
+
+            if not speech_result['success']:
+                raise RuntimeError(speech_result.get('message', 'Failed to generate audio file'))
 
-        if speech_result['success']:
             final_file_path = speech_result.get('file_path')
             final_filename = speech_result.get('filename')
-            final_audio_base64 = speech_result.get('audio_base64')
 
             if pitch_change != 0 and final_file_path:
                 try:
                     processed_path = apply_pitch(final_file_path, pitch_change)
                     final_file_path = processed_path
                     final_filename = os.path.basename(processed_path)
-                    with open(processed_path, 'rb') as processed_file:
-                        processed_bytes = processed_file.read()
-                    final_audio_base64 = base64.b64encode(processed_bytes).decode('utf-8')
                 except Exception as exc:
-                    return jsonify({'error': f'Pitch adjustment failed: {exc}'}), 500
+                    raise RuntimeError(f'Pitch adjustment failed: {exc}') from exc
 
-            return jsonify({
-                'success': True,
-                'source_lang': source_lang_code,
-                'source_lang_name': source_lang_name,
-                'target_lang': target_lang,
-                'target_lang_name': target_lang_name,
-                'translated_text': translated_text,
-                'audio_url': f'/api/audio/{final_filename}',
+            audio_seconds = 0.0
+            if final_file_path:
+                clip = AudioBuffer.from_file(final_file_path)
+                audio_seconds = audio_duration(clip.view, os.path.splitext(final_file_path)[1])
+                clip.release()
+
+            words = speech_result.get('word_timings') or []
+            return {
                 'filename': final_filename,
-                'tts_engine': tts_engine,
-                'audio_base64': final_audio_base64,
+                'file_path': final_file_path,
                 'normalized_text': speech_result.get('normalized_text', translated_text),
-                'pitch_adjustment': pitch_change,
-                'message': 'Translation and speech generation successful!'
-            })
-        else:
-            return jsonify({'error': speech_result.get('message', 'Failed to generate audio file')}), 500
+                'audio_seconds': audio_seconds,
+                'word_timings': words,
+                'subtitles': _write_subtitles(final_filename, words) if final_filename else None,
+            }
 
+        try:
+            rendered = single_flight.do(f"{tts_engine}-{content_hash}", _render_legacy)
+        except (AdmissionTimeout, RateLimitedError) as exc:
+            return _busy_response(exc)
+        except RuntimeError as exc:
+            return jsonify({'error': str(exc)}), 500
+        usage_meter.record(
+            g.tenant,
+            reservation,
+            translated_chars=translated_chars,
+            synthesized_chars=len(rendered['normalized_text'] or ''),
+            audio_seconds=rendered['audio_seconds'],
+        )
+
+        return jsonify(_with_timings({
+            'success': True,
+            'source_lang': source_lang_code,
+            'source_lang_name': source_lang_name,
+            'target_lang': target_lang,
+            'target_lang_name': target_lang_name,
+            'translated_text': translated_text,
+            'audio_url': f"/api/audio/{rendered['filename']}",
+            'filename': rendered['filename'],
+            'tts_engine': tts_engine,
+            'audio_base64': _clip_base64(rendered),
+            'audio_format': audio_format,
+            'mime': AUDIO_MIME_TYPES[audio_format],
+            'normalized_text': rendered['normalized_text'],
+            'word_timings': rendered['word_timings'],
+            'subtitles': rendered['subtitles'],
+            'pitch_adjustment': pitch_change,
+            'message': 'Translation and speech generation successful!'
+        }))
+
+    except (AdmissionTimeout, RateLimitedError) as exc:
+        return _busy_response(exc)
     except Exception as e:
         import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/translate-and-speak/stream', methods=['POST'])
+def translate_and_speak_stream():
+    """
+    Server-sent events variant of /api/translate-and-speak for Azure voices.
+    Accepts the same JSON payload and pushes, in order:
+        detected     - {source_lang, source_lang_name, target_lang, target_lang_name}
+        translation  - {index, text} for each sentence as it is translated
+        audio        - {index, audio_base64, mime} for each synthesized sentence
+        done         - the same fields as the JSON endpoint, minus audio_base64
+        error        - {error} if the pipeline fails mid-stream
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not data:
+        return jsonify({'error': 'No data provided'}), 400
+
+    input_text = canonicalize(data.get('text', '').strip())
+    target_lang = data.get('target_lang', '').strip().lower()
+    voice_gender = data.get('voice_gender', 'Male')
+    audio_format = _negotiate_audio_format(data)
+
+    if not input_text:
+        return jsonify({'error': 'No text provided'}), 400
+
+    target_lang_details = LANGUAGE_CONFIG.get(target_lang)
+    if target_lang_details is None:
+        return jsonify({'error': f"Unsupported target language '{target_lang}' for Azure TTS."}), 400
+
+    pitch_ssml, rate_ssml = _azure_prosody(_to_int(data.get('pitch', 0)), _to_int(data.get('rate', 0)))
+    selected_voice = _resolve_azure_voice(target_lang_details, voice_gender)
+    if not selected_voice:
+        return jsonify({'error': f"No Azure voices configured for '{target_lang_details['name']}'."}), 400
+
+    # The source language is only known once streaming starts, so admission
+    # checks synthesis against the quota and translation only for exhaustion.
+    tenant = g.tenant
+    try:
+        reservation = _admit_usage(synthesized_chars=len(input_text))
+    except QuotaExceeded as exc:
+        return _quota_response(exc)
+
+    def _events():
+        with tracing.span('detect_language', chars=len(input_text)):
+            detected_lang = translation_service.detect_language(input_text)
+        source_lang_code = detected_lang['code']
+        yield _sse('detected', {
+            'source_lang': source_lang_code,
+            'source_lang_name': detected_lang['name'],
+            'target_lang': target_lang,
+            'target_lang_name': target_lang_details['name'],
+        })
+
+        translated_sentences = []
+        segments = []
+        audio_seconds = 0.0
+        try:
+            for kind, index, payload in sentence_pipeline.stream(
+                split_sentences(input_text),
+                target_lang,
+                source_lang_code,
+                lambda sentence: synthesize_speech_timed(
+                    text=sentence,
+                    voice=selected_voice,
+                    pitch=pitch_ssml,
+                    rate=rate_ssml,
+                    audio_format=audio_format,
+                ),
+                voice=selected_voice,
+                pitch=pitch_ssml,
+                rate=rate_ssml,
+                audio_format=audio_format,
+                normalize_fn=lambda sentence: normalize_for_speech(sentence, target_lang),
+            ):
+                if kind == 'translation':
+                    translated_sentences.append(payload)
+                    yield _sse('translation', {'index': index, 'text': payload})
+                else:
+                    segments.append(payload)
+                    audio_seconds += audio_duration(payload, audio_format)
+                    yield _sse('audio', {
+                        'index': index,
+                        'audio_base64': cpu_pool.b64encode(payload),
+                        'mime': AUDIO_MIME_TYPES[audio_format],
+                    })
+
+            translated_text = (
+                input_text if source_lang_code == target_lang else join_sentences(translated_sentences, input_text)
+            )
+            content_hash = hashlib.md5(
+                f"{translated_text}_{target_lang}_{pitch_ssml}_{rate_ssml}_{audio_format}".encode()
+            ).hexdigest()[:8]
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filename = f"speech_{_slugify(target_lang_details['name'])}_{timestamp}_{content_hash}.{audio_format}"
+            with open(os.path.join('output', filename), 'wb') as file_handle:
+                file_handle.write(_finish_clip(join_audio(segments, audio_format), audio_format)[0])
+
+            normalized_text = join_sentences(
+                [normalize_for_speech(sentence, target_lang) for sentence in translated_sentences], input_text
+            )
+            usage_meter.record(
+                tenant,
+                reservation,
+                translated_chars=len(input_text) if source_lang_code != target_lang else 0,
+                synthesized_chars=len(normalized_text),
+                audio_seconds=audio_seconds,
+            )
+
+            yield _sse('done', _with_timings({
+                'success': True,
+                'source_lang': source_lang_code,
+                'source_lang_name': detected_lang['name'],
+                'target_lang': target_lang,
+                'target_lang_name': target_lang_details['name'],
+                'translated_text': translated_text,
+                'audio_url': f'/api/audio/{filename}',
+                'filename': filename,
+                'tts_engine': 'azure',
+                'audio_format': audio_format,
+                'normalized_text': normalized_text,
+                'voice_name': selected_voice,
+                'pitch': pitch_ssml,
+                'rate': rate_ssml,
+                'message': 'Translation and speech generation successful!'
+            }))
+        except (AdmissionTimeout, RateLimitedError) as exc:
+            # Headers are already sent; the event carries the 503's Retry-After.
+            yield _sse('error', {'error': str(exc), 'status': 503, 'retry_after': _retry_after(exc)})
+        except Exception as exc:
+            yield _sse('error', {'error': f'Azure speech synthesis failed: {exc}'})
+
+    trace_enabled = tracing.tracing_requested(request.headers, data)
+    return Response(
+        stream_with_context(_traced_stream('translate_and_speak_stream', _events(), trace_enabled)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+@app.route('/api/translate-and-speak/audio', methods=['POST'])
+def translate_and_speak_audio():
+    """
+    Progressive-audio variant of /api/translate-and-speak for Azure voices.
+    Accepts the same JSON payload; the response body is the audio itself
+    (audio/mpeg or audio/ogg), sent chunk by chunk while Azure synthesizes,
+    so a player can start after the first chunk. The clip is also saved and
+    named in the X-Audio-Filename header for /api/audio and /api/download.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not data:
+        return jsonify({'error': 'No data provided'}), 400
+
+    input_text = canonicalize(data.get('text', '').strip())
+    target_lang = data.get('target_lang', '').strip().lower()
+    voice_gender = data.get('voice_gender', 'Male')
+    audio_format = _negotiate_audio_format(data)
+
+    if not input_text:
+        return jsonify({'error': 'No text provided'}), 400
+
+    target_lang_details = LANGUAGE_CONFIG.get(target_lang)
+    if target_lang_details is None:
+        return jsonify({'error': f"Unsupported target language '{target_lang}' for Azure TTS."}), 400
+
+    pitch_ssml, rate_ssml = _azure_prosody(_to_int(data.get('pitch', 0)), _to_int(data.get('rate', 0)))
+    selected_voice = _resolve_azure_voice(target_lang_details, voice_gender)
+    if not selected_voice:
+        return jsonify({'error': f"No Azure voices configured for '{target_lang_details['name']}'."}), 400
+
+    # Translation finishes before the first byte, so its errors still get a status code
+    detected_lang = translation_service.detect_language(input_text)
+    source_lang_code = detected_lang['code']
+    translated_chars = len(input_text) if source_lang_code != target_lang else 0
+    tenant = g.tenant
+    try:
+        reservation = _admit_usage(translated_chars=translated_chars, synthesized_chars=len(input_text))
+    except QuotaExceeded as exc:
+        return _quota_response(exc)
+
+    try:
+        translated_sentences = sentence_pipeline.translate(split_sentences(input_text), target_lang, source_lang_code)
+    except (AdmissionTimeout, RateLimitedError) as exc:
+        return _busy_response(exc)
+    normalized_text = join_sentences(
+        [normalize_for_speech(sentence, target_lang) for sentence in translated_sentences], input_text
+    )
+    content_hash = hashlib.md5(
+        f"{normalized_text}_{target_lang}_{pitch_ssml}_{rate_ssml}_{audio_format}".encode()
+    ).hexdigest()[:8]
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"speech_{_slugify(target_lang_details['name'])}_{timestamp}_{content_hash}.{audio_format}"
+
+    # Admission happens on the first read, so a busy quota still gets a 503
+    audio_stream = stream_speech(
+        text=normalized_text,
+        voice=selected_voice,
+        pitch=pitch_ssml,
+        rate=rate_ssml,
+        audio_format=audio_format,
+    )
+    try:
+        first_chunk = next(audio_stream, b'')
+    except (AdmissionTimeout, RateLimitedError) as exc:
+        return _busy_response(exc)
+    except RuntimeError as exc:
+        return jsonify({'error': f'Azure speech synthesis failed: {exc}'}), 500
+
+    def _chunks():
+        chunks = [first_chunk]
+        try:
+            yield first_chunk
+            for chunk in audio_stream:
+                chunks.append(chunk)
+                yield chunk
+        except GeneratorExit:
+            audio_stream.close()
+            raise
+        except Exception as exc:
+            # Headers are already sent; the client sees a truncated clip.
+            print(f"⚠️ Azure audio stream failed after {sum(map(len, chunks))} bytes: {exc}")
+            return
+
+        audio_bytes = b''.join(chunks)
+        AudioBuffer.write(audio_bytes, os.path.join('output', filename)).release()
+        usage_meter.record(
+            tenant,
+            reservation,
+            translated_chars=translated_chars,
+            synthesized_chars=len(normalized_text),
+            audio_seconds=audio_duration(audio_bytes, audio_format),
+        )
+
+    trace_enabled = tracing.tracing_requested(request.headers, data)
+    return Response(
+        stream_with_context(_traced_stream('translate_and_speak_audio', _chunks(), trace_enabled)),
+        mimetype=AUDIO_MIME_TYPES[audio_format],
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',
+            'X-Audio-Filename': filename,
+            'X-Source-Lang': source_lang_code,
+        },
+    )
+
+
+@app.route('/api/translate-and-speak/multi', methods=['POST'])
+def translate_and_speak_multi():
+    """
+    Fan-out variant of /api/translate-and-speak: one input, many Azure targets.
+    Expected JSON payload:
+    {
+        "text": "input text",
+        "target_langs": ["hi", "te", "ta"],   (omit for every supported language; [] is rejected)
+        "voice_gender": "Female",
+        "pitch": 0,
+        "rate": 0
+    }
+    The source language is detected once. Targets are translated and
+    synthesized concurrently (at most FANOUT_MAX_WORKERS at a time) and pushed
+    as server-sent events in completion order:
+        detected  - {source_lang, source_lang_name, target_langs}
+        result    - the per-language fields of the JSON endpoint
+        error     - {target_lang, error[, retry_after]} for a failed target
+        done      - {completed, failed}
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not data:
+        return jsonify({'error': 'No data provided'}), 400
+
+    input_text = canonicalize(data.get('text', '').strip())
+    if not input_text:
+        return jsonify({'error': 'No text provided'}), 400
+
+    requested_langs = data.get('target_langs')
+    if requested_langs is not None and not isinstance(requested_langs, list):
+        return jsonify({'error': 'target_langs must be a list of language codes'}), 400
+    target_langs = [
+        str(lang).strip().lower()
+        for lang in (LANGUAGE_CONFIG.keys() if requested_langs is None else requested_langs)
+        if str(lang).strip()
+    ]
+    if not target_langs:
+        # Not a shorthand for "all": that would be one paid synthesis per language.
+        return jsonify({'error': 'target_langs is empty; omit it to target every supported language'}), 400
+    unsupported = [lang for lang in target_langs if lang not in LANGUAGE_CONFIG]
+    if unsupported:
+        return jsonify({'error': f"Unsupported target languages for Azure TTS: {unsupported}"}), 400
+    target_langs = list(dict.fromkeys(target_langs))
+
+    voice_gender = data.get('voice_gender', 'Male')
+    audio_format = _negotiate_audio_format(data)
+    pitch_ssml, rate_ssml = _azure_prosody(_to_int(data.get('pitch', 0)), _to_int(data.get('rate', 0)))
+
+    detected_lang = translation_service.detect_language(input_text)
+    source_lang_code = detected_lang['code']
+    sentences = split_sentences(input_text)
+
+    tenant = g.tenant
+    try:
+        reservation = _admit_usage(
+            translated_chars=len(input_text) * sum(lang != source_lang_code for lang in target_langs),
+            synthesized_chars=len(input_text) * len(target_langs),
+        )
+    except QuotaExceeded as exc:
+        return _quota_response(exc)
+
+    def _render_target(target_lang):
+        target_lang_details = LANGUAGE_CONFIG[target_lang]
+        selected_voice = _resolve_azure_voice(target_lang_details, voice_gender)
+        if not selected_voice:
+            raise RuntimeError(f"No Azure voices configured for '{target_lang_details['name']}'.")
+
+        translated_sentences = sentence_pipeline.translate(sentences, target_lang, source_lang_code)
+        translated_text = input_text if source_lang_code == target_lang else join_sentences(translated_sentences, input_text)
+        spoken_sentences = [normalize_for_speech(sentence, target_lang) for sentence in translated_sentences]
+        normalized_text = join_sentences(spoken_sentences, input_text)
+        content_hash = hashlib.md5(
+            f"{normalized_text}_{target_lang}_{pitch_ssml}_{rate_ssml}_{audio_format}".encode()
+        ).hexdigest()
+
+        rendered = single_flight.do(
+            f"azure-{selected_voice}-{content_hash}",
+            lambda: _render_azure_clip(
+                spoken_sentences,
+                target_lang_details['name'],
+                selected_voice,
+                pitch_ssml,
+                rate_ssml,
+                content_hash,
+                audio_format,
+            ),
+        )
+        # Each target settles its share of the request-wide reservation
+        usage_meter.record(
+            tenant,
+            reservation,
+            translated_chars=len(input_text) if source_lang_code != target_lang else 0,
+            synthesized_chars=len(normalized_text),
+            audio_seconds=rendered['audio_seconds'],
+        )
+        return {
+            'success': True,
+            'target_lang': target_lang,
+            'target_lang_name': target_lang_details['name'],
+            'translated_text': translated_text,
+            'audio_url': f"/api/audio/{rendered['filename']}",
+            'filename': rendered['filename'],
+            'tts_engine': 'azure',
+            'audio_base64': _clip_base64(rendered),
+            'audio_format': audio_format,
+            'mime': AUDIO_MIME_TYPES[audio_format],
+            'normalized_text': normalized_text,
+            'word_timings': rendered['word_timings'],
+            'subtitles': rendered['subtitles'],
+            'voice_name': selected_voice,
+            'pitch': pitch_ssml,
+            'rate': rate_ssml,
+        }
+
+    def _events():
+        yield _sse('detected', {
+            'source_lang': source_lang_code,
+            'source_lang_name': detected_lang['name'],
+            'target_langs': target_langs,
+        })
+
+        completed = failed = 0
+        max_workers = max(1, min(len(target_langs), _to_int(os.getenv('FANOUT_MAX_WORKERS'), 4)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            render = tracing.bind(_render_target)
+            futures = {executor.submit(render, lang): lang for lang in target_langs}
+            for future in as_completed(futures):
+                target_lang = futures[future]
+                try:
+                    result = future.result()
+                except (AdmissionTimeout, RateLimitedError) as exc:
+                    failed += 1
+                    yield _sse('error', {
+                        'target_lang': target_lang,
+                        'error': str(exc),
+                        'status': 503,
+                        'retry_after': _retry_after(exc),
+                    })
+                except Exception as exc:
+                    failed += 1
+                    yield _sse('error', {'target_lang': target_lang, 'error': str(exc)})
+                else:
+                    completed += 1
+                    yield _sse('result', result)
+
+        yield _sse('done', _with_timings({'completed': completed, 'failed': failed}))
+
+    trace_enabled = tracing.tracing_requested(request.headers, data)
+    return Response(
+        stream_with_context(_traced_stream('translate_and_speak_multi', _events(), trace_enabled)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
 @app.route('/api/audio/<filename>', methods=['GET'])
 def get_audio(filename):
     """Serve the generated audio file for playback."""
@@ -306,7 +1103,7 @@ def get_audio(filename):
     if os.path.exists(audio_path):
         return send_file(
             audio_path, 
-            mimetype='audio/mpeg',
+            mimetype=mimetype_for(filename),
             as_attachment=False,  # For audio player - stream inline
             download_name=filename
         )
@@ -314,6 +1111,16 @@ def get_audio(filename):
         return jsonify({'error': 'Audio file not found', 'path': audio_path}), 404
 
 
+@app.route('/api/subtitles/<filename>', methods=['GET'])
+def get_subtitles(filename):
+    """Serve the WebVTT or SRT word timings written next to a generated clip."""
+    extension = os.path.splitext(filename)[1].lstrip('.').lower()
+    subtitle_path = os.path.join('output', filename)
+    if extension not in _SUBTITLE_TYPES or not os.path.exists(subtitle_path):
+        return jsonify({'error': 'Subtitles not found', 'path': subtitle_path}), 404
+    return send_file(subtitle_path, mimetype=_SUBTITLE_TYPES[extension], download_name=filename)
+
+
 @app.route('/api/download/<filename>', methods=['GET'])
 def download_audio(filename):
     """Download the generated audio file."""
@@ -321,7 +1128,7 @@ def download_audio(filename):
     if os.path.exists(audio_path):
         return send_file(
             audio_path, 
-            mimetype='audio/mpeg',
+            mimetype=mimetype_for(filename),
             as_attachment=True,  # Force download dialog
             download_name=filename
         )
@@ -329,20 +1136,39 @@ def download_audio(filename):
         return jsonify({'error': 'Audio file not found', 'path': audio_path}), 404
 
 
+@app.route('/api/prompts/<path:prompt_id>', methods=['GET'])
+def get_prompt(prompt_id):
+    """Serve a pre-rendered prompt (e.g. 'welcome/hi/female') from the bundle."""
+    if prompt_bundle is None:
+        return jsonify({'error': 'No prompt bundle configured'}), 404
+
+    prompt_bundle.reload_if_changed()
+    prompt = prompt_bundle.get(prompt_id)
+    if prompt is None:
+        return jsonify({'error': 'Prompt not found', 'id': prompt_id}), 404
+
+    audio_bytes, mimetype = prompt
+    return Response(audio_bytes, mimetype=mimetype)
+
+
+def _cached_json(body, etag):
+    """Serve a pre-serialized JSON body with an ETag, answering 304 when it matches."""
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'public, max-age=300'
+    return response.make_conditional(request)
+
+
 @app.route('/api/languages', methods=['GET'])
 def get_languages():
     """Get list of supported languages."""
-    return jsonify({
-        code: {
-            'code': code,
-            'name': config['name'],
-            'voices': config.get('voices', {}),
-            'available_genders': list(
-                gender for gender, voice_name in (config.get('voices') or {}).items() if voice_name
-            ),
-        }
-        for code, config in LANGUAGE_CONFIG.items()
-    })
+    return _cached_json(voice_catalog.languages_json, voice_catalog.languages_etag)
+
+
+@app.route('/api/voices', methods=['GET'])
+def get_voices():
+    """Get every Azure, Piper and OpenAI voice with its language, locale and gender."""
+    return _cached_json(voice_catalog.voices_json, voice_catalog.voices_etag)
 
 
 # Serve React static files - must be last route and exclude API routes
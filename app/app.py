@@ -18,7 +18,9 @@ load_dotenv(env_path)  # Load .env file if it exists
 sys.path.append(project_root)
 
 from services.translation_service import TranslationService
-from services.azure_tts_service import AZURE_VOICES, synthesize_speech
+from services.rate_limiter import AdmissionTimeout, RateLimitedError
+from services.azure_tts_service import AZURE_VOICES, stream_speech
+from services.text_normalizer import canonicalize, normalize_for_speech
 
 
 # Page configuration
@@ -391,6 +393,8 @@ def main():
                 st.error("❌ Please upload a text file with content before generating speech!")
             st.stop()
         
+        input_text = canonicalize(input_text.strip())
+
         # Show processing status
         with st.spinner("🔄 Processing your request..."):
             # Step 1: Auto-detect source language
@@ -415,11 +419,27 @@ def main():
                 }
             else:
                 st.info(f"🔄 Translating from {source_lang_name} to {target_language}...")
-                translation_result = translation_service.translate_text(
-                    input_text, 
-                    target_lang_code,
-                    source_lang_code=source_lang_code
-                )
+                try:
+                    paragraphs = input_text.split("\n")
+                    if len(paragraphs) > 1 and translation_service.supports_batching(source_lang_code, target_lang_code):
+                        # Multi-paragraph input goes to the local engine as one batch.
+                        translation_result = {
+                            'translated_text': "\n".join(
+                                translation_service.translate_batch(paragraphs, target_lang_code, source_lang_code)
+                            ),
+                            'source_lang': source_lang_code,
+                            'target_lang': target_lang_code,
+                            'original_text': input_text
+                        }
+                    else:
+                        translation_result = translation_service.translate_text(
+                            input_text,
+                            target_lang_code,
+                            source_lang_code=source_lang_code
+                        )
+                except (AdmissionTimeout, RateLimitedError) as exc:
+                    st.error(f"❌ Translation service is busy, please retry in a moment: {exc}")
+                    st.stop()
             
             # Step 3: Generate speech with unique filename
             st.info("🎵 Converting to speech...")
@@ -428,16 +448,24 @@ def main():
             pitch_ssml = _format_pitch(pitch_value)
             rate_ssml = _format_rate(speed_value)
 
+            # Audio arrives while Azure is still synthesizing; show progress
+            # until the clip is complete (st.audio needs the whole file).
+            progress = st.empty()
+            chunks = []
             try:
-                audio_bytes = synthesize_speech(
-                    text=translated_text,
+                for chunk in stream_speech(
+                    text=normalize_for_speech(translated_text, target_lang_code),
                     voice=selected_voice,
                     pitch=pitch_ssml,
                     rate=rate_ssml,
-                )
+                ):
+                    chunks.append(chunk)
+                    progress.info(f"🎵 Receiving audio... {sum(map(len, chunks)) // 1024} KB")
             except Exception as exc:
                 st.error(f"❌ Azure speech synthesis failed: {exc}")
                 st.stop()
+            progress.empty()
+            audio_bytes = b"".join(chunks)
             
             filename = f"speech_{target_language.replace(' ', '_').lower()}.mp3"
             speech_result = {
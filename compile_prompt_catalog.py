@@ -0,0 +1,262 @@
+"""
+Prompt Catalog Compiler
+Renders a fixed catalog of IVR prompts into every target language and voice
+gender and packs the audio into a memory-mappable bundle (see
+services/prompt_bundle.py). Recompiling only re-renders rows whose text,
+voice or prosody changed; unchanged clips are copied from the previous bundle.
+
+Catalog format (CSV with a header row, or YAML list of mappings):
+    id, text[, source_lang][, languages][, genders]
+`languages` and `genders` are optional space/comma separated lists and default
+to every language in LANGUAGE_CONFIG and both genders.
+
+Usage:
+    python compile_prompt_catalog.py prompts.csv prompts/ivr --workers 8
+"""
+
+import argparse
+import csv
+import hashlib
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from dotenv import load_dotenv
+
+project_root = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(project_root)
+load_dotenv(os.path.join(project_root, '.env'))
+
+from services import scheduler, tracing
+from services.azure_tts_service import get_voice_for_gender, synthesize_speech
+from services.language_config import LANGUAGE_CONFIG
+from services.prompt_bundle import PromptBundle, bundle_paths, write_bundle
+from services.rate_limiter import AdmissionTimeout, RateLimitedError
+from services.translation_service import TranslationService
+
+GENDERS = ('female', 'male')
+
+# A throttled provider call is retried this many times before the clip fails.
+THROTTLE_RETRIES = 3
+
+
+def load_catalog(path):
+    """
+    Reads catalog rows from a CSV or YAML file.
+
+    Args:
+        path (str): Path to a .csv, .yaml or .yml catalog
+
+    Returns:
+        list: Rows as dicts with at least 'id' and 'text'
+    """
+    if path.lower().endswith(('.yaml', '.yml')):
+        try:
+            import yaml
+        except ImportError as exc:
+            raise RuntimeError("PyYAML is required for YAML catalogs. Install it via 'pip install pyyaml'.") from exc
+        with open(path, 'r', encoding='utf-8') as file_handle:
+            rows = yaml.safe_load(file_handle) or []
+    else:
+        with open(path, 'r', encoding='utf-8', newline='') as file_handle:
+            rows = list(csv.DictReader(file_handle))
+
+    catalog = []
+    for row in rows:
+        prompt_id = str(row.get('id') or '').strip()
+        text = str(row.get('text') or '').strip()
+        if not prompt_id or not text:
+            continue
+        catalog.append({
+            'id': prompt_id,
+            'text': text,
+            'source_lang': str(row.get('source_lang') or '').strip().lower() or None,
+            'languages': _split_list(row.get('languages')) or list(LANGUAGE_CONFIG.keys()),
+            'genders': [gender.lower() for gender in _split_list(row.get('genders'))] or list(GENDERS),
+        })
+    return catalog
+
+
+def _split_list(value):
+    if not value:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(item).strip() for item in value if str(item).strip()]
+    return [item for item in re.split(r'[\s,;]+', str(value)) if item]
+
+
+def plan_jobs(catalog, pitch, rate):
+    """
+    Expands catalog rows into one render job per (prompt, language, gender).
+
+    Returns:
+        list: Jobs with the prompt id, fingerprint and synthesis settings
+    """
+    jobs = []
+    for row in catalog:
+        for lang in row['languages']:
+            config = LANGUAGE_CONFIG.get(lang)
+            if config is None:
+                print(f"⚠️ Skipping unsupported language '{lang}' for prompt '{row['id']}'")
+                continue
+            for gender in row['genders']:
+                voice = get_voice_for_gender(config['name'], gender)
+                fingerprint = hashlib.sha1(
+                    '\x1f'.join([row['text'], row['source_lang'] or '', lang, voice, pitch, rate]).encode('utf-8')
+                ).hexdigest()
+                jobs.append({
+                    'prompt_id': f"{row['id']}/{lang}/{gender}",
+                    'text': row['text'],
+                    'source_lang': row['source_lang'],
+                    'target_lang': lang,
+                    'voice': voice,
+                    'fingerprint': fingerprint,
+                })
+    return jobs
+
+
+def _throttled(call, *args, **kwargs):
+    """Runs a provider call, waiting out throttling up to THROTTLE_RETRIES times."""
+    for attempt in range(THROTTLE_RETRIES + 1):
+        try:
+            return call(*args, **kwargs)
+        except (AdmissionTimeout, RateLimitedError) as exc:
+            if attempt == THROTTLE_RETRIES:
+                raise
+            time.sleep(exc.retry_after or 2.0 ** attempt)
+
+
+def translate_prompt(text, source_lang, target_lang, translation_service):
+    """
+    Translates one prompt text for every gender rendered from it.
+
+    Raises:
+        RuntimeError: If the translation came back unchanged, i.e. the backend
+            fell back to the source text; such clips must not be bundled
+        AdmissionTimeout, RateLimitedError: If throttling outlasted the retries
+    """
+    if source_lang == target_lang:
+        return text
+    translated = _throttled(
+        translation_service.translate_text,
+        text,
+        target_lang,
+        source_lang_code=source_lang
+    )['translated_text']
+    if not translated or translated == text:
+        raise RuntimeError(f"translation {source_lang} -> {target_lang} failed (source text returned)")
+    return translated
+
+
+def render_job(job, translated, pitch, rate):
+    """Synthesizes a single job from its translated text, returning its MP3 bytes."""
+    return _throttled(synthesize_speech, text=translated, voice=job['voice'], pitch=pitch, rate=rate)
+
+
+def compile_catalog(catalog_path, bundle_base, workers=4, pitch='default', rate='default'):
+    """
+    Compiles a catalog into a bundle, reusing clips whose fingerprint is unchanged.
+
+    Returns:
+        dict: Counts of 'reused', 'rendered' and 'failed' clips
+    """
+    jobs = plan_jobs(load_catalog(catalog_path), pitch, rate)
+
+    previous = None
+    if os.path.exists(bundle_paths(bundle_base)[1]):
+        try:
+            previous = PromptBundle(bundle_base)
+        except Exception as exc:
+            print(f"⚠️ Ignoring unreadable previous bundle: {exc}")
+
+    clips = {}
+    pending = []
+    for job in jobs:
+        entry = previous.entries.get(job['prompt_id']) if previous else None
+        if entry and entry.get('fingerprint') == job['fingerprint']:
+            clips[job['prompt_id']] = previous.get(job['prompt_id'])[0]
+        else:
+            pending.append(job)
+
+    print(f"Reusing {len(clips)} clips, rendering {len(pending)} with {workers} workers...")
+
+    translation_service = TranslationService()
+    # Each prompt is detected once and translated once per language; the
+    # genders rendered from it share that translation.
+    sources = {}
+    for job in pending:
+        if not job['source_lang'] and job['text'] not in sources:
+            sources[job['text']] = translation_service.detect_language(job['text'])['code']
+    for job in pending:
+        job['source_lang'] = job['source_lang'] or sources[job['text']]
+
+    failed = 0
+    # Compiles are bulk work: they may queue longer for provider slots.
+    with scheduler.work_context(scheduler.BULK, 'catalog'), ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        translate = tracing.bind(translate_prompt)
+        translation_futures = {}
+        for job in pending:
+            translation_key = (job['text'], job['source_lang'], job['target_lang'])
+            if translation_key not in translation_futures:
+                translation_futures[translation_key] = executor.submit(
+                    translate, *translation_key, translation_service
+                )
+
+        render = tracing.bind(render_job)
+        futures = {}
+        for job in pending:
+            try:
+                translated = translation_futures[(job['text'], job['source_lang'], job['target_lang'])].result()
+            except Exception as exc:
+                failed += 1
+                print(f"❌ {job['prompt_id']}: {exc}")
+                continue
+            futures[executor.submit(render, job, translated, pitch, rate)] = job
+
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                clips[job['prompt_id']] = future.result()
+            except Exception as exc:
+                failed += 1
+                print(f"❌ {job['prompt_id']}: {exc}")
+
+    write_bundle(
+        bundle_base,
+        (
+            (
+                job['prompt_id'],
+                clips[job['prompt_id']],
+                {'fingerprint': job['fingerprint'], 'mime': 'audio/mpeg', 'voice': job['voice']},
+            )
+            for job in jobs
+            if job['prompt_id'] in clips
+        ),
+    )
+
+    return {'reused': len(jobs) - len(pending), 'rendered': len(pending) - failed, 'failed': failed}
+
+
+def main():
+    """
+    Command line entry point for the prompt catalog compiler.
+    """
+    parser = argparse.ArgumentParser(description='Compile an IVR prompt catalog into a packed audio bundle.')
+    parser.add_argument('catalog', help='Catalog file (.csv, .yaml or .yml)')
+    parser.add_argument('bundle', help="Bundle base path; writes '<bundle>.bin' and '<bundle>.idx.json'")
+    parser.add_argument('--workers', type=int, default=4, help='Parallel render workers (default: 4)')
+    parser.add_argument('--pitch', default='default', help="SSML pitch, e.g. '+1st' (default: default)")
+    parser.add_argument('--rate', default='default', help="SSML rate, e.g. '-10%%' (default: default)")
+    args = parser.parse_args()
+
+    stats = compile_catalog(args.catalog, args.bundle, workers=args.workers, pitch=args.pitch, rate=args.rate)
+    print(f"✓ Bundle written to {args.bundle}: {stats['reused']} reused, "
+          f"{stats['rendered']} rendered, {stats['failed']} failed")
+    if stats['failed']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
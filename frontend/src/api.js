@@ -1,4 +1,5 @@
 import axios from 'axios';
+import { supabase } from './lib/supabaseClient';
 
 const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://localhost:5000';
 
@@ -9,6 +10,21 @@ const api = axios.create({
   },
 });
 
+// Signed-in requests carry the Supabase access token so the backend can
+// account usage and enforce quotas per user.
+const authHeaders = async () => {
+  const { data } = await supabase.auth.getSession();
+  const token = data?.session?.access_token;
+  return token ? { Authorization: `Bearer ${token}` } : {};
+};
+
+api.interceptors.request.use(async (config) => {
+  Object.entries(await authHeaders()).forEach(([name, value]) => {
+    config.headers[name] = value;
+  });
+  return config;
+});
+
 export const translateAndSpeak = async ({ text, targetLang, voiceGender, pitch = 0, speed = 0 }) => {
   try {
     const response = await api.post('/api/translate-and-speak', {
@@ -25,6 +41,71 @@ export const translateAndSpeak = async ({ text, targetLang, voiceGender, pitch =
   }
 };
 
+const parseSseChunk = (chunk) => {
+  let event = 'message';
+  const dataLines = [];
+  chunk.split('\n').forEach((line) => {
+    if (line.startsWith('event:')) {
+      event = line.slice(6).trim();
+    } else if (line.startsWith('data:')) {
+      dataLines.push(line.slice(5).trim());
+    }
+  });
+  return { event, data: dataLines.length ? JSON.parse(dataLines.join('\n')) : null };
+};
+
+// Streams detected language, per-sentence translations and audio segments as
+// server-sent events; onEvent(event, data) is called for each one in order.
+export const streamTranslateAndSpeak = async ({ text, targetLang, voiceGender, pitch = 0, speed = 0, onEvent }) => {
+  const response = await fetch(`${API_BASE_URL}/api/translate-and-speak/stream`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      Accept: 'text/event-stream',
+      ...(await authHeaders()),
+    },
+    body: JSON.stringify({
+      text,
+      target_lang: targetLang,
+      tts_engine: 'azure',
+      voice_gender: voiceGender,
+      rate: speed,
+      pitch,
+    }),
+  });
+
+  if (!response.ok || !response.body) {
+    let payload = null;
+    try {
+      payload = await response.json();
+    } catch (error) {
+      payload = null;
+    }
+    throw payload || `Request failed with status ${response.status}`;
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) {
+      break;
+    }
+    buffer += decoder.decode(value, { stream: true });
+    let boundary = buffer.indexOf('\n\n');
+    while (boundary !== -1) {
+      const chunk = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      if (chunk.trim()) {
+        const { event, data } = parseSseChunk(chunk);
+        onEvent(event, data);
+      }
+      boundary = buffer.indexOf('\n\n');
+    }
+  }
+};
+
 export const getLanguages = async () => {
   try {
     const response = await api.get('/api/languages');
@@ -1,9 +1,18 @@
-import React, { useEffect, useState } from 'react';
-import { translateAndSpeak, getLanguages, getAudioUrl, getDownloadUrl } from '../api';
+import React, { useEffect, useRef, useState } from 'react';
+import { streamTranslateAndSpeak, getLanguages, getAudioUrl } from '../api';
 import '../App.css';
 import { useAuth } from '../context/AuthContext';
 import { useNavigate } from 'react-router-dom';
 
+const decodeBase64 = (value) => {
+  const byteString = atob(value);
+  const byteArray = new Uint8Array(byteString.length);
+  for (let i = 0; i < byteString.length; i += 1) {
+    byteArray[i] = byteString.charCodeAt(i);
+  }
+  return byteArray;
+};
+
 function Dashboard() {
   const [inputMethod, setInputMethod] = useState('type');
   const [inputText, setInputText] = useState('');
@@ -18,12 +27,15 @@ function Dashboard() {
   const [uploadedFile, setUploadedFile] = useState(null);
   const [audioObjectUrl, setAudioObjectUrl] = useState(null);
   const [audioBlob, setAudioBlob] = useState(null);
+  // Sentence segments queued for playback while the rest is still streaming.
+  const playbackRef = useRef({ queue: [], playing: null });
 
   const { displayName, logout } = useAuth();
   const navigate = useNavigate();
 
   useEffect(() => {
     loadLanguages();
+    return () => stopStreamingPlayback();
   }, []);
 
   useEffect(
@@ -94,6 +106,37 @@ function Dashboard() {
     }
   };
 
+  const stopStreamingPlayback = () => {
+    const playback = playbackRef.current;
+    if (playback.playing) {
+      playback.playing.pause();
+      URL.revokeObjectURL(playback.playing.src);
+    }
+    playback.queue.forEach((url) => URL.revokeObjectURL(url));
+    playbackRef.current = { queue: [], playing: null };
+  };
+
+  const playNextSegment = () => {
+    const playback = playbackRef.current;
+    if (playback.playing || playback.queue.length === 0) {
+      return;
+    }
+    const url = playback.queue.shift();
+    const audio = new Audio(url);
+    playback.playing = audio;
+    const advance = () => {
+      URL.revokeObjectURL(url);
+      if (playbackRef.current !== playback) {
+        return;
+      }
+      playback.playing = null;
+      playNextSegment();
+    };
+    audio.onended = advance;
+    audio.onerror = advance;
+    audio.play().catch(advance);
+  };
+
   const handleGenerate = async () => {
     if (!inputText.trim()) {
       setStatus({ type: 'error', message: 'Please enter some text' });
@@ -110,6 +153,7 @@ function Dashboard() {
       setAudioObjectUrl(null);
     }
     setAudioBlob(null);
+    stopStreamingPlayback();
 
     setLoading(true);
     setStatus(null);
@@ -118,31 +162,53 @@ function Dashboard() {
     try {
       setStatus({ type: 'info', message: 'Detecting source language...' });
 
-      const response = await translateAndSpeak({
+      const sentences = [];
+      const segments = [];
+      let mimeType = 'audio/mpeg';
+      let finalResult = null;
+      let streamError = null;
+
+      await streamTranslateAndSpeak({
         text: inputText,
         targetLang: targetLanguage,
         voiceGender,
         pitch,
         speed,
+        onEvent: (event, data) => {
+          if (event === 'detected') {
+            setResult({ ...data, translated_text: '' });
+            setStatus({ type: 'info', message: `Translating from ${data.source_lang_name}...` });
+          } else if (event === 'translation') {
+            sentences[data.index] = data.text;
+            const translatedSoFar = sentences.filter(Boolean).join(' ');
+            setResult((previous) => previous && { ...previous, translated_text: translatedSoFar });
+          } else if (event === 'audio') {
+            const bytes = decodeBase64(data.audio_base64);
+            segments[data.index] = bytes;
+            mimeType = data.mime || mimeType;
+            playbackRef.current.queue.push(URL.createObjectURL(new Blob([bytes], { type: data.mime })));
+            playNextSegment();
+            setStatus({
+              type: 'info',
+              message: `Generating speech (${segments.filter(Boolean).length}/${sentences.length} sentences)...`,
+            });
+          } else if (event === 'done') {
+            finalResult = data;
+          } else if (event === 'error') {
+            streamError = data.error;
+          }
+        },
       });
 
-      if (response.success) {
-        if (response.audio_base64 && response.filename) {
-          const mimeType = response.filename.toLowerCase().endsWith('.wav') ? 'audio/wav' : 'audio/mpeg';
-          const byteString = atob(response.audio_base64);
-          const byteArray = new Uint8Array(byteString.length);
-          for (let i = 0; i < byteString.length; i += 1) {
-            byteArray[i] = byteString.charCodeAt(i);
-          }
-          const blob = new Blob([byteArray], { type: mimeType });
-          const objectUrl = URL.createObjectURL(blob);
-          setAudioBlob(blob);
-          setAudioObjectUrl(objectUrl);
-        }
-        setResult(response);
+      if (finalResult && !streamError) {
+        // The streamed segments already are the final clip; no second fetch needed.
+        const blob = new Blob(segments, { type: mimeType });
+        setAudioBlob(blob);
+        setAudioObjectUrl(URL.createObjectURL(blob));
+        setResult(finalResult);
         setStatus({ type: 'success', message: 'Audio generated successfully!' });
       } else {
-        setStatus({ type: 'error', message: response.error || 'Failed to generate audio' });
+        setStatus({ type: 'error', message: streamError || 'Failed to generate audio' });
       }
     } catch (error) {
       setStatus({
@@ -172,15 +238,7 @@ function Dashboard() {
 
   const handleDownload = async () => {
     try {
-      let blob = audioBlob;
-
-      if (!blob && result?.filename) {
-        const response = await fetch(getDownloadUrl(result.filename));
-        if (!response.ok) {
-          throw new Error(`Download failed with status ${response.status}`);
-        }
-        blob = await response.blob();
-      }
+      const blob = audioBlob;
 
       if (!blob) {
         setStatus({ type: 'error', message: 'No audio available to download yet.' });
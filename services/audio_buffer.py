@@ -0,0 +1,80 @@
+"""Audio bytes passed by reference from provider to persistence to response.
+
+An ``AudioBuffer`` is a read-only ``memoryview`` over either the in-memory
+clip a provider produced or an ``mmap`` of the file it was written to. Each
+request writes a clip to disk once and keeps using the same buffer for
+post-processing, caching and base64 encoding instead of reading the file
+back into a second copy, so peak memory per request stays close to one clip.
+
+Files are replaced atomically (write to a temporary file, then rename), so a
+buffer still mapping the previous version of a path stays valid.
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import tempfile
+from typing import Optional, Union
+
+from . import cpu_pool
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+
+class AudioBuffer:
+    """Read-only view of one clip, optionally backed by the file at ``path``."""
+
+    __slots__ = ("view", "path", "_mapping")
+
+    def __init__(self, data: BytesLike, path: Optional[str] = None, _mapping: Optional[mmap.mmap] = None):
+        self.view = data if isinstance(data, memoryview) else memoryview(data)
+        self.path = path
+        self._mapping = _mapping
+
+    @classmethod
+    def from_file(cls, path: str) -> "AudioBuffer":
+        """Map ``path`` read-only; pages are loaded on demand and shared with the page cache."""
+        with open(path, "rb") as file_handle:
+            if os.fstat(file_handle.fileno()).st_size == 0:
+                return cls(b"", path)
+            mapping = mmap.mmap(file_handle.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(memoryview(mapping), path, mapping)
+
+    @classmethod
+    def write(cls, data: BytesLike, path: str) -> "AudioBuffer":
+        """Persist ``data`` to ``path`` and return a buffer over the same memory."""
+        directory = os.path.dirname(path) or "."
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file_handle:
+                file_handle.write(data)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return cls(data, path)
+
+    def __len__(self) -> int:
+        return self.view.nbytes
+
+    def tobytes(self) -> bytes:
+        """Copy the clip out, for consumers that must own the bytes."""
+        return self.view.tobytes()
+
+    def b64encode(self) -> str:
+        return cpu_pool.b64encode(self.view)
+
+    def release(self) -> None:
+        """Drop the view and unmap the file; views handed out elsewhere keep it mapped."""
+        self.view.release()
+        if self._mapping is not None:
+            try:
+                self._mapping.close()
+            except BufferError:
+                # Still exported to another view; it is unmapped when that goes away.
+                pass
+            self._mapping = None
+
+
+__all__ = ["AudioBuffer"]
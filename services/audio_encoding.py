@@ -0,0 +1,287 @@
+"""Output audio formats and the single encode step for local engines.
+
+Supported output formats are MP3 (the default), Opus in an Ogg container
+(``"ogg"``, for bandwidth-constrained mobile and IVR clients) and WAV. Azure
+can produce Ogg/Opus natively; WAV from local engines is encoded once via
+pydub/ffmpeg into the negotiated format.
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import struct
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from pydub import AudioSegment
+
+AUDIO_MIME_TYPES = {
+    "mp3": "audio/mpeg",
+    "ogg": "audio/ogg",
+    "wav": "audio/wav",
+}
+
+# Aliases accepted in the request field.
+_FORMAT_ALIASES = {
+    "mpeg": "mp3",
+    "opus": "ogg",
+    "ogg_opus": "ogg",
+    "pcm": "wav",
+}
+
+DEFAULT_FORMAT = "mp3"
+
+# MPEG audio layer III bitrates (kbit/s) by header index, for MPEG-1 and MPEG-2/2.5.
+_MP3_BITRATES = {
+    3: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    0: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+
+# Opus granule positions always count 48 kHz samples.
+_OPUS_GRANULE_RATE = 48000
+
+
+def normalize_format(value: Optional[str]) -> Optional[str]:
+    """Map a requested format name onto a supported one, or None if unknown."""
+    if not value:
+        return None
+    value = value.strip().lower().lstrip(".")
+    value = _FORMAT_ALIASES.get(value, value)
+    return value if value in AUDIO_MIME_TYPES else None
+
+
+def mimetype_for(filename_or_format: str) -> str:
+    """MIME type for an output format or a file name carrying its extension."""
+    extension = os.path.splitext(filename_or_format)[1] or filename_or_format
+    return AUDIO_MIME_TYPES.get(normalize_format(extension) or DEFAULT_FORMAT)
+
+
+def encode_audio(audio_bytes: bytes, source_format: str, target_format: str) -> bytes:
+    """Re-encode audio into ``target_format``; a no-op when the formats match."""
+    source_format = normalize_format(source_format) or source_format
+    target_format = normalize_format(target_format) or DEFAULT_FORMAT
+    if source_format == target_format:
+        return audio_bytes
+
+    try:
+        segment = AudioSegment.from_file(io.BytesIO(audio_bytes), format=source_format)
+        buffer = io.BytesIO()
+        if target_format == "ogg":
+            segment.export(
+                buffer,
+                format="ogg",
+                codec="libopus",
+                bitrate=os.getenv("OPUS_BITRATE", "24k"),
+                parameters=["-application", "voip"],
+            )
+        else:
+            segment.export(buffer, format=target_format)
+        return buffer.getvalue()
+    except FileNotFoundError as exc:
+        raise RuntimeError(
+            f"Encoding {source_format} to {target_format} requires ffmpeg. Install it and ensure it's on PATH."
+        ) from exc
+
+
+def audio_duration(audio_bytes, audio_format: str) -> float:
+    """Playback length in seconds, read from container headers without decoding.
+
+    Assumes constant-bitrate MP3 (what Azure and ffmpeg produce here). Returns
+    0.0 when the headers cannot be read.
+    """
+    data = memoryview(audio_bytes).cast("B")
+    audio_format = normalize_format(audio_format) or audio_format
+    try:
+        if audio_format == "wav":
+            return _wav_duration(data)
+        if audio_format == "ogg":
+            return _ogg_duration(data)
+        if audio_format == "mp3":
+            return _mp3_duration(data)
+    except (struct.error, IndexError, ValueError, ZeroDivisionError):
+        pass
+    return 0.0
+
+
+def _wav_duration(data: memoryview) -> float:
+    offset, byte_rate = 12, 0
+    while offset + 8 <= len(data):
+        chunk_id = bytes(data[offset:offset + 4])
+        (size,) = struct.unpack_from("<I", data, offset + 4)
+        if chunk_id == b"fmt ":
+            (byte_rate,) = struct.unpack_from("<I", data, offset + 16)
+        elif chunk_id == b"data":
+            # Streamed RIFF output may leave the size unset (0 or 0xFFFFFFFF).
+            available = len(data) - offset - 8
+            return min(size or available, available) / byte_rate
+        offset += 8 + size + (size & 1)
+    return 0.0
+
+
+def _ogg_duration(data: memoryview) -> float:
+    # Clips joined before remuxing are chained streams: add up the last granule of each one.
+    last_granule: Dict[int, int] = {}
+    offset = 0
+    while offset + 27 <= len(data) and bytes(data[offset:offset + 4]) == b"OggS":
+        granule, serial = struct.unpack_from("<qI", data, offset + 6)
+        segments = data[offset + 26]
+        if granule >= 0:
+            last_granule[serial] = granule
+        offset += 27 + segments + sum(data[offset + 27:offset + 27 + segments])
+    return sum(last_granule.values()) / _OPUS_GRANULE_RATE
+
+
+def concat_ogg(segments: Sequence[bytes]) -> bytes:
+    """Remux Ogg/Opus clips into one logical stream.
+
+    The first clip's headers are kept and every later clip's audio pages are
+    appended under its serial number, with page sequence numbers, granule
+    positions and checksums rewritten, so players that stop at the end of
+    the first stream of a chained file play the whole clip. Clips that are
+    not single-stream Opus with matching channel layouts are chained
+    instead, which is still a valid Ogg file.
+    """
+    streams = [_read_opus_stream(bytes(segment)) for segment in segments]
+    if any(stream is None for stream in streams) or len({stream[0] for stream in streams}) > 1:
+        return b"".join(bytes(segment) for segment in segments)
+
+    serial = streams[0][1][0].serial
+    output = []
+    sequence = 0
+    offset = 0
+    for index, (_, pages, audio_start, samples) in enumerate(streams):
+        kept = pages if index == 0 else pages[audio_start:]
+        final_stream = index == len(streams) - 1
+        for position, page in enumerate(kept):
+            last_page = position == len(kept) - 1
+            granule = page.granule
+            if last_page and not final_stream:
+                # End trimming is only allowed on the final page of a stream,
+                # so an inner clip ends at the full length of its packets.
+                granule = offset + samples
+            elif granule >= 0:
+                granule += offset
+            flags = page.flags & ~_OGG_EOS
+            if final_stream and last_page:
+                flags |= _OGG_EOS
+            output.append(_ogg_page(flags, granule, serial, sequence, page.lacing, page.body))
+            sequence += 1
+        offset += samples
+    return b"".join(output)
+
+
+class _OggPage(NamedTuple):
+    flags: int
+    granule: int
+    serial: int
+    lacing: bytes
+    body: bytes
+
+
+_OGG_EOS = 0x04
+
+# Samples per Opus frame (48 kHz) by TOC configuration number.
+_OPUS_FRAME_SAMPLES = [480, 960, 1920, 2880] * 3 + [480, 960] * 2 + [120, 240, 480, 960] * 4
+
+
+def _read_opus_stream(data: bytes) -> Optional[Tuple[int, List[_OggPage], int, int]]:
+    """Parse one Ogg/Opus stream: (channels, pages, first audio page, decoded samples)."""
+    pages: List[_OggPage] = []
+    offset = 0
+    while offset < len(data):
+        if data[offset:offset + 4] != b"OggS" or offset + 27 > len(data):
+            return None
+        flags, granule, serial = struct.unpack_from("<BqI", data, offset + 5)
+        count = data[offset + 26]
+        lacing = data[offset + 27:offset + 27 + count]
+        body_start = offset + 27 + count
+        body_end = body_start + sum(lacing)
+        if body_end > len(data):
+            return None
+        pages.append(_OggPage(flags, granule, serial, lacing, data[body_start:body_end]))
+        offset = body_end
+    if not pages or len({page.serial for page in pages}) > 1 or not pages[0].body.startswith(b"OpusHead"):
+        return None
+
+    packets: List[bytes] = []
+    audio_start = None
+    partial = b""
+    for index, page in enumerate(pages):
+        if audio_start is None and len(packets) >= 2:
+            audio_start = index
+        position = 0
+        for size in page.lacing:
+            partial += page.body[position:position + size]
+            position += size
+            if size < 255:
+                packets.append(partial)
+                partial = b""
+    if audio_start is None or len(pages[0].body) < 10:
+        return None
+    samples = sum(_opus_packet_samples(packet) for packet in packets[2:])
+    return pages[0].body[9], pages, audio_start, samples
+
+
+def _opus_packet_samples(packet: bytes) -> int:
+    if not packet:
+        return 0
+    toc = packet[0]
+    code = toc & 0x03
+    if code == 0:
+        frames = 1
+    elif code in (1, 2):
+        frames = 2
+    else:
+        frames = packet[1] & 0x3F if len(packet) > 1 else 0
+    return _OPUS_FRAME_SAMPLES[toc >> 3] * frames
+
+
+def _ogg_crc_table() -> List[int]:
+    table = []
+    for index in range(256):
+        crc = index << 24
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x04C11DB7) if crc & 0x80000000 else crc << 1
+        table.append(crc & 0xFFFFFFFF)
+    return table
+
+
+_OGG_CRC_TABLE = _ogg_crc_table()
+
+
+def _ogg_page(flags: int, granule: int, serial: int, sequence: int, lacing: bytes, body: bytes) -> bytes:
+    header = bytearray(b"OggS\x00" + struct.pack("<BqIII", flags, granule, serial, sequence, 0))
+    header.append(len(lacing))
+    page = bytes(header) + bytes(lacing) + body
+    crc = 0
+    for byte in page:
+        crc = ((crc << 8) & 0xFFFFFFFF) ^ _OGG_CRC_TABLE[(crc >> 24) ^ byte]
+    return page[:22] + struct.pack("<I", crc) + page[26:]
+
+
+def _mp3_duration(data: memoryview) -> float:
+    offset = 0
+    if bytes(data[:3]) == b"ID3":
+        size = data[6] << 21 | data[7] << 14 | data[8] << 7 | data[9]
+        offset = 10 + size
+    while offset + 4 <= len(data):
+        if data[offset] == 0xFF and data[offset + 1] & 0xE0 == 0xE0:
+            version = (data[offset + 1] >> 3) & 0x03
+            bitrates = _MP3_BITRATES.get(version)
+            index = data[offset + 2] >> 4
+            if bitrates and 0 < index < len(bitrates):
+                return (len(data) - offset) * 8 / (bitrates[index] * 1000)
+        offset += 1
+    return 0.0
+
+
+__all__ = [
+    "AUDIO_MIME_TYPES",
+    "DEFAULT_FORMAT",
+    "audio_duration",
+    "concat_ogg",
+    "encode_audio",
+    "mimetype_for",
+    "normalize_format",
+]
@@ -0,0 +1,335 @@
+"""In-process audio post-processing over PCM buffers.
+
+One NumPy-vectorized chain per clip: trim head/tail silence, convert the
+sample rate, normalise integrated loudness (ITU-R BS.1770 / EBU R128 gating)
+and apply short fades. WAV runs through it directly. A clip converted
+between formats is processed in the same step as the conversion
+(``postprocess_and_encode``), which decodes and encodes it anyway. A clip
+already in the compressed format it is served in (Azure MP3/Ogg, OpenAI and
+gTTS MP3 served as MP3) is left as the provider made it: processing it would
+add an ffmpeg decode and encode that the native output does not need. Set
+AUDIO_POSTPROCESS_COMPRESSED=1 to process those too (Azure is then asked
+for PCM and encodes after the chain).
+
+Clips assembled from per-sentence segments are processed in two stages:
+each segment gets level and rate only (``PostProcessSettings.segment``), and
+trims and fades are applied once to the joined clip
+(``PostProcessSettings.edges``). Otherwise every sentence boundary would
+lose its pause and get a fade dip.
+
+The processing functions return ``ProcessedAudio``, which also reports how
+much leading audio the trim removed, so word timing tracks can be moved by
+the same amount.
+
+Configuration (environment):
+    AUDIO_POSTPROCESS             "0" disables the chain (default "1")
+    AUDIO_POSTPROCESS_COMPRESSED  "1" also processes MP3/Ogg served as-is (default "0")
+    AUDIO_TARGET_LUFS             integrated loudness target (default -16)
+    AUDIO_OUTPUT_SAMPLE_RATE      resample to this rate, 0 keeps the input rate
+    AUDIO_TRIM_DB                 silence threshold in dBFS (default -50)
+    AUDIO_FADE_MS                 fade in/out length (default 10)
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import wave
+from typing import NamedTuple, Optional, Tuple
+
+from .audio_encoding import encode_audio, normalize_format
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+
+# BS.1770 K-weighting: a high shelf followed by a high pass, described by
+# their analog parameters so the filters can be derived for any sample rate.
+_SHELF_GAIN_DB = 3.999843853973347
+_SHELF_FREQ = 1681.974450955533
+_SHELF_Q = 0.7071752369554196
+_HIGHPASS_FREQ = 38.13547087602444
+_HIGHPASS_Q = 0.5003270373238773
+
+_BLOCK_SECONDS = 0.4
+_BLOCK_STEP_SECONDS = 0.1
+_ABSOLUTE_GATE_LUFS = -70.0
+_RELATIVE_GATE_LU = -10.0
+# Sample-peak ceiling after gain, -1 dBFS.
+_PEAK_CEILING = 10 ** (-1.0 / 20)
+_TRIM_FRAME_SECONDS = 0.01
+
+
+def postprocessing_available() -> bool:
+    return np is not None
+
+
+class PostProcessSettings(NamedTuple):
+    target_lufs: Optional[float] = -16.0
+    sample_rate: Optional[int] = None
+    trim_db: Optional[float] = -50.0
+    fade_ms: float = 10.0
+
+    @classmethod
+    def from_env(cls) -> "PostProcessSettings":
+        sample_rate = int(os.getenv("AUDIO_OUTPUT_SAMPLE_RATE", "0"))
+        return cls(
+            target_lufs=float(os.getenv("AUDIO_TARGET_LUFS", "-16")),
+            sample_rate=sample_rate or None,
+            trim_db=float(os.getenv("AUDIO_TRIM_DB", "-50")),
+            fade_ms=float(os.getenv("AUDIO_FADE_MS", "10")),
+        )
+
+    def segment(self) -> "PostProcessSettings":
+        """The per-sentence stage: loudness and sample rate, no trims or fades."""
+        return self._replace(trim_db=None, fade_ms=0.0)
+
+    def edges(self) -> "PostProcessSettings":
+        """The joined-clip stage: trims and fades only."""
+        return self._replace(target_lufs=None, sample_rate=None)
+
+
+def _biquad_response(b, a, z):
+    return (b[0] + b[1] / z + b[2] / z ** 2) / (a[0] + a[1] / z + a[2] / z ** 2)
+
+
+def _k_weighting(num_samples: int, sample_rate: int) -> "np.ndarray":
+    """Complex K-weighting response on the rfft bins of a ``num_samples`` signal.
+
+    Coefficients follow the bilinear-transform derivation that reproduces the
+    BS.1770 48 kHz tables exactly and generalises them to other rates.
+    """
+    z = np.exp(2j * np.pi * np.fft.rfftfreq(num_samples, d=1.0 / sample_rate) / sample_rate)
+
+    k = np.tan(np.pi * _SHELF_FREQ / sample_rate)
+    high_gain = 10 ** (_SHELF_GAIN_DB / 20)
+    band_gain = high_gain ** 0.4996667741545416
+    a0 = 1 + k / _SHELF_Q + k * k
+    shelf = _biquad_response(
+        (
+            (high_gain + band_gain * k / _SHELF_Q + k * k) / a0,
+            2 * (k * k - high_gain) / a0,
+            (high_gain - band_gain * k / _SHELF_Q + k * k) / a0,
+        ),
+        (1.0, 2 * (k * k - 1) / a0, (1 - k / _SHELF_Q + k * k) / a0),
+        z,
+    )
+
+    k = np.tan(np.pi * _HIGHPASS_FREQ / sample_rate)
+    a0 = 1 + k / _HIGHPASS_Q + k * k
+    highpass = _biquad_response(
+        (1.0, -2.0, 1.0),
+        (1.0, 2 * (k * k - 1) / a0, (1 - k / _HIGHPASS_Q + k * k) / a0),
+        z,
+    )
+    return shelf * highpass
+
+
+def integrated_loudness(samples: "np.ndarray", sample_rate: int) -> float:
+    """Gated integrated loudness (LUFS) of ``(frames, channels)`` float audio."""
+    num_samples = samples.shape[0]
+    weighted = np.fft.irfft(
+        np.fft.rfft(samples, axis=0) * _k_weighting(num_samples, sample_rate)[:, None],
+        n=num_samples,
+        axis=0,
+    )
+    power = np.square(weighted).sum(axis=1)
+
+    block = min(num_samples, max(1, int(_BLOCK_SECONDS * sample_rate)))
+    step = max(1, int(_BLOCK_STEP_SECONDS * sample_rate))
+    cumulative = np.concatenate(([0.0], np.cumsum(power)))
+    starts = np.arange(0, num_samples - block + 1, step)
+    block_power = (cumulative[starts + block] - cumulative[starts]) / block
+
+    with np.errstate(divide="ignore"):
+        block_loudness = -0.691 + 10 * np.log10(block_power)
+    gated = block_power[block_loudness > _ABSOLUTE_GATE_LUFS]
+    if gated.size == 0:
+        return float("-inf")
+    relative_gate = -0.691 + 10 * np.log10(gated.mean()) + _RELATIVE_GATE_LU
+    gated = block_power[(block_loudness > _ABSOLUTE_GATE_LUFS) & (block_loudness > relative_gate)]
+    return float(-0.691 + 10 * np.log10(gated.mean()))
+
+
+class ProcessedAudio(NamedTuple):
+    """Post-processed audio and the leading samples (at ``input_rate``) the trim removed."""
+
+    audio: bytes
+    trimmed_samples: int = 0
+    input_rate: int = 0
+
+    @property
+    def trimmed_ms(self) -> int:
+        """How far the clip's content moved earlier, for shifting word timings."""
+        return int(round(1000 * self.trimmed_samples / self.input_rate)) if self.input_rate else 0
+
+
+def _trim(samples: "np.ndarray", sample_rate: int, trim_db: float) -> Tuple["np.ndarray", int]:
+    """Cut head/tail silence; returns the kept samples and how many were cut from the head."""
+    frame = max(1, int(_TRIM_FRAME_SECONDS * sample_rate))
+    num_frames = samples.shape[0] // frame
+    if num_frames == 0:
+        return samples, 0
+    frames = samples[: num_frames * frame].reshape(num_frames, frame, samples.shape[1])
+    rms = np.sqrt(np.square(frames).mean(axis=(1, 2)))
+    voiced = np.flatnonzero(rms > 10 ** (trim_db / 20))
+    if voiced.size == 0:
+        return samples, 0
+    # Keep one quiet frame either side so consonant onsets/offsets survive.
+    start = max(0, int(voiced[0]) - 1) * frame
+    end = min(samples.shape[0], (int(voiced[-1]) + 2) * frame)
+    return samples[start:end], start
+
+
+def _resample(samples: "np.ndarray", source_rate: int, target_rate: int) -> "np.ndarray":
+    """Band-limited rate conversion in the frequency domain.
+
+    The spectrum is cut at (or zero-padded to) the new Nyquist frequency, so
+    content the target rate cannot carry is removed instead of aliasing.
+    """
+    num_in = samples.shape[0]
+    num_out = max(1, int(round(num_in * target_rate / source_rate)))
+    spectrum = np.fft.rfft(samples, axis=0)
+    bins = num_out // 2 + 1
+    if bins <= spectrum.shape[0]:
+        spectrum = spectrum[:bins]
+    else:
+        padding = np.zeros((bins - spectrum.shape[0], samples.shape[1]), dtype=spectrum.dtype)
+        spectrum = np.concatenate([spectrum, padding])
+    return np.fft.irfft(spectrum, n=num_out, axis=0) * (num_out / num_in)
+
+
+def process_samples(
+    samples: "np.ndarray",
+    sample_rate: int,
+    settings: Optional[PostProcessSettings] = None,
+) -> Tuple["np.ndarray", int]:
+    """Run the chain over float ``(frames, channels)`` audio in [-1, 1]."""
+    settings = settings or PostProcessSettings.from_env()
+    if samples.shape[0] == 0:
+        return samples, sample_rate
+
+    if settings.trim_db is not None:
+        samples, _ = _trim(samples, sample_rate, settings.trim_db)
+
+    if settings.sample_rate and settings.sample_rate != sample_rate:
+        samples = _resample(samples, sample_rate, settings.sample_rate)
+        sample_rate = settings.sample_rate
+
+    if settings.target_lufs is not None:
+        loudness = integrated_loudness(samples, sample_rate)
+        if np.isfinite(loudness):
+            gain = 10 ** ((settings.target_lufs - loudness) / 20)
+            peak = float(np.max(np.abs(samples)))
+            if peak * gain > _PEAK_CEILING:
+                gain = _PEAK_CEILING / peak
+            samples = samples * gain
+
+    fade = min(int(sample_rate * settings.fade_ms / 1000), samples.shape[0] // 2)
+    if fade > 0:
+        ramp = np.linspace(0.0, 1.0, fade)[:, None]
+        samples = samples.copy()
+        samples[:fade] *= ramp
+        samples[-fade:] *= ramp[::-1]
+
+    return samples, sample_rate
+
+
+def process_wav(wav_bytes: bytes, settings: Optional[PostProcessSettings] = None) -> ProcessedAudio:
+    """Post-process a 16-bit PCM WAV clip; other encodings are returned unchanged."""
+    with wave.open(io.BytesIO(wav_bytes), "rb") as reader:
+        params = reader.getparams()
+        frames = reader.readframes(params.nframes)
+    if params.sampwidth != 2 or params.comptype != "NONE":
+        return ProcessedAudio(wav_bytes)
+
+    settings = settings or PostProcessSettings.from_env()
+    samples = np.frombuffer(frames, dtype="<i2").reshape(-1, params.nchannels).astype(np.float64) / 32768.0
+    trimmed = 0
+    if settings.trim_db is not None and samples.shape[0]:
+        samples, trimmed = _trim(samples, params.framerate, settings.trim_db)
+        settings = settings._replace(trim_db=None)
+    samples, sample_rate = process_samples(samples, params.framerate, settings)
+    pcm = np.clip(np.round(samples * 32767.0), -32768, 32767).astype("<i2")
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(params.nchannels)
+        writer.setsampwidth(2)
+        writer.setframerate(sample_rate)
+        writer.writeframes(pcm.tobytes())
+    return ProcessedAudio(buffer.getvalue(), trimmed, params.framerate)
+
+
+# Formats the chain can take; compressed ones are decoded first.
+_PCM_FORMATS = {"wav", "pcm"}
+_COMPRESSED_FORMATS = {"mp3", "ogg"}
+
+
+def _chain_enabled() -> bool:
+    return os.getenv("AUDIO_POSTPROCESS", "1") != "0" and postprocessing_available()
+
+
+def postprocess_applies(audio_format: Optional[str]) -> bool:
+    """True when clips kept in ``audio_format`` are post-processed.
+
+    Compressed formats only with AUDIO_POSTPROCESS_COMPRESSED=1; conversions
+    between formats are processed regardless (see ``postprocess_and_encode``).
+    """
+    if not _chain_enabled():
+        return False
+    audio_format = (audio_format or "").lower()
+    if audio_format in _COMPRESSED_FORMATS:
+        return os.getenv("AUDIO_POSTPROCESS_COMPRESSED", "0") == "1"
+    return audio_format in _PCM_FORMATS
+
+
+def postprocess_audio(
+    audio_bytes: bytes,
+    audio_format: Optional[str],
+    settings: Optional[PostProcessSettings] = None,
+) -> ProcessedAudio:
+    """Apply the chain in place of the clip's own format (compressed clips are re-encoded)."""
+    return postprocess_and_encode(audio_bytes, audio_format, audio_format, settings)
+
+
+def postprocess_and_encode(
+    audio_bytes: bytes,
+    source_format: Optional[str],
+    target_format: Optional[str],
+    settings: Optional[PostProcessSettings] = None,
+) -> ProcessedAudio:
+    """Decode, post-process and encode into ``target_format`` with a single encode.
+
+    Without post-processing this is ``encode_audio``. A conversion pays the
+    decode and encode anyway, so it is processed even where keeping the
+    format would not be. When the chain cannot run (no ffmpeg to decode, an
+    unreadable WAV) the audio is converted unprocessed.
+    """
+    source = normalize_format(source_format) or source_format
+    target = normalize_format(target_format) or source
+    converting = source != target and source in _PCM_FORMATS | _COMPRESSED_FORMATS
+    if not (postprocess_applies(source) or (converting and _chain_enabled())):
+        return ProcessedAudio(encode_audio(audio_bytes, source, target))
+    try:
+        wav_bytes = audio_bytes if source == "wav" else encode_audio(audio_bytes, source, "wav")
+        processed = process_wav(wav_bytes, settings)
+    except (RuntimeError, wave.Error, EOFError, ValueError) as exc:
+        print(f"⚠️ Skipping audio post-processing: {exc}")
+        return ProcessedAudio(encode_audio(audio_bytes, source, target))
+    return processed._replace(audio=encode_audio(processed.audio, "wav", target))
+
+
+__all__ = [
+    "PostProcessSettings",
+    "ProcessedAudio",
+    "integrated_loudness",
+    "postprocess_and_encode",
+    "postprocess_applies",
+    "postprocess_audio",
+    "postprocessing_available",
+    "process_samples",
+    "process_wav",
+]
@@ -0,0 +1,71 @@
+"""Request identity from Supabase access tokens.
+
+The React app signs users in with Supabase and sends the session's access
+token as ``Authorization: Bearer <token>``. The token is an HS256 JWT signed
+with the project's JWT secret; its ``sub`` claim is the stable user id used
+for usage accounting and fair scheduling.
+
+Verification needs PyJWT and ``SUPABASE_JWT_SECRET``. Without either, or for
+an invalid or expired token, the request is treated as anonymous.
+
+Server-to-server callers may instead send ``X-API-Key``. Only keys listed in
+``API_KEYS`` are accepted; an unknown key is ignored, so a client cannot mint
+fresh identities (and fresh quotas) by inventing keys.
+
+Configuration (environment):
+    SUPABASE_JWT_SECRET     HS256 secret for access tokens
+    SUPABASE_JWT_AUDIENCE   expected "aud" claim (default "authenticated")
+    API_KEYS                comma-separated accepted API keys (default none)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+import os
+from typing import Optional
+
+try:
+    import jwt
+except ImportError:  # pragma: no cover - optional dependency
+    jwt = None
+
+
+def verification_available() -> bool:
+    return jwt is not None and bool(os.getenv("SUPABASE_JWT_SECRET"))
+
+
+def user_from_authorization(header: Optional[str]) -> Optional[str]:
+    """Return the verified user id for an ``Authorization`` header, or None."""
+    scheme, _, token = (header or "").partition(" ")
+    if scheme.lower() != "bearer" or not token or not verification_available():
+        return None
+    try:
+        claims = jwt.decode(
+            token.strip(),
+            os.getenv("SUPABASE_JWT_SECRET"),
+            algorithms=["HS256"],
+            audience=os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated"),
+        )
+    except jwt.PyJWTError:
+        return None
+    return claims.get("sub") or None
+
+
+def key_id_for_api_key(api_key: Optional[str]) -> Optional[str]:
+    """Return a stable, non-secret id for a configured API key, or None."""
+    if not api_key:
+        return None
+    candidate = api_key.strip().encode("utf-8")
+    accepted = False
+    for known in os.getenv("API_KEYS", "").split(","):
+        known = known.strip()
+        # Compare against every key so timing does not reveal which one matched.
+        if known and hmac.compare_digest(candidate, known.encode("utf-8")):
+            accepted = True
+    if not accepted:
+        return None
+    return hashlib.sha1(candidate).hexdigest()[:12]
+
+
+__all__ = ["key_id_for_api_key", "user_from_authorization", "verification_available"]
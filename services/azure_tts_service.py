@@ -2,18 +2,23 @@
 Azure Text-to-Speech service integration.
 
 Provides utilities for synthesising speech using Azure Neural voices
-with SSML controls for pitch and speaking rate.
+with SSML controls for pitch and speaking rate. ``synthesize_speech`` returns
+the finished clip; ``stream_speech`` yields audio while Azure is still
+synthesizing.
 """
 
 from __future__ import annotations
 
 import os
-from typing import Dict, Tuple
+import time
+from types import MappingProxyType
+from typing import Dict, Iterator, List, Mapping, Tuple
 from xml.sax.saxutils import escape
-import io
-
-from pydub import AudioSegment
 
+from .audio_postprocess import PostProcessSettings, postprocess_and_encode, postprocess_applies
+from . import chunk_planner, cpu_pool, timings, tracing
+from .rate_limiter import RateLimitedError, get_limiter
+from .timings import TimedAudio, WordTiming
 
 try:
     import azure.cognitiveservices.speech as speechsdk
@@ -103,24 +108,48 @@ def _build_ssml(text: str, voice: str, pitch: str, rate: str) -> str:
         f'</speak>'
     )
     return ssml
-def _resolve_output_format() -> Tuple[int, str]:
-    """
-    Locate a supported Azure output format.
+# Bytes read from the SDK's audio stream per chunk yielded by stream_speech.
+_STREAM_READ_SIZE = 16 * 1024
 
-    Returns:
-        Tuple of (enum value, label) where label is either 'mp3' or 'pcm'.
-    """
-    preferred_mp3_formats = [
+# Azure output formats per requested format, most preferred first.
+_NATIVE_FORMATS = {
+    "mp3": [
         "Audio16Khz32KBitrateMonoMp3",
         "Audio24Khz48KBitrateMonoMp3",
         "Audio16Khz16KBitrateMonoMp3",
         "Audio16Khz128KBitrateMonoMp3",
         "Audio48Khz96KBitrateMonoMp3",
         "Audio48Khz192KBitrateMonoMp3",
-    ]
-    for attr_name in preferred_mp3_formats:
+    ],
+    "ogg": [
+        "Ogg16Khz16BitMonoOpus",
+        "Ogg24Khz16BitMonoOpus",
+        "Ogg48Khz16BitMonoOpus",
+    ],
+    "wav": [
+        "Riff24Khz16BitMonoPcm",
+        "Riff16Khz16BitMonoPcm",
+    ],
+}
+
+
+def _resolve_output_format(audio_format: str = "mp3", prefer_pcm: bool = False) -> Tuple[int, str]:
+    """
+    Locate a supported Azure output format.
+
+    Args:
+        audio_format: Requested output format ('mp3', 'ogg' or 'wav').
+        prefer_pcm: Ask for PCM even when Azure could encode ``audio_format``
+            itself, because the audio is post-processed before one local encode.
+
+    Returns:
+        Tuple of (enum value, label) where label is the requested format when
+        Azure produces it natively, otherwise 'pcm' (to be encoded locally).
+    """
+    native = _NATIVE_FORMATS.get(audio_format, []) if not prefer_pcm or audio_format == "wav" else []
+    for attr_name in native:
         if hasattr(speechsdk.SpeechSynthesisOutputFormat, attr_name):
-            return getattr(speechsdk.SpeechSynthesisOutputFormat, attr_name), "mp3"
+            return getattr(speechsdk.SpeechSynthesisOutputFormat, attr_name), audio_format
 
     pcm_fallbacks = [
         "Riff24Khz16BitMonoPcm",
@@ -132,70 +161,140 @@ def _resolve_output_format() -> Tuple[int, str]:
             return getattr(speechsdk.SpeechSynthesisOutputFormat, attr_name), "pcm"
 
     raise AttributeError(
-        "Azure Speech SDK does not expose MP3 or PCM output formats. "
+        f"Azure Speech SDK does not expose {audio_format.upper()} or PCM output formats. "
         "Please upgrade azure-cognitiveservices-speech."
     )
 
 
-def synthesize_speech(text: str, voice: str, pitch: str, rate: str) -> bytes:
+def _is_throttled(cancellation_details) -> bool:
+    """Return True when a cancellation was caused by Azure throttling."""
+    too_many_requests = getattr(speechsdk.CancellationErrorCode, "TooManyRequests", None)
+    if too_many_requests is not None and getattr(cancellation_details, "error_code", None) == too_many_requests:
+        return True
+    error_details = getattr(cancellation_details, "error_details", "") or ""
+    return "429" in error_details or "too many requests" in error_details.lower()
+
+
+def _speech_config(voice: str, audio_format: str, prefer_pcm: bool = False):
+    """Build the SpeechConfig for ``voice``; returns (config, format label)."""
+    speech_key = os.getenv("AZURE_SPEECH_KEY", "").strip()
+    speech_region = os.getenv("AZURE_SPEECH_REGION", "").strip()
+
+    if not speech_key or not speech_region:
+        raise RuntimeError(
+            "Azure Speech credentials are missing. Set AZURE_SPEECH_KEY and AZURE_SPEECH_REGION."
+        )
+
+    speech_config = speechsdk.SpeechConfig(subscription=speech_key, region=speech_region)
+    speech_config.speech_synthesis_voice_name = voice
+
+    try:
+        output_format, format_label = _resolve_output_format(audio_format, prefer_pcm)
+        speech_config.set_speech_synthesis_output_format(output_format)
+    except AttributeError as exc:
+        raise RuntimeError(str(exc)) from exc
+    return speech_config, format_label
+
+
+def _word_boundary_collector(words: List[WordTiming]):
+    """SDK callback appending word-boundary events to ``words`` (punctuation skipped)."""
+    boundary_types = getattr(speechsdk, "SpeechSynthesisBoundaryType", None)
+    punctuation = getattr(boundary_types, "Punctuation", None)
+
+    def _on_boundary(evt):
+        if punctuation is not None and getattr(evt, "boundary_type", None) == punctuation:
+            return
+        # audio_offset is in 100 ns ticks; duration is a timedelta.
+        start_ms = int(evt.audio_offset / 10_000)
+        duration = getattr(evt, "duration", None)
+        duration_ms = int(duration.total_seconds() * 1000) if hasattr(duration, "total_seconds") else 0
+        words.append(WordTiming(start_ms, start_ms + duration_ms, evt.text))
+
+    return _on_boundary
+
+
+def synthesize_speech(text: str, voice: str, pitch: str, rate: str, audio_format: str = "mp3") -> bytes:
     """
     Convert text to speech using Azure Cognitive Services.
 
+    See ``synthesize_speech_timed`` for the same call with word timings.
+
     Args:
         text: Input text for synthesis.
         voice: Azure neural voice name (e.g. "hi-IN-SwaraNeural").
         pitch: SSML pitch adjustment (e.g. "+2st").
         rate: SSML rate adjustment (e.g. "-10%").
+        audio_format: Output format: 'mp3' (default), 'ogg' (Opus) or 'wav'.
 
     Returns:
-        bytes: Audio data in MP3 format.
+        bytes: Audio data in the requested format.
 
     Raises:
         RuntimeError: If credentials are missing or synthesis fails.
+        AdmissionTimeout: If the Azure quota could not admit the request in time.
     """
-    if not text.strip():
-        raise ValueError("Cannot synthesise empty text.")
+    return synthesize_speech_timed(text, voice, pitch, rate, audio_format).audio
 
-    speech_key = os.getenv("AZURE_SPEECH_KEY", "").strip()
-    speech_region = os.getenv("AZURE_SPEECH_REGION", "").strip()
 
-    if not speech_key or not speech_region:
-        raise RuntimeError(
-            "Azure Speech credentials are missing. Set AZURE_SPEECH_KEY and AZURE_SPEECH_REGION."
-        )
+def synthesize_speech_timed(text: str, voice: str, pitch: str, rate: str, audio_format: str = "mp3") -> TimedAudio:
+    """
+    Synthesize like ``synthesize_speech`` and keep Azure's word-boundary events.
 
-    speech_config = speechsdk.SpeechConfig(subscription=speech_key, region=speech_region)
-    speech_config.speech_synthesis_voice_name = voice
+    The result is one segment of a larger clip, so post-processing covers
+    level and sample rate only; trims and fades belong to the joined clip
+    (see ``audio_postprocess``). WAV is processed; MP3 and Ogg come back
+    natively and unprocessed unless AUDIO_POSTPROCESS_COMPRESSED=1, in
+    which case Azure is asked for PCM and the processed audio is encoded once.
 
-    try:
-        output_format, format_label = _resolve_output_format()
-        speech_config.set_speech_synthesis_output_format(output_format)
-    except AttributeError as exc:
-        raise RuntimeError(str(exc)) from exc
+    Returns:
+        TimedAudio: The audio and one ``WordTiming`` per spoken word, offset
+        from the start of the clip.
+    """
+    if not text.strip():
+        raise ValueError("Cannot synthesise empty text.")
 
+    speech_config, format_label = _speech_config(voice, audio_format, prefer_pcm=postprocess_applies(audio_format))
     ssml = _build_ssml(text=text, voice=voice, pitch=pitch, rate=rate)
 
     # audio_config=None ensures the audio is returned in-memory.
     synthesizer = speechsdk.SpeechSynthesizer(speech_config=speech_config, audio_config=None)
-    result = synthesizer.speak_ssml_async(ssml).get()
+    words: List[WordTiming] = []
+    synthesizer.synthesis_word_boundary.connect(_word_boundary_collector(words))
+
+    def _speak():
+        # A retried call reports its boundaries again.
+        del words[:]
+        started = time.perf_counter()
+        speak_result = synthesizer.speak_ssml_async(ssml).get()
+        if speak_result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
+            chunk_planner.observe("azure", len(text), time.perf_counter() - started)
+        if speak_result.reason == speechsdk.ResultReason.Canceled and _is_throttled(
+            speak_result.cancellation_details
+        ):
+            raise RateLimitedError("Azure speech synthesis was throttled (HTTP 429).")
+        return speak_result
+
+    with tracing.span("azure_tts", voice=voice, chars=len(text), format=audio_format):
+        result = get_limiter("azure").call(_speak, chars=len(text))
 
     if result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
         audio_bytes = result.audio_data
-        if format_label == "pcm":
+        words = sorted(words)
+        if format_label in {"pcm", "wav"}:
             try:
-                wav_stream = io.BytesIO(audio_bytes)
-                audio_segment = AudioSegment.from_file(wav_stream, format="wav")
-                mp3_buffer = io.BytesIO()
-                audio_segment.export(mp3_buffer, format="mp3")
-                audio_bytes = mp3_buffer.getvalue()
-            except FileNotFoundError as exc:
-                raise RuntimeError(
-                    "MP3 conversion requires ffmpeg or avlib to be installed. "
-                    "Install it and ensure it's on PATH."
-                ) from exc
+                processed = cpu_pool.run_on_buffer(
+                    postprocess_and_encode, audio_bytes, "wav", audio_format, PostProcessSettings.from_env().segment()
+                )
+            except RuntimeError:
+                raise
             except Exception as exc:  # pragma: no cover - conversion edge cases
-                raise RuntimeError(f"Failed to convert PCM audio to MP3: {exc}") from exc
-        return audio_bytes
+                raise RuntimeError(f"Failed to convert PCM audio to {audio_format.upper()}: {exc}") from exc
+            audio_bytes = processed.audio
+            # Boundaries were reported against the untrimmed audio.
+            if processed.trimmed_ms:
+                words = timings.shift(words, -processed.trimmed_ms)
+        tracing.note("azure_tts", nbytes=len(audio_bytes))
+        return TimedAudio(audio_bytes, words)
 
     if result.reason == speechsdk.ResultReason.Canceled:
         cancellation_details = result.cancellation_details
@@ -205,42 +304,128 @@ def synthesize_speech(text: str, voice: str, pitch: str, rate: str) -> bytes:
     raise RuntimeError(f"Azure speech synthesis failed with reason: {result.reason}")
 
 
+def stream_speech(text: str, voice: str, pitch: str, rate: str, audio_format: str = "mp3") -> Iterator[bytes]:
+    """
+    Yield audio for ``text`` in chunks as Azure produces it.
+
+    Synthesis is started with ``start_speaking_ssml_async`` and the audio is
+    read from an ``AudioDataStream`` over the in-progress result, so the first
+    chunk arrives after Azure's first-byte latency rather than after the whole
+    clip. The concatenated chunks equal what ``synthesize_speech`` returns.
+    The request holds its Azure admission (rate limiter slot, 429 retries on
+    start) until the stream is exhausted or closed.
+
+    WAV and formats Azure cannot produce natively are post-processed as a
+    whole, so for those the finished clip is yielded as a single chunk.
+
+    Raises:
+        RuntimeError: If credentials are missing or synthesis fails, including
+            a cancellation part-way through the stream.
+        AdmissionTimeout: If the Azure quota could not admit the request in time.
+    """
+    if not text.strip():
+        raise ValueError("Cannot synthesise empty text.")
+
+    speech_config, format_label = _speech_config(voice, audio_format)
+    if format_label in {"pcm", "wav"}:
+        yield synthesize_speech(text=text, voice=voice, pitch=pitch, rate=rate, audio_format=audio_format)
+        return
+
+    ssml = _build_ssml(text=text, voice=voice, pitch=pitch, rate=rate)
+    synthesizer = speechsdk.SpeechSynthesizer(speech_config=speech_config, audio_config=None)
+
+    def _start():
+        start_result = synthesizer.start_speaking_ssml_async(ssml).get()
+        if start_result.reason == speechsdk.ResultReason.Canceled and _is_throttled(
+            start_result.cancellation_details
+        ):
+            raise RateLimitedError("Azure speech synthesis was throttled (HTTP 429).")
+        return start_result
+
+    # The admission slot is held until the last chunk is read (or the consumer
+    # closes the generator): Azure keeps synthesizing for this request until then.
+    # Streamed calls are not fed to chunk_planner, whose latency model would
+    # otherwise include however slowly the client reads.
+    with get_limiter("azure").hold(_start, chars=len(text)) as result:
+        # The span covers admission up to the first chunk (time to first byte).
+        with tracing.span("azure_tts", voice=voice, chars=len(text), format=audio_format, streamed=True):
+            if result.reason == speechsdk.ResultReason.Canceled:
+                error_details = getattr(result.cancellation_details, "error_details", "No error details provided.")
+                raise RuntimeError(f"Azure speech synthesis cancelled: {error_details}")
+            stream = speechsdk.AudioDataStream(result)
+            buffer = bytes(_STREAM_READ_SIZE)
+            filled = stream.read_data(buffer)
+
+        total = 0
+        finished = False
+        try:
+            while filled:
+                total += filled
+                yield buffer[:filled]
+                filled = stream.read_data(buffer)
+            finished = True
+        finally:
+            if not finished:
+                # The consumer went away (client disconnect): stop paying for audio.
+                stop = getattr(synthesizer, "stop_speaking_async", None)
+                if stop is not None:
+                    try:
+                        stop().get()
+                    except Exception as exc:  # pragma: no cover - best effort
+                        print(f"⚠️ Unable to stop Azure synthesis: {exc}")
+
+    if stream.status == speechsdk.StreamStatus.Canceled:
+        details = getattr(stream, "cancellation_details", None)
+        error_details = getattr(details, "error_details", None) or "No error details provided."
+        raise RuntimeError(f"Azure speech synthesis cancelled mid-stream: {error_details}")
+    tracing.note("azure_tts", nbytes=total)
+
+
+# Precomputed once: non-empty gender->voice mappings per language.
+_AVAILABLE_GENDERS: Dict[str, Mapping[str, str]] = {
+    language: MappingProxyType({gender: voice for gender, voice in voices.items() if voice})
+    for language, voices in AZURE_VOICES.items()
+}
+
+
 def get_voice_for_gender(language: str, gender: str) -> str:
     """
     Resolve the Azure voice for the requested language and gender.
 
-    Falls back to the first available gender if the requested one is missing.
+    Falls back to the first available gender if the requested one is missing
+    or is not a string (request payloads are passed through as-is).
     """
-    voices = AZURE_VOICES.get(language, {})
-    if not voices:
+    voices = _AVAILABLE_GENDERS.get(language) if isinstance(language, str) else None
+    if voices is None:
         raise KeyError(f"No Azure voices configured for '{language}'.")
 
-    gender_key = (gender or "").lower()
-    if gender_key in voices and voices[gender_key]:
+    gender_key = gender.strip().lower() if isinstance(gender, str) else ""
+    if gender_key in voices:
         return voices[gender_key]
 
     # Prefer female fallback, then male, otherwise first voice.
-    if "female" in voices and voices["female"]:
-        return voices["female"]
-    if "male" in voices and voices["male"]:
-        return voices["male"]
+    for fallback in ("female", "male"):
+        if fallback in voices:
+            return voices[fallback]
 
     # Return arbitrary voice to avoid total failure.
     for voice_name in voices.values():
-        if voice_name:
-            return voice_name
+        return voice_name
 
     raise KeyError(f"No valid Azure voices configured for '{language}'.")
 
 
-def get_available_genders(language: str) -> Dict[str, str]:
-    """Return the gender->voice mapping for the provided language."""
-    return {
-        gender: voice
-        for gender, voice in AZURE_VOICES.get(language, {}).items()
-        if voice
-    }
+def get_available_genders(language: str) -> Mapping[str, str]:
+    """Return the (read-only) gender->voice mapping for the provided language."""
+    return _AVAILABLE_GENDERS.get(language, MappingProxyType({}))
 
 
-__all__ = ["AZURE_VOICES", "synthesize_speech", "get_voice_for_gender", "get_available_genders"]
+__all__ = [
+    "AZURE_VOICES",
+    "stream_speech",
+    "synthesize_speech",
+    "synthesize_speech_timed",
+    "get_voice_for_gender",
+    "get_available_genders",
+]
 
@@ -0,0 +1,211 @@
+"""Adaptive chunk sizing for long-text synthesis.
+
+Each provider's synthesis latency is modelled as ``a + b * chars``: ``a`` is
+the fixed cost of a call (connection setup, SSML parsing, model warm-up) and
+``b`` the marginal cost per character. Providers whose texts are planned
+here (Azure, through the sentence pipeline) report every successful call
+through ``observe`` and the coefficients are refitted by exponentially
+weighted least squares, so the model follows a provider as it speeds up or
+slows down. Engines that synthesize a whole text in one call (Piper, OpenAI)
+are not planned and do not report.
+
+``ChunkPlanner.plan`` groups consecutive sentences into the number of chunks
+with the lowest predicted end-to-end time, given the parallelism available
+(pipeline workers and the provider's concurrency limit) and its request
+quota. A high fixed cost favours a few large chunks; a near-linear provider
+favours many small chunks that run in parallel and cache at sentence
+granularity. The sentence pipeline stores each text's first plan in the
+shared cache, so every process reuses the chunk boundaries the text's audio
+was cached under.
+
+Configuration (environment):
+    CHUNK_ADAPTIVE     "0" keeps one call per sentence (default "1")
+    CHUNK_MAX_CHARS    largest chunk built from several sentences (default 2000)
+    CHUNK_MODEL_DECAY  weight an observation keeps per newer one (default 0.9)
+"""
+
+from __future__ import annotations
+
+import heapq
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .rate_limiter import get_limiter
+
+# (seconds per call, seconds per character) used until a provider has been observed.
+_PRIORS: Dict[str, Tuple[float, float]] = {
+    "azure": (0.4, 0.002),
+}
+_DEFAULT_PRIOR = (0.2, 0.002)
+
+# Effective number of observations before the fit replaces the prior.
+_MIN_WEIGHT = 3.0
+
+# Plans remembered per (provider, sentences), so repeating a text reuses the
+# chunk boundaries its audio was cached under.
+_PLAN_MEMO_SIZE = 512
+
+# Plans predicted within this fraction of the best are considered equal; the
+# one with more chunks wins, since it caches and streams at finer grain.
+_TIE_TOLERANCE = 0.05
+
+
+class LatencyModel:
+    """Exponentially weighted least-squares fit of latency against characters."""
+
+    def __init__(self, prior: Tuple[float, float], decay: float):
+        self.prior = prior
+        self.decay = decay
+        self._weight = self._sum_x = self._sum_y = self._sum_xx = self._sum_xy = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, chars: int, seconds: float) -> None:
+        with self._lock:
+            decay = self.decay
+            self._weight = self._weight * decay + 1.0
+            self._sum_x = self._sum_x * decay + chars
+            self._sum_y = self._sum_y * decay + seconds
+            self._sum_xx = self._sum_xx * decay + chars * chars
+            self._sum_xy = self._sum_xy * decay + chars * seconds
+
+    def coefficients(self) -> Tuple[float, float]:
+        """Return ``(seconds per call, seconds per character)``."""
+        with self._lock:
+            weight, sum_x, sum_y = self._weight, self._sum_x, self._sum_y
+            sum_xx, sum_xy = self._sum_xx, self._sum_xy
+        if weight < _MIN_WEIGHT:
+            return self.prior
+
+        mean_x, mean_y = sum_x / weight, sum_y / weight
+        variance = sum_xx / weight - mean_x * mean_x
+        if variance <= 1e-6 * max(1.0, mean_x * mean_x):
+            # Every call had about the same length: keep the prior slope and
+            # fit the fixed cost to what was observed.
+            per_char = self.prior[1]
+        else:
+            per_char = max(0.0, (sum_xy / weight - mean_x * mean_y) / variance)
+        return max(0.0, mean_y - per_char * mean_x), per_char
+
+    def predict(self, chars: int) -> float:
+        per_call, per_char = self.coefficients()
+        return per_call + per_char * chars
+
+
+def _group(sentences: Sequence[str], count: int) -> List[List[str]]:
+    """Split sentences, in order, into at most ``count`` groups of similar length."""
+    total = sum(len(sentence) for sentence in sentences) or 1
+    groups: List[List[str]] = [[] for _ in range(count)]
+    position = 0
+    for sentence in sentences:
+        # Assign by the sentence's midpoint so long sentences land where most of them falls.
+        index = min(count - 1, int((position + len(sentence) / 2) * count / total))
+        groups[index].append(sentence)
+        position += len(sentence)
+    return [group for group in groups if group]
+
+
+class ChunkPlanner:
+    """Per-provider latency models and the chunking decisions based on them."""
+
+    def __init__(self, decay: Optional[float] = None, max_chars: Optional[int] = None):
+        self.decay = decay if decay is not None else float(os.getenv("CHUNK_MODEL_DECAY", "0.9"))
+        self.max_chars = max_chars or int(os.getenv("CHUNK_MAX_CHARS", "2000"))
+        self._models: Dict[str, LatencyModel] = {}
+        self._plans: "OrderedDict[Tuple[str, Tuple[str, ...]], List[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def model(self, provider: str) -> LatencyModel:
+        with self._lock:
+            model = self._models.get(provider)
+            if model is None:
+                model = LatencyModel(_PRIORS.get(provider, _DEFAULT_PRIOR), self.decay)
+                self._models[provider] = model
+            return model
+
+    def observe(self, provider: str, chars: int, seconds: float) -> None:
+        self.model(provider).observe(chars, seconds)
+
+    def plan(self, sentences: Sequence[str], provider: str, max_parallel: int) -> List[str]:
+        """Join consecutive sentences into the chunks to synthesize, in order."""
+        sentences = list(sentences)
+        if len(sentences) <= 1:
+            return sentences
+
+        memo_key = (provider, tuple(sentences))
+        with self._lock:
+            remembered = self._plans.get(memo_key)
+            if remembered is not None:
+                self._plans.move_to_end(memo_key)
+                return list(remembered)
+
+        chunks = self._plan(sentences, provider, max_parallel)
+        with self._lock:
+            self._plans[memo_key] = chunks
+            while len(self._plans) > _PLAN_MEMO_SIZE:
+                self._plans.popitem(last=False)
+        return list(chunks)
+
+    def _plan(self, sentences: List[str], provider: str, max_parallel: int) -> List[str]:
+        limiter = get_limiter(provider)
+        parallel = max(1, min(max_parallel, limiter.max_concurrency))
+        per_call, per_char = self.model(provider).coefficients()
+
+        candidates = []
+        for count in range(1, len(sentences) + 1):
+            groups = _group(sentences, count)
+            if any(len(group) > 1 and sum(map(len, group)) > self.max_chars for group in groups):
+                continue
+            cost = self._makespan([sum(map(len, group)) for group in groups], per_call, per_char, parallel, limiter)
+            candidates.append((cost, len(groups), groups))
+        if not candidates:
+            return sentences
+
+        best_cost = min(cost for cost, _, _ in candidates)
+        _, _, groups = max(
+            (candidate for candidate in candidates if candidate[0] <= best_cost * (1 + _TIE_TOLERANCE)),
+            key=lambda candidate: candidate[1],
+        )
+        return [" ".join(group) for group in groups]
+
+    @staticmethod
+    def _makespan(chunk_chars: Sequence[int], per_call: float, per_char: float, parallel: int, limiter) -> float:
+        """Predicted time until the last chunk is back, dispatching chunks in order."""
+        bucket = limiter.requests
+        workers = [0.0] * min(parallel, len(chunk_chars))
+        finish = 0.0
+        for index, chars in enumerate(chunk_chars):
+            start = heapq.heappop(workers)
+            if bucket is not None and bucket.rate > 0:
+                # Requests beyond the bucket's burst wait for it to refill.
+                start = max(start, max(0.0, index + 1 - bucket.capacity) / bucket.rate)
+            end = start + per_call + per_char * chars
+            heapq.heappush(workers, end)
+            finish = max(finish, end)
+        return finish
+
+
+_planner: Optional[ChunkPlanner] = None
+_planner_lock = threading.Lock()
+
+
+def get_planner() -> ChunkPlanner:
+    """Return the process-wide planner shared by providers and the sentence pipeline."""
+    global _planner
+    with _planner_lock:
+        if _planner is None:
+            _planner = ChunkPlanner()
+        return _planner
+
+
+def observe(provider: str, chars: int, seconds: float) -> None:
+    """Record the latency of one successful synthesis call."""
+    get_planner().observe(provider, chars, seconds)
+
+
+def adaptive_chunking_enabled() -> bool:
+    return os.getenv("CHUNK_ADAPTIVE", "1") != "0"
+
+
+__all__ = ["ChunkPlanner", "LatencyModel", "adaptive_chunking_enabled", "get_planner", "observe"]
@@ -0,0 +1,159 @@
+"""Process pool for CPU-bound stages.
+
+Language detection, audio post-processing, re-encoding and base64 encoding of
+large clips are pure CPU work; run in request threads they serialize on the
+GIL, so one gunicorn worker never uses more than one core. ``run`` and
+``run_on_buffer`` hand such calls to a shared ``ProcessPoolExecutor`` and
+block the calling thread until the result is back, leaving request threads to
+orchestrate I/O.
+
+Audio moves through ``multiprocessing.shared_memory`` rather than being
+pickled through the executor's pipe: the caller copies the input into a
+shared block, the worker writes a large bytes result (or the leading bytes
+field of a named-tuple result, e.g. ``ProcessedAudio``) into a block of its
+own, and the caller copies it out and unlinks both.
+
+Configuration (environment):
+    CPU_POOL_WORKERS       worker processes; 0 (default) runs stages inline
+    CPU_POOL_MIN_BYTES     buffers smaller than this stay inline (default 64 KiB)
+    CPU_POOL_START_METHOD  multiprocessing start method (default "forkserver")
+"""
+
+from __future__ import annotations
+
+import base64
+import multiprocessing
+import os
+import pickle
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Callable, NamedTuple, Optional
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def pool_size() -> int:
+    return max(0, int(os.getenv("CPU_POOL_WORKERS", "0")))
+
+
+def _min_bytes() -> int:
+    return int(os.getenv("CPU_POOL_MIN_BYTES", str(64 * 1024)))
+
+
+def _executor() -> Optional[ProcessPoolExecutor]:
+    global _pool, _pool_pid
+    workers = pool_size()
+    if workers == 0:
+        return None
+    with _pool_lock:
+        # Each gunicorn worker owns its pool; never reuse one inherited over fork.
+        if _pool is None or _pool_pid != os.getpid():
+            context = multiprocessing.get_context(os.getenv("CPU_POOL_START_METHOD", "forkserver"))
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+            _pool_pid = os.getpid()
+    return _pool
+
+
+class _SharedResult(NamedTuple):
+    """A worker's bytes result left in a shared memory block for the caller."""
+
+    name: str
+    size: int
+
+    def take(self) -> bytes:
+        block = shared_memory.SharedMemory(name=self.name)
+        try:
+            return bytes(block.buf[: self.size])
+        finally:
+            block.close()
+            block.unlink()
+
+
+def _portable(exc: Exception) -> Exception:
+    # Exceptions that cannot be unpickled in the parent would break the whole
+    # pool, so those are reported as RuntimeError with the original message.
+    try:
+        pickle.loads(pickle.dumps(exc))
+        return exc
+    except Exception:
+        return RuntimeError(f"{type(exc).__name__}: {exc}")
+
+
+def _run(fn: Callable, args: tuple) -> Any:
+    try:
+        return fn(*args)
+    except Exception as exc:
+        raise _portable(exc) from None
+
+
+def _run_shared(fn: Callable, name: str, size: int, args: tuple) -> Any:
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        data = bytes(block.buf[:size])
+    finally:
+        block.close()
+
+    result = _run(fn, (data,) + args)
+    if _is_named_audio(result):
+        return result._replace(**{result._fields[0]: _share(result[0])})
+    return _share(result)
+
+
+def _is_named_audio(result: Any) -> bool:
+    """A named tuple whose first field is audio (``ProcessedAudio``), shared like plain bytes."""
+    return (
+        isinstance(result, tuple)
+        and hasattr(result, "_fields")
+        and len(result) > 0
+        and isinstance(result[0], (bytes, bytearray, _SharedResult))
+    )
+
+
+def _share(result: Any) -> Any:
+    if not isinstance(result, (bytes, bytearray)) or not result or len(result) < _min_bytes():
+        return result
+
+    output = shared_memory.SharedMemory(create=True, size=len(result))
+    output.buf[: len(result)] = result
+    output.close()
+    # The caller unlinks the block after copying it out; keep this process's
+    # resource tracker from reclaiming it first.
+    resource_tracker.unregister(output._name, "shared_memory")
+    return _SharedResult(output.name, len(result))
+
+
+def run(fn: Callable, *args: Any) -> Any:
+    """Call module-level ``fn(*args)`` in the pool, or inline when it is disabled."""
+    executor = _executor()
+    if executor is None:
+        return fn(*args)
+    return executor.submit(_run, fn, args).result()
+
+
+def run_on_buffer(fn: Callable, data: bytes, *args: Any) -> Any:
+    """Call ``fn(data, *args)`` in the pool, passing ``data`` through shared memory."""
+    executor = _executor()
+    if executor is None or not data or len(data) < _min_bytes():
+        return fn(data, *args)
+
+    block = shared_memory.SharedMemory(create=True, size=len(data))
+    try:
+        block.buf[: len(data)] = data
+        result = executor.submit(_run_shared, fn, block.name, len(data), args).result()
+    finally:
+        block.close()
+        block.unlink()
+    if _is_named_audio(result) and isinstance(result[0], _SharedResult):
+        return result._replace(**{result._fields[0]: result[0].take()})
+    return result.take() if isinstance(result, _SharedResult) else result
+
+
+def b64encode(data: bytes) -> str:
+    """Base64-encode ``data`` to text, off the request thread for large clips."""
+    return run_on_buffer(base64.b64encode, data).decode("utf-8")
+
+
+__all__ = ["b64encode", "pool_size", "run", "run_on_buffer"]
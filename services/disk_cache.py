@@ -0,0 +1,303 @@
+"""Host-wide byte cache shared by every worker process.
+
+Entries live in a SQLite index (WAL mode, so readers never block each other
+or the writer) plus a blob directory for values too large to keep inline.
+Blobs are written to a temporary file and renamed into place before the index
+row is committed, so a reader never sees a half-written value. Total size is
+bounded by least-recently-used eviction, entries expire after a TTL, and a
+corrupt index is moved aside and rebuilt rather than failing requests.
+
+Only confirmed corruption triggers a rebuild: a locked or otherwise
+transient ``OperationalError`` is treated as a miss, and any other database
+error is checked with ``PRAGMA integrity_check`` first. The rebuild runs
+under a file lock in the cache directory so exactly one worker on the host
+performs it; every connection notices the new index file and reopens.
+
+Enable it by pointing ``SHARED_CACHE_DIR`` at a directory on local disk; all
+gunicorn workers on the host then share one warm cache.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows has no flock
+    fcntl = None
+
+# Values up to this size are stored in the index itself.
+_INLINE_LIMIT = 16 * 1024
+
+# Evict down to this fraction of the budget so eviction is not run per write.
+_EVICT_TARGET = 0.9
+
+# Minimum seconds between size/TTL sweeps from one process.
+_EVICT_INTERVAL = 1.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    value BLOB,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+"""
+
+
+class DiskCache:
+    """SQLite + blob directory cache with the ``get``/``set`` interface of ``LRUByteCache``."""
+
+    def __init__(self, directory: str, max_bytes: int, ttl_seconds: Optional[float] = None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds or None
+        self.index_path = os.path.join(directory, "index.sqlite3")
+        self.blob_dir = os.path.join(directory, "blobs")
+        self.lock_path = os.path.join(directory, "recover.lock")
+        os.makedirs(self.blob_dir, exist_ok=True)
+
+        self._local = threading.local()
+        self._recover_lock = threading.Lock()
+        self._last_evict = 0.0
+        try:
+            self._connection().executescript(_SCHEMA)
+        except sqlite3.DatabaseError as exc:
+            self._recover(exc)
+
+    def _index_identity(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.index_path)
+        except OSError:
+            return None
+        return stat.st_dev, stat.st_ino
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread, reopened after a fork (gunicorn --preload)
+        # and after any worker has rebuilt the index under a new inode.
+        connection = getattr(self._local, "connection", None)
+        identity = self._index_identity()
+        if connection is not None and (self._local.pid != os.getpid() or self._local.identity != identity):
+            if self._local.pid == os.getpid():
+                connection.close()
+            connection = None
+        if connection is None:
+            connection = sqlite3.connect(self.index_path, timeout=30, isolation_level=None)
+            # Recorded before the first statement so _recover() knows which file failed.
+            self._local.identity = self._index_identity()
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _blob_path(self, key: str) -> str:
+        return os.path.join(self.blob_dir, key[:2], key)
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            row = self._connection().execute(
+                "SELECT size, value, created FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            size, value, created = row
+            if self.ttl_seconds and time.time() - created > self.ttl_seconds:
+                self._delete(key)
+                return None
+
+            if value is None:
+                try:
+                    with open(self._blob_path(key), "rb") as file_handle:
+                        value = file_handle.read()
+                except OSError:
+                    value = None
+            if value is None or len(value) != size:
+                # Blob lost or truncated: drop the entry and treat as a miss.
+                self._delete(key)
+                return None
+
+            self._connection().execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+            return bytes(value)
+        except sqlite3.DatabaseError as exc:
+            self._recover(exc)
+            return None
+
+    def set(self, key: str, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+        now = time.time()
+        inline = len(value) <= _INLINE_LIMIT
+        try:
+            if not inline:
+                self._write_blob(key, value)
+            connection = self._connection()
+            connection.execute(
+                "INSERT OR REPLACE INTO entries (key, size, value, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, len(value), sqlite3.Binary(value) if inline else None, now, now),
+            )
+            if inline:
+                self._remove_blob(key)
+            self._evict(connection)
+        except sqlite3.DatabaseError as exc:
+            self._recover(exc)
+        except OSError as exc:
+            print(f"⚠️ Shared cache write failed: {exc}")
+
+    def _write_blob(self, key: str, value: bytes) -> None:
+        path = self._blob_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file_handle:
+                file_handle.write(value)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _remove_blob(self, key: str) -> None:
+        try:
+            os.remove(self._blob_path(key))
+        except OSError:
+            pass
+
+    def _delete(self, key: str) -> None:
+        self._connection().execute("DELETE FROM entries WHERE key = ?", (key,))
+        self._remove_blob(key)
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        now = time.monotonic()
+        if now - self._last_evict < _EVICT_INTERVAL:
+            return
+        self._last_evict = now
+
+        total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        expired = []
+        if self.ttl_seconds:
+            expired = [
+                key for (key,) in connection.execute(
+                    "SELECT key FROM entries WHERE created < ?", (time.time() - self.ttl_seconds,)
+                )
+            ]
+        if total <= self.max_bytes and not expired:
+            return
+
+        victims = list(expired)
+        if total > self.max_bytes:
+            target = self.max_bytes * _EVICT_TARGET
+            for key, size in connection.execute("SELECT key, size FROM entries ORDER BY accessed"):
+                if total <= target:
+                    break
+                if key not in expired:
+                    victims.append(key)
+                total -= size
+
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in victims])
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        for key in victims:
+            self._remove_blob(key)
+
+    def _recover(self, exc: Exception) -> None:
+        """Rebuild the index if ``exc`` came from a corrupt database file.
+
+        Transient failures (locked database, busy timeout, I/O hiccups) surface
+        as ``OperationalError`` and only cost this request its cache access.
+        """
+        if isinstance(exc, sqlite3.OperationalError):
+            print(f"⚠️ Shared cache unavailable, continuing without it: {exc}")
+            return
+
+        with self._recover_lock, self._host_lock():
+            seen = getattr(self._local, "identity", None)
+            if self._index_identity() != seen:
+                return  # Another worker already rebuilt it; _connection() reopens.
+            if not self._corrupt():
+                print(f"⚠️ Shared cache error, index intact: {exc}")
+                return
+
+            print(f"⚠️ Shared cache index corrupt ({exc}); rebuilding {self.index_path}")
+            connection = getattr(self._local, "connection", None)
+            if connection is not None:
+                connection.close()
+                self._local.connection = None
+            stamp = int(time.time())
+            for suffix in ("", "-wal", "-shm"):
+                path = self.index_path + suffix
+                try:
+                    os.replace(path, f"{path}.corrupt-{stamp}")
+                except OSError:
+                    pass
+            # Blobs are only reachable through the index; drop them with it.
+            # Rename first so writers racing the rebuild land in a fresh directory.
+            stale_blobs = f"{self.blob_dir}.corrupt-{stamp}"
+            try:
+                os.replace(self.blob_dir, stale_blobs)
+            except OSError:
+                stale_blobs = None
+            os.makedirs(self.blob_dir, exist_ok=True)
+            try:
+                self._connection().executescript(_SCHEMA)
+            except sqlite3.DatabaseError as retry_exc:  # pragma: no cover - disk level failure
+                print(f"⚠️ Shared cache disabled: {retry_exc}")
+        if stale_blobs:
+            shutil.rmtree(stale_blobs, ignore_errors=True)
+
+    def _corrupt(self) -> bool:
+        """Confirm corruption with a fresh connection and ``PRAGMA integrity_check``."""
+        try:
+            connection = sqlite3.connect(self.index_path, timeout=30)
+            try:
+                rows = connection.execute("PRAGMA integrity_check").fetchall()
+            finally:
+                connection.close()
+        except sqlite3.OperationalError:
+            return False  # Locked or unreadable right now; not evidence of corruption.
+        except sqlite3.DatabaseError:
+            return True
+        return rows != [("ok",)]
+
+    @contextmanager
+    def _host_lock(self) -> Iterator[None]:
+        """Serialise recovery across worker processes on this host."""
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, "a+") as lock_handle:
+            fcntl.flock(lock_handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_handle, fcntl.LOCK_UN)
+
+
+@lru_cache(maxsize=None)
+def shared_cache() -> Optional[DiskCache]:
+    """The host-wide cache configured by ``SHARED_CACHE_DIR``, or None when unset."""
+    directory = os.getenv("SHARED_CACHE_DIR")
+    if not directory:
+        return None
+    return DiskCache(
+        directory,
+        max_bytes=int(os.getenv("SHARED_CACHE_MAX_BYTES", str(1024 * 1024 * 1024))),
+        ttl_seconds=float(os.getenv("SHARED_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+    )
+
+
+__all__ = ["DiskCache", "shared_cache"]
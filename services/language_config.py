@@ -0,0 +1,29 @@
+"""Target languages supported by the application and their Azure voices."""
+
+from __future__ import annotations
+
+from typing import Dict
+
+from .azure_tts_service import AZURE_VOICES
+
+# Language configuration aligned with Azure Neural voices
+LANGUAGE_CONFIG: Dict[str, Dict[str, object]] = {
+    'as': {'name': 'Assamese', 'voices': AZURE_VOICES['Assamese']},
+    'bn': {'name': 'Bengali', 'voices': AZURE_VOICES['Bengali']},
+    'en': {'name': 'English (India)', 'voices': AZURE_VOICES['English (India)']},
+    'gu': {'name': 'Gujarati', 'voices': AZURE_VOICES['Gujarati']},
+    'hi': {'name': 'Hindi', 'voices': AZURE_VOICES['Hindi']},
+    'kn': {'name': 'Kannada', 'voices': AZURE_VOICES['Kannada']},
+    'ml': {'name': 'Malayalam', 'voices': AZURE_VOICES['Malayalam']},
+    'mr': {'name': 'Marathi', 'voices': AZURE_VOICES['Marathi']},
+    'or': {'name': 'Odia', 'voices': AZURE_VOICES['Odia']},
+    'pa': {'name': 'Punjabi', 'voices': AZURE_VOICES['Punjabi']},
+    'ta': {'name': 'Tamil', 'voices': AZURE_VOICES['Tamil']},
+    'te': {'name': 'Telugu', 'voices': AZURE_VOICES['Telugu']},
+    'ur': {'name': 'Urdu', 'voices': AZURE_VOICES['Urdu']},
+}
+
+LANGUAGE_CODE_TO_NAME: Dict[str, str] = {code: config['name'] for code, config in LANGUAGE_CONFIG.items()}
+
+
+__all__ = ["LANGUAGE_CONFIG", "LANGUAGE_CODE_TO_NAME"]
@@ -0,0 +1,330 @@
+"""Micro-batched, in-process Piper inference.
+
+Piper voices are VITS models exported to ONNX. Running them through the
+``piper`` binary costs a process spawn and a model load per request. When
+``onnxruntime`` and ``piper-phonemize`` are installed, this module keeps the
+model resident and collects requests for the same model that arrive within a
+few milliseconds of each other into a single padded batch, so one
+``InferenceSession.run`` call serves many short prompts.
+
+Each row of a padded batch is cut to the length the model says it produced:
+per-phoneme durations (``durations``/``w_ceil``) or per-row frame counts
+(``y_lengths``) times the decoder hop. Stock Piper exports (every model in
+``voices/``) only have the audio output; their rows are cut after the last
+decoder frame with speech energy, plus a short tail. The decoder sees zeros
+past a row's real length, so the padded part is far below the row's peak.
+
+Configuration (environment):
+    PIPER_BATCH_WINDOW_MS   milliseconds the oldest request waits for more (default 5)
+    PIPER_MAX_BATCH         requests per inference (default 8)
+    PIPER_PAD_TRIM_DB       frame level, relative to the row peak, below which
+                            trailing frames are padding (default -50)
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import os
+import threading
+import math
+import time
+import wave
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+try:
+    import onnxruntime
+    from piper_phonemize import phonemize_espeak
+except ImportError:  # pragma: no cover - optional dependency
+    onnxruntime = None
+    phonemize_espeak = None
+
+
+PAD = "_"
+BOS = "^"
+EOS = "$"
+
+# Every Piper VITS decoder upsamples phoneme frames by 256 samples.
+HOP_LENGTH = 256
+
+# Optional ONNX outputs that give each row's real length, in frames.
+_DURATION_OUTPUTS = ("durations", "w_ceil")
+_LENGTH_OUTPUTS = ("y_lengths", "output_lengths")
+
+_PAD_TRIM_DB = float(os.getenv("PIPER_PAD_TRIM_DB", "-50"))
+# Speech kept after the last loud frame, so word endings and breaths survive.
+_PAD_TAIL_SECONDS = 0.1
+
+
+def batching_available() -> bool:
+    """Return True when the optional in-process inference stack is installed."""
+    return np is not None and onnxruntime is not None and phonemize_espeak is not None
+
+
+class PiperVoiceModel:
+    """A Piper ONNX voice loaded into memory together with its JSON config."""
+
+    def __init__(self, model_path: str, config_path: Optional[str] = None):
+        if not batching_available():
+            raise RuntimeError(
+                "In-process Piper inference requires 'onnxruntime' and 'piper-phonemize'."
+            )
+
+        self.model_path = model_path
+        self.config_path = config_path or f"{model_path}.json"
+        with open(self.config_path, "r", encoding="utf-8") as file_handle:
+            self.config = json.load(file_handle)
+
+        self.sample_rate: int = int(self.config.get("audio", {}).get("sample_rate", 22050))
+        self.espeak_voice: str = self.config.get("espeak", {}).get("voice", "en-us")
+        self.phoneme_id_map: Dict[str, List[int]] = self.config.get("phoneme_id_map", {})
+
+        # Multi-speaker models take a speaker id per batch row; one resident
+        # session serves every speaker it contains.
+        self.num_speakers: int = int(self.config.get("num_speakers") or 1)
+
+        inference = self.config.get("inference", {})
+        self.noise_scale = float(inference.get("noise_scale", 0.667))
+        self.length_scale = float(inference.get("length_scale", 1.0))
+        self.noise_w = float(inference.get("noise_w", 0.8))
+
+        session_options = onnxruntime.SessionOptions()
+        session_options.inter_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(
+            model_path,
+            sess_options=session_options,
+            providers=["CPUExecutionProvider"],
+        )
+        output_names = [output.name for output in self.session.get_outputs()]
+        self._duration_output = next((name for name in _DURATION_OUTPUTS if name in output_names), None)
+        self._length_output = next((name for name in _LENGTH_OUTPUTS if name in output_names), None)
+        self._output_names = [output_names[0]] + [
+            name for name in (self._duration_output, self._length_output) if name
+        ]
+
+    @property
+    def reports_lengths(self) -> bool:
+        """True when padded rows are cut to the model's exact length, not by energy."""
+        return bool(self._duration_output or self._length_output)
+
+    def phoneme_ids(self, text: str) -> List[int]:
+        """Phonemize text and map it onto the model's id space (Piper layout)."""
+        pad_ids = self.phoneme_id_map.get(PAD, [0])
+        ids: List[int] = list(self.phoneme_id_map.get(BOS, [1]))
+        ids.extend(pad_ids)
+
+        sentences = phonemize_espeak(text, self.espeak_voice)
+        for index, sentence in enumerate(sentences):
+            if index > 0:
+                # Keep sentence boundaries audible once they share a sequence.
+                ids.extend(self.phoneme_id_map.get(" ", []))
+                ids.extend(pad_ids)
+            for phoneme in sentence:
+                if phoneme not in self.phoneme_id_map:
+                    continue
+                ids.extend(self.phoneme_id_map[phoneme])
+                ids.extend(pad_ids)
+
+        ids.extend(self.phoneme_id_map.get(EOS, [2]))
+        return ids
+
+    def word_phoneme_counts(self, text: str) -> List[int]:
+        """Phonemes per spoken word, to spread a clip's duration over its words."""
+        counts: List[int] = []
+        for sentence in phonemize_espeak(text, self.espeak_voice):
+            counts.extend(len(word) for word in "".join(sentence).split(" ") if word)
+        return counts
+
+    def infer_batch(
+        self,
+        id_sequences: Sequence[List[int]],
+        speaker_ids: Optional[Sequence[Optional[int]]] = None,
+    ) -> List["np.ndarray"]:
+        """Run one padded inference and split the result back per request."""
+        lengths = np.array([len(sequence) for sequence in id_sequences], dtype=np.int64)
+        padded = np.zeros((len(id_sequences), int(lengths.max())), dtype=np.int64)
+        for row, sequence in enumerate(id_sequences):
+            padded[row, : len(sequence)] = sequence
+
+        scales = np.array([self.noise_scale, self.length_scale, self.noise_w], dtype=np.float32)
+        inputs = {"input": padded, "input_lengths": lengths, "scales": scales}
+        if self.num_speakers > 1:
+            speakers = speaker_ids or [None] * len(id_sequences)
+            inputs["sid"] = np.array([speaker or 0 for speaker in speakers], dtype=np.int64)
+
+        outputs = dict(zip(self._output_names, self.session.run(self._output_names, inputs)))
+        audio = outputs[self._output_names[0]].reshape(len(id_sequences), -1)
+        if len(id_sequences) == 1:
+            return [audio[0]]
+        if not self.reports_lengths:
+            return [trim_padding(row, self.sample_rate) for row in audio]
+
+        frames = self._row_frames(outputs, lengths)
+        return [row[: count * HOP_LENGTH] for row, count in zip(audio, frames)]
+
+    def _row_frames(self, outputs: Dict[str, "np.ndarray"], lengths: "np.ndarray") -> List[int]:
+        """Decoder frames each row really produced, from the model's own outputs."""
+        if self._length_output:
+            return [int(count) for count in np.asarray(outputs[self._length_output]).reshape(-1)]
+        durations = np.asarray(outputs[self._duration_output], dtype=np.float64).reshape(len(lengths), -1)
+        # Durations past a row's input length belong to padding phonemes.
+        return [math.ceil(float(durations[row, :length].sum())) for row, length in enumerate(lengths)]
+
+    def to_wav_bytes(self, samples: "np.ndarray") -> bytes:
+        """Normalise float audio the way Piper does and wrap it in a WAV container."""
+        peak = max(0.01, float(np.max(np.abs(samples)))) if samples.size else 0.01
+        pcm = np.clip(samples * (32767.0 / peak), -32767, 32767).astype(np.int16)
+
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(self.sample_rate)
+            wav_file.writeframes(pcm.tobytes())
+        return buffer.getvalue()
+
+
+def trim_padding(samples: "np.ndarray", sample_rate: int) -> "np.ndarray":
+    """Cut a padded batch row after its last decoder frame with speech energy."""
+    frames = samples[: samples.size // HOP_LENGTH * HOP_LENGTH].reshape(-1, HOP_LENGTH)
+    if not frames.size:
+        return samples
+    levels = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+    floor = float(np.max(np.abs(samples))) * 10.0 ** (_PAD_TRIM_DB / 20.0)
+    loud = np.flatnonzero(levels > floor)
+    if not loud.size:
+        return samples[:0]
+    tail = math.ceil(sample_rate * _PAD_TAIL_SECONDS / HOP_LENGTH)
+    return samples[: min(samples.size, (int(loud[-1]) + 1 + tail) * HOP_LENGTH)]
+
+
+class _PendingRequest:
+    __slots__ = ("phoneme_ids", "speaker_id", "future", "enqueued_at")
+
+    def __init__(self, phoneme_ids: List[int], speaker_id: Optional[int] = None):
+        self.phoneme_ids = phoneme_ids
+        self.speaker_id = speaker_id
+        self.future: Future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+class _ModelQueue:
+    """Pending requests for one model plus the worker thread that drains them."""
+
+    def __init__(self, model: PiperVoiceModel):
+        self.model = model
+        self.pending: List[_PendingRequest] = []
+        self.condition = threading.Condition()
+        self.worker: Optional[threading.Thread] = None
+        self.closed = False
+
+
+class PiperBatchScheduler:
+    """Collect concurrent Piper requests per model and run them as one batch.
+
+    A batch is dispatched once ``max_batch_size`` requests are waiting or the
+    oldest request has waited ``window_ms``. Phonemization happens on the
+    caller's thread; only the ONNX run is serialised per model. Models are
+    owned by the caller (see ``VoiceRegistry``), which calls ``release`` when
+    it evicts one.
+    """
+
+    def __init__(self, window_ms: Optional[float] = None, max_batch_size: Optional[int] = None):
+        if window_ms is None:
+            window_ms = float(os.getenv("PIPER_BATCH_WINDOW_MS", "5"))
+        if max_batch_size is None:
+            max_batch_size = int(os.getenv("PIPER_MAX_BATCH", "8"))
+
+        self.window = max(0.0, window_ms) / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+        self._queues: Dict[str, _ModelQueue] = {}
+        self._lock = threading.Lock()
+
+    def _queue_for(self, model: PiperVoiceModel) -> _ModelQueue:
+        with self._lock:
+            queue = self._queues.get(model.model_path)
+            if queue is None or queue.model is not model:
+                if queue is not None:
+                    self._close(queue)
+                queue = _ModelQueue(model)
+                queue.worker = threading.Thread(
+                    target=self._drain,
+                    args=(queue,),
+                    name=f"piper-batch-{os.path.basename(model.model_path)}",
+                    daemon=True,
+                )
+                queue.worker.start()
+                self._queues[model.model_path] = queue
+            return queue
+
+    def release(self, model_path: str) -> None:
+        """Stop batching for a model once its pending requests are served."""
+        with self._lock:
+            queue = self._queues.pop(model_path, None)
+        if queue is not None:
+            self._close(queue)
+
+    @staticmethod
+    def _close(queue: _ModelQueue) -> None:
+        with queue.condition:
+            queue.closed = True
+            queue.condition.notify_all()
+
+    def synthesize(self, model: PiperVoiceModel, text: str, speaker_id: Optional[int] = None) -> bytes:
+        """Synthesize ``text`` with a loaded model and return WAV bytes.
+
+        Requests for different speakers of the same model share a batch.
+        """
+        request = _PendingRequest(model.phoneme_ids(text), speaker_id)
+
+        while True:
+            queue = self._queue_for(model)
+            with queue.condition:
+                if not queue.closed:
+                    queue.pending.append(request)
+                    queue.condition.notify()
+                    break
+
+        samples = request.future.result()
+        return model.to_wav_bytes(samples)
+
+    def _drain(self, queue: _ModelQueue) -> None:
+        while True:
+            with queue.condition:
+                while not queue.pending:
+                    if queue.closed:
+                        return
+                    queue.condition.wait()
+
+                limit = self.max_batch_size
+                deadline = queue.pending[0].enqueued_at + self.window
+                while len(queue.pending) < limit and not queue.closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    queue.condition.wait(remaining)
+
+                batch = queue.pending[:limit]
+                del queue.pending[:limit]
+
+            try:
+                outputs = queue.model.infer_batch(
+                    [request.phoneme_ids for request in batch],
+                    [request.speaker_id for request in batch],
+                )
+            except Exception as exc:  # pragma: no cover - surfaced to callers
+                for request in batch:
+                    request.future.set_exception(exc)
+                continue
+
+            for request, samples in zip(batch, outputs):
+                request.future.set_result(samples)
+
+
+__all__ = ["PiperBatchScheduler", "PiperVoiceModel", "batching_available", "trim_padding"]
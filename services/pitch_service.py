@@ -13,6 +13,8 @@ import subprocess
 from pydub import AudioSegment
 from pydub.utils import which
 
+from . import tracing
+
 
 def _configure_ffmpeg_paths() -> str | None:
     """Ensure pydub points to ffmpeg/ffprobe if they are available."""
@@ -75,10 +77,14 @@ def apply_pitch(audio_file_path: str, pitch_change: int) -> str:
         audio_file_path,
         "-af",
         f"rubberband=pitch={pitch_ratio:.8f}",
-        output_path,
     ]
+    if extension.lower() == ".ogg":
+        # ffmpeg picks Vorbis for .ogg by default; keep the clip Opus like every other Ogg output.
+        cmd += ["-c:a", "libopus", "-b:a", os.getenv("OPUS_BITRATE", "24k"), "-application", "voip"]
+    cmd.append(output_path)
 
-    subprocess.run(cmd, check=True)
+    with tracing.span("pitch_shift", semitones=pitch_change):
+        subprocess.run(cmd, check=True)
 
     return output_path
 
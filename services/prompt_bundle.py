@@ -0,0 +1,122 @@
+"""Packed, indexed bundles of pre-rendered prompt audio.
+
+A bundle is two files that share a base path:
+
+* ``<base>.bin``      – every clip's encoded audio, back to back.
+* ``<base>.idx.json`` – ``{prompt_id: {offset, length, fingerprint, mime, ...}}``.
+
+The server memory-maps the data file and serves clips by id without any
+synthesis calls; ``compile_prompt_catalog.py`` produces and incrementally
+updates bundles.
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import tempfile
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+BUNDLE_VERSION = 1
+
+
+def bundle_paths(base_path: str) -> Tuple[str, str]:
+    """Return the (data, index) file paths for a bundle base path."""
+    return f"{base_path}.bin", f"{base_path}.idx.json"
+
+
+class PromptBundle:
+    """Read-only, memory-mapped view over a compiled prompt bundle."""
+
+    def __init__(self, base_path: str):
+        self.base_path = base_path
+        self.data_path, self.index_path = bundle_paths(base_path)
+        self.entries: Dict[str, Dict[str, object]] = {}
+        self._mmap: Optional[mmap.mmap] = None
+        self._loaded_mtime: Optional[float] = None
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self) -> None:
+        """(Re)open the bundle, e.g. after a recompile replaced its files."""
+        with open(self.index_path, "r", encoding="utf-8") as file_handle:
+            index = json.load(file_handle)
+        if index.get("version") != BUNDLE_VERSION:
+            raise RuntimeError(f"Unsupported prompt bundle version: {index.get('version')}")
+
+        new_mmap: Optional[mmap.mmap] = None
+        if index.get("data_size"):
+            with open(self.data_path, "rb") as data_file:
+                new_mmap = mmap.mmap(data_file.fileno(), 0, access=mmap.ACCESS_READ)
+            if len(new_mmap) != index["data_size"]:
+                new_mmap.close()
+                raise RuntimeError("Prompt bundle data file does not match its index.")
+
+        with self._lock:
+            old_mmap = self._mmap
+            self._mmap = new_mmap
+            self.entries = index.get("entries", {})
+            self._loaded_mtime = os.path.getmtime(self.index_path)
+        if old_mmap is not None:
+            old_mmap.close()
+
+    def reload_if_changed(self) -> None:
+        try:
+            if os.path.getmtime(self.index_path) != self._loaded_mtime:
+                self.reload()
+        except OSError:
+            pass
+
+    def get(self, prompt_id: str) -> Optional[Tuple[bytes, str]]:
+        """Return (audio bytes, mime type) for a prompt id, or None if unknown."""
+        with self._lock:
+            entry = self.entries.get(prompt_id)
+            if entry is None or self._mmap is None:
+                return None
+            offset = int(entry["offset"])
+            return self._mmap[offset : offset + int(entry["length"])], str(entry.get("mime", "audio/mpeg"))
+
+    def __contains__(self, prompt_id: str) -> bool:
+        return prompt_id in self.entries
+
+
+def write_bundle(base_path: str, clips: Iterable[Tuple[str, bytes, Dict[str, object]]]) -> Dict[str, Dict[str, object]]:
+    """Atomically write a bundle from ``(prompt_id, audio_bytes, metadata)`` tuples.
+
+    The data file is replaced before the index, and the index records the data
+    size, so readers never pair a new index with a stale data file silently.
+    """
+    data_path, index_path = bundle_paths(base_path)
+    directory = os.path.dirname(os.path.abspath(base_path))
+    os.makedirs(directory, exist_ok=True)
+
+    entries: Dict[str, Dict[str, object]] = {}
+    offset = 0
+    data_fd, data_tmp = tempfile.mkstemp(dir=directory, suffix=".bin.tmp")
+    try:
+        with os.fdopen(data_fd, "wb") as data_file:
+            for prompt_id, audio_bytes, metadata in clips:
+                data_file.write(audio_bytes)
+                entries[prompt_id] = dict(metadata, offset=offset, length=len(audio_bytes))
+                offset += len(audio_bytes)
+
+        index_fd, index_tmp = tempfile.mkstemp(dir=directory, suffix=".idx.tmp")
+        with os.fdopen(index_fd, "w", encoding="utf-8") as index_file:
+            json.dump(
+                {"version": BUNDLE_VERSION, "data_size": offset, "entries": entries},
+                index_file,
+                ensure_ascii=False,
+                indent=1,
+            )
+        os.replace(data_tmp, data_path)
+        os.replace(index_tmp, index_path)
+    finally:
+        if os.path.exists(data_tmp):
+            os.remove(data_tmp)
+
+    return entries
+
+
+__all__ = ["PromptBundle", "bundle_paths", "write_bundle"]
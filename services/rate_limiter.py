@@ -0,0 +1,247 @@
+"""Admission control for throttled upstream providers.
+
+Each upstream (Azure Speech, OpenAI, Google Translate) gets a limiter with a
+requests/s token bucket, an optional characters/s token bucket and a bounded
+number of concurrency slots. Callers queue for admission until a deadline instead
+of bursting into the provider's throttle; a 429 from the provider pauses the
+buckets for the advertised retry-after and halves the admitted rate, which
+then creeps back towards the configured ceiling on success (AIMD).
+
+Limits are configured per provider through the environment, e.g.
+``AZURE_RPS``, ``AZURE_CPS``, ``AZURE_MAX_CONCURRENCY``; ``0`` disables a
+bucket. ``RATE_LIMIT_MAX_WAIT`` caps how long a request may queue;
+``SCHED_BULK_MAX_WAIT`` (default 300) extends that for bulk work.
+
+Concurrency slots are handed out by a ``scheduler.FairScheduler``, which
+serves interactive calls before bulk ones and shares slots fairly between
+tenants. On-host engines are admitted through the ``local`` limiter
+(``LOCAL_MAX_CONCURRENCY``, default one slot per CPU).
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, TypeVar
+
+from . import scheduler
+from .scheduler import FairScheduler
+
+T = TypeVar("T")
+
+# Conservative defaults; override per deployment to match the purchased tier.
+_DEFAULT_LIMITS: Dict[str, Dict[str, float]] = {
+    "azure": {"rps": 20.0, "cps": 0.0, "max_concurrency": 8},
+    "openai": {"rps": 3.0, "cps": 0.0, "max_concurrency": 4},
+    "google": {"rps": 5.0, "cps": 0.0, "max_concurrency": 4},
+    # On-host engines (Piper, Coqui, CTranslate2): CPU slots only, no quota.
+    "local": {"rps": 0.0, "cps": 0.0, "max_concurrency": os.cpu_count() or 4},
+}
+
+
+class AdmissionTimeout(RuntimeError):
+    """Raised when a request cannot be admitted before its deadline."""
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RateLimitedError(RuntimeError):
+    """Raised by provider calls when the upstream answered with HTTP 429."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Token bucket that hands out reservations, so waiters queue in order."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.ceiling = rate
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: float, deadline: float) -> float:
+        """Reserve ``tokens`` and return how long the caller must wait.
+
+        Raises:
+            AdmissionTimeout: If the reservation would not mature before
+                ``deadline`` (nothing is reserved in that case).
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+            remaining = self._tokens - tokens
+            wait = max(0.0, -remaining / self.rate, self._paused_until - now)
+            if now + wait > deadline:
+                raise AdmissionTimeout("Upstream quota exhausted; request could not be admitted in time.", wait)
+            self._tokens = remaining
+            return wait
+
+    def refund(self, tokens: float) -> None:
+        """Return a reservation that will not be used (e.g. another bucket refused the request)."""
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + tokens)
+
+    def available(self) -> float:
+        """Tokens that could be reserved right now without waiting."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return 0.0
+            return min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+
+    def penalize(self, retry_after: float) -> None:
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            self.rate = max(self.ceiling * 0.05, self.rate * 0.5)
+
+    def recover(self) -> None:
+        with self._lock:
+            self.rate = min(self.ceiling, self.rate + self.ceiling * 0.05)
+
+
+class ProviderLimiter:
+    """Admission controller for a single upstream provider."""
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_second: float = 0.0,
+        chars_per_second: float = 0.0,
+        max_concurrency: int = 8,
+        max_wait: float = 10.0,
+        max_retries: int = 3,
+    ):
+        self.name = name
+        self.requests = TokenBucket(requests_per_second) if requests_per_second > 0 else None
+        self.characters = (
+            TokenBucket(chars_per_second, capacity=chars_per_second) if chars_per_second > 0 else None
+        )
+        self.max_wait = max_wait
+        self.max_retries = max_retries
+        self.max_concurrency = max(1, int(max_concurrency))
+        # Slots are handed out by priority class and tenant (see scheduler).
+        self.scheduler = FairScheduler(self.max_concurrency)
+
+    @contextmanager
+    def admit(self, chars: int = 0, deadline: Optional[float] = None) -> Iterator[None]:
+        """Block until the request fits the quota, or raise AdmissionTimeout."""
+        deadline = deadline if deadline is not None else time.monotonic() + self._max_wait()
+
+        # Take a slot first so quota tokens are also reserved in priority order.
+        ticket = self.scheduler.acquire(deadline)
+        if ticket is None:
+            raise AdmissionTimeout(f"All {self.name} slots are busy; request could not be admitted in time.")
+        try:
+            wait = 0.0
+            if self.requests is not None:
+                wait = max(wait, self.requests.reserve(1, deadline))
+            if self.characters is not None and chars:
+                try:
+                    wait = max(wait, self.characters.reserve(chars, deadline))
+                except AdmissionTimeout:
+                    # The request never goes out; don't let its token delay the next one.
+                    if self.requests is not None:
+                        self.requests.refund(1)
+                    raise
+            if wait:
+                time.sleep(wait)
+            yield
+        finally:
+            self.scheduler.release(ticket)
+
+    def _max_wait(self) -> float:
+        # Bulk work queues behind interactive traffic, so it may wait longer.
+        if scheduler.current().priority == scheduler.BULK:
+            return max(self.max_wait, float(os.getenv("SCHED_BULK_MAX_WAIT", "300")))
+        return self.max_wait
+
+    def has_headroom(self, reserve: float = 0.5) -> bool:
+        """True when at least ``reserve`` of the concurrency slots and request tokens are unused.
+
+        Background work checks this so it only consumes capacity that
+        interactive requests are not using.
+        """
+        free_slots = self.max_concurrency - self.scheduler.in_flight
+        if free_slots < self.max_concurrency * reserve:
+            return False
+        if self.requests is not None and self.requests.available() < self.requests.capacity * reserve:
+            return False
+        return True
+
+    def call(self, fn: Callable[[], T], chars: int = 0) -> T:
+        """Run ``fn`` under admission control, retrying after upstream 429s."""
+        with self.hold(fn, chars) as result:
+            return result
+
+    @contextmanager
+    def hold(self, fn: Callable[[], T], chars: int = 0) -> Iterator[T]:
+        """Like ``call``, but keep the admission until the ``with`` block exits.
+
+        For streamed responses, where the provider keeps working (and keeps
+        a connection busy) after ``fn`` has started it.
+        """
+        deadline = time.monotonic() + self._max_wait()
+        attempt = 0
+        while True:
+            with self.admit(chars, deadline):
+                try:
+                    result = fn()
+                except RateLimitedError as exc:
+                    retry_after = exc.retry_after if exc.retry_after is not None else 2.0 ** attempt
+                    self._penalize(retry_after)
+                    attempt += 1
+                    if attempt > self.max_retries or time.monotonic() + retry_after > deadline:
+                        raise
+                else:
+                    self._recover()
+                    yield result
+                    return
+            if self.requests is None and self.characters is None:
+                time.sleep(retry_after)
+
+    def _penalize(self, retry_after: float) -> None:
+        for bucket in (self.requests, self.characters):
+            if bucket is not None:
+                bucket.penalize(retry_after)
+
+    def _recover(self) -> None:
+        for bucket in (self.requests, self.characters):
+            if bucket is not None:
+                bucket.recover()
+
+
+_limiters: Dict[str, ProviderLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(name: str) -> ProviderLimiter:
+    """Return the process-wide limiter for ``name``, built from the environment."""
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            defaults = _DEFAULT_LIMITS.get(name, {"rps": 0.0, "cps": 0.0, "max_concurrency": 8})
+            prefix = name.upper()
+            limiter = ProviderLimiter(
+                name,
+                requests_per_second=float(os.getenv(f"{prefix}_RPS", defaults["rps"])),
+                chars_per_second=float(os.getenv(f"{prefix}_CPS", defaults["cps"])),
+                max_concurrency=int(os.getenv(f"{prefix}_MAX_CONCURRENCY", defaults["max_concurrency"])),
+                max_wait=float(os.getenv("RATE_LIMIT_MAX_WAIT", "10")),
+            )
+            _limiters[name] = limiter
+        return limiter
+
+
+__all__ = ["AdmissionTimeout", "ProviderLimiter", "RateLimitedError", "TokenBucket", "get_limiter"]
@@ -0,0 +1,232 @@
+"""Priority classes and weighted fair queuing for upstream and local engine calls.
+
+Every provider call is admitted through a ``FairScheduler`` (one per
+``ProviderLimiter``), so interactive Dashboard requests and bulk work
+(fan-out batches, speculative prefetch, catalog compiles) compete for
+slots under explicit rules:
+
+* Interactive calls always go first. Bulk calls only take slots when no
+  interactive call is waiting.
+* Within a class, tenants (API keys, or clients without one) share slots by
+  weighted fair queuing, so one tenant's large batch cannot starve the others.
+* Long texts are synthesized chunk by chunk and every chunk is admitted
+  separately, so bulk jobs are preempted at chunk boundaries.
+* Bulk concurrency is adapted to the interactive latency target: when
+  interactive p95 queueing delay (request to slot grant, last minute)
+  exceeds the target, the bulk share is halved, down to one slot; while it
+  stays below, it grows back one slot at a time. Call time is left out, so
+  a long text that is slow to synthesize does not throttle bulk work.
+
+The caller's class and tenant live in a context variable set per request
+(``work_context``); ``tracing.bind`` carries it into worker threads.
+
+Configuration (environment):
+    SCHED_INTERACTIVE_P95_MS  interactive queueing delay target per call (default 2000)
+    SCHED_TENANT_WEIGHTS      "tenant:weight,..." shares (default weight 1)
+"""
+
+from __future__ import annotations
+
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+PRIORITY_CLASSES = (INTERACTIVE, BULK)
+
+# Interactive latencies considered when adapting the bulk share.
+_LATENCY_WINDOW_SECONDS = 60.0
+_MIN_SAMPLES = 20
+_MIN_BULK_LIMIT = 1
+_ADAPT_INTERVAL = 1.0
+_MAX_TENANTS = 10_000
+
+
+class WorkContext(NamedTuple):
+    priority: str = INTERACTIVE
+    tenant: str = "default"
+
+
+_context: "contextvars.ContextVar[WorkContext]" = contextvars.ContextVar("work_context", default=WorkContext())
+
+
+def current() -> WorkContext:
+    return _context.get()
+
+
+@contextmanager
+def work_context(priority: str = INTERACTIVE, tenant: Optional[str] = None) -> Iterator[WorkContext]:
+    """Run the enclosed work under ``priority`` on behalf of ``tenant``."""
+    if priority not in PRIORITY_CLASSES:
+        priority = INTERACTIVE
+    context = WorkContext(priority, tenant or "default")
+    token = _context.set(context)
+    try:
+        yield context
+    finally:
+        _context.reset(token)
+
+
+def enter_context(priority: str = INTERACTIVE, tenant: Optional[str] = None) -> contextvars.Token:
+    """Set the work context until ``exit_context(token)``, for request hooks."""
+    if priority not in PRIORITY_CLASSES:
+        priority = INTERACTIVE
+    return _context.set(WorkContext(priority, tenant or "default"))
+
+
+def exit_context(token: contextvars.Token) -> None:
+    _context.reset(token)
+
+
+def _tenant_weights() -> Dict[str, float]:
+    weights = {}
+    for item in os.getenv("SCHED_TENANT_WEIGHTS", "").split(","):
+        tenant, _, weight = item.strip().rpartition(":")
+        try:
+            if tenant and float(weight) > 0:
+                weights[tenant] = float(weight)
+        except ValueError:
+            continue
+    return weights
+
+
+class _Ticket:
+    __slots__ = ("priority", "tenant", "start", "finish", "granted", "requested")
+
+    def __init__(self, priority: str, tenant: str, start: float, finish: float):
+        self.priority = priority
+        self.tenant = tenant
+        self.start = start
+        self.finish = finish
+        self.granted = False
+        self.requested = time.monotonic()
+
+
+class FairScheduler:
+    """Slot admission with strict class priority and per-tenant fair queuing."""
+
+    def __init__(self, slots: int, interactive_target_ms: Optional[float] = None):
+        self.slots = max(1, int(slots))
+        self.interactive_target = (
+            interactive_target_ms if interactive_target_ms is not None
+            else float(os.getenv("SCHED_INTERACTIVE_P95_MS", "2000"))
+        ) / 1000.0
+        self.bulk_limit = self.slots
+        self.weights = _tenant_weights()
+        self._in_use = 0
+        self._bulk_in_use = 0
+        self._waiting: List[_Ticket] = []
+        self._virtual_time: Dict[str, float] = {priority: 0.0 for priority in PRIORITY_CLASSES}
+        self._tenant_finish: Dict[Tuple[str, str], float] = {}
+        self._latencies: Deque[Tuple[float, float]] = deque(maxlen=1000)
+        self._last_adapt = 0.0
+        self._condition = threading.Condition()
+
+    @property
+    def in_flight(self) -> int:
+        with self._condition:
+            return self._in_use
+
+    def acquire(self, deadline: float) -> Optional[_Ticket]:
+        """Wait for a slot until ``deadline`` (monotonic); None if it was not granted."""
+        priority, tenant = current()
+        with self._condition:
+            # Start-time fair queuing: a tenant's next call is stamped after
+            # its previous one, spaced by the inverse of its weight.
+            tenant_key = (priority, tenant)
+            start = max(self._virtual_time[priority], self._tenant_finish.get(tenant_key, 0.0))
+            ticket = _Ticket(priority, tenant, start, start + 1.0 / self.weights.get(tenant, 1.0))
+            self._tenant_finish[tenant_key] = ticket.finish
+            if len(self._tenant_finish) > _MAX_TENANTS:
+                self._forget_idle_tenants()
+            self._waiting.append(ticket)
+            self._dispatch()
+
+            while not ticket.granted:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._waiting.remove(ticket)
+                    self._dispatch()
+                    return None
+                # Wake periodically so a throttled bulk share can grow back
+                # even when no call completes.
+                self._condition.wait(min(remaining, _ADAPT_INTERVAL))
+                self._adapt()
+                self._dispatch()
+            return ticket
+
+    def _forget_idle_tenants(self) -> None:
+        # A tenant stamped before the current virtual time has no backlog;
+        # dropping it changes nothing for its next call.
+        self._tenant_finish = {
+            key: finish for key, finish in self._tenant_finish.items()
+            if finish > self._virtual_time[key[0]]
+        }
+
+    def release(self, ticket: _Ticket) -> None:
+        with self._condition:
+            self._in_use -= 1
+            if ticket.priority == BULK:
+                self._bulk_in_use -= 1
+            self._adapt()
+            self._dispatch()
+
+    def _dispatch(self) -> None:
+        granted = False
+        while self._in_use < self.slots and self._waiting:
+            interactive = [ticket for ticket in self._waiting if ticket.priority == INTERACTIVE]
+            if interactive:
+                candidates = interactive
+            elif self._bulk_in_use < self.bulk_limit:
+                candidates = self._waiting
+            else:
+                break
+            ticket = min(candidates, key=lambda waiting: waiting.finish)
+            self._waiting.remove(ticket)
+            ticket.granted = True
+            if ticket.priority == INTERACTIVE:
+                self._latencies.append((time.monotonic(), time.monotonic() - ticket.requested))
+            self._virtual_time[ticket.priority] = max(self._virtual_time[ticket.priority], ticket.start)
+            self._in_use += 1
+            if ticket.priority == BULK:
+                self._bulk_in_use += 1
+            granted = True
+        if granted:
+            self._condition.notify_all()
+
+    def _adapt(self) -> None:
+        now = time.monotonic()
+        if now - self._last_adapt < _ADAPT_INTERVAL:
+            return
+        self._last_adapt = now
+        recent = sorted(latency for at, latency in self._latencies if now - at <= _LATENCY_WINDOW_SECONDS)
+        if len(recent) >= _MIN_SAMPLES and recent[int(0.95 * (len(recent) - 1))] > self.interactive_target:
+            self.bulk_limit = max(_MIN_BULK_LIMIT, self.bulk_limit // 2)
+        elif self.bulk_limit < self.slots:
+            self.bulk_limit += 1
+
+    def p95_interactive_ms(self) -> Optional[float]:
+        with self._condition:
+            now = time.monotonic()
+            recent = sorted(latency for at, latency in self._latencies if now - at <= _LATENCY_WINDOW_SECONDS)
+        if not recent:
+            return None
+        return recent[int(0.95 * (len(recent) - 1))] * 1000
+
+
+__all__ = [
+    "BULK",
+    "FairScheduler",
+    "INTERACTIVE",
+    "PRIORITY_CLASSES",
+    "WorkContext",
+    "current",
+    "enter_context",
+    "exit_context",
+    "work_context",
+]
@@ -0,0 +1,439 @@
+"""Sentence-level translation and synthesis cache.
+
+Long texts are split into sentences so that regenerating an edited script
+only translates and synthesizes the sentences that actually changed. Audio
+for each sentence is cached under (sentence, voice, pitch, rate) and the
+final clip is assembled from the cached segments. Word timing tracks are
+cached next to the audio they describe.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import wave
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from . import timings, tracing
+from .audio_encoding import audio_duration, concat_ogg
+from .chunk_planner import adaptive_chunking_enabled, get_planner
+from .disk_cache import shared_cache
+from .single_flight import SingleFlight
+from .text_normalizer import SENTENCE_TERMINATORS, sentence_abbreviations
+from .timings import TimedAudio, WordTiming
+
+# Sentence terminators for Latin scripts plus the Devanagari danda/double
+# danda and the Urdu full stop.
+_SENTENCE_BOUNDARY = re.compile(rf"(?<=[{re.escape(SENTENCE_TERMINATORS)}])\s+")
+_PARAGRAPH_BREAK = re.compile(r"(\s*\n\s*)")
+# Punctuation that may precede an abbreviation, as in "(e.g. this)".
+_OPENING_PUNCTUATION = "([{\"'"
+
+
+def _paragraphs(text: str) -> Tuple[List[str], List[str]]:
+    """Paragraphs of ``text`` and the break after each one but the last ("\n" or "\n\n")."""
+    parts = _PARAGRAPH_BREAK.split(text.strip())
+    breaks = ["\n\n" if part.count("\n") > 1 else "\n" for part in parts[1::2]]
+    return parts[0::2], breaks
+
+
+def _split_paragraph(paragraph: str) -> List[str]:
+    sentences: List[str] = []
+    abbreviations = sentence_abbreviations()
+    for part in _SENTENCE_BOUNDARY.split(paragraph):
+        part = part.strip()
+        if not part:
+            continue
+        # "Dr. Rao" is one sentence: rejoin splits made after an abbreviation.
+        if sentences and sentences[-1].rsplit(None, 1)[-1].lstrip(_OPENING_PUNCTUATION) in abbreviations:
+            sentences[-1] = f"{sentences[-1]} {part}"
+        else:
+            sentences.append(part)
+    return sentences
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into sentences, keeping terminators attached.
+
+    Terminators that end an abbreviation of a supported language ("Dr.",
+    "e.g.", "डॉ.") do not end a sentence. Line breaks always do.
+    """
+    if not text or not text.strip():
+        return []
+    sentences: List[str] = []
+    for paragraph in _paragraphs(text)[0]:
+        sentences.extend(_split_paragraph(paragraph))
+    return sentences
+
+
+def join_sentences(sentences: Sequence[str], source_text: str) -> str:
+    """Join sentences split from ``source_text`` (or their translations), keeping its paragraph breaks."""
+    paragraphs, breaks = _paragraphs(source_text or "")
+    counts = [len(_split_paragraph(paragraph)) for paragraph in paragraphs]
+    if sum(counts) != len(sentences):
+        return " ".join(sentences)
+    joined: List[str] = []
+    position = 0
+    for index, count in enumerate(counts):
+        joined.append(" ".join(sentences[position:position + count]))
+        position += count
+        if index < len(breaks):
+            joined.append(breaks[index])
+    return "".join(joined)
+
+
+def cache_key(*parts: object) -> str:
+    """Build a stable cache key from the given parts."""
+    joined = "\x1f".join("" if part is None else str(part) for part in parts)
+    return hashlib.sha1(joined.encode("utf-8")).hexdigest()
+
+
+class LRUByteCache:
+    """Thread-safe in-process LRU cache bounded by the total size of its values."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+        # Own the bytes: callers may pass views over buffers they later release.
+        value = bytes(value)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = value
+            self._size += len(value)
+            while self._size > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+
+def join_audio(segments: Sequence[bytes], audio_format: str) -> bytes:
+    """Concatenate encoded audio segments.
+
+    MP3 streams are sequences of self-contained frames and are joined
+    byte-wise; Ogg/Opus segments are remuxed into one logical stream (see
+    ``concat_ogg``) and WAV segments are re-wrapped under a single RIFF header.
+    """
+    if len(segments) == 1:
+        return segments[0]
+    if audio_format == "ogg":
+        return concat_ogg(segments)
+    if audio_format != "wav":
+        return b"".join(segments)
+
+    output = io.BytesIO()
+    writer: Optional[wave.Wave_write] = None
+    for segment in segments:
+        with wave.open(io.BytesIO(segment), "rb") as reader:
+            if writer is None:
+                writer = wave.open(output, "wb")
+                writer.setparams(reader.getparams())
+            writer.writeframes(reader.readframes(reader.getnframes()))
+    if writer is not None:
+        writer.close()
+    return output.getvalue()
+
+
+class SentencePipeline:
+    """Translate and synthesize text sentence by sentence with caching."""
+
+    def __init__(
+        self,
+        translation_service,
+        audio_cache: Optional[LRUByteCache] = None,
+        translation_cache: Optional[LRUByteCache] = None,
+        max_workers: Optional[int] = None,
+        single_flight: Optional[SingleFlight] = None,
+    ):
+        self.translation_service = translation_service
+        # Concurrent misses for the same sentence share one upstream call.
+        self.single_flight = single_flight or SingleFlight()
+        # Audio is shared across workers when SHARED_CACHE_DIR is set;
+        # translations stay in-process here and hit the shared cache inside
+        # TranslationService on a miss.
+        self.audio_cache = audio_cache or shared_cache() or LRUByteCache(
+            int(os.getenv("SENTENCE_AUDIO_CACHE_BYTES", str(64 * 1024 * 1024)))
+        )
+        self.translation_cache = translation_cache or LRUByteCache(
+            int(os.getenv("SENTENCE_TRANSLATION_CACHE_BYTES", str(8 * 1024 * 1024)))
+        )
+        self.max_workers = max_workers or int(os.getenv("SENTENCE_SYNTH_WORKERS", "4"))
+
+    def translate(self, sentences: Sequence[str], target_lang: str, source_lang: str) -> List[str]:
+        """Translate sentences, only calling the translator for cache misses."""
+        if source_lang == target_lang:
+            return list(sentences)
+        supports_batching = getattr(self.translation_service, "supports_batching", None)
+        if len(sentences) > 1 and supports_batching and supports_batching(source_lang, target_lang):
+            return self._translate_batched(list(sentences), target_lang, source_lang)
+        return self._map(lambda sentence: self.translate_one(sentence, target_lang, source_lang), list(sentences))
+
+    def translate_one(self, sentence: str, target_lang: str, source_lang: str) -> str:
+        if source_lang == target_lang:
+            return sentence
+
+        key = cache_key("translation", sentence, source_lang, target_lang)
+        cached = self.translation_cache.get(key)
+        tracing.note("translate", hit=cached is not None)
+        if cached is not None:
+            return cached.decode("utf-8")
+
+        def _call() -> str:
+            translated = self.translation_service.translate_text(
+                sentence,
+                target_lang,
+                source_lang_code=source_lang,
+            )["translated_text"]
+            # translate_text echoes its input on failure; don't cache that.
+            if translated != sentence:
+                self.translation_cache.set(key, translated.encode("utf-8"))
+            return translated
+
+        return self.single_flight.do(key, _call)
+
+    def _translate_batched(self, sentences: List[str], target_lang: str, source_lang: str) -> List[str]:
+        """Serve hits from the cache and send all distinct misses as one batch."""
+        results: List[Optional[str]] = []
+        misses: Dict[str, str] = {}
+        for sentence in sentences:
+            key = cache_key("translation", sentence, source_lang, target_lang)
+            cached = self.translation_cache.get(key)
+            tracing.note("translate", hit=cached is not None)
+            results.append(cached.decode("utf-8") if cached is not None else None)
+            if cached is None:
+                misses.setdefault(sentence, key)
+
+        if misses:
+            pending = list(misses)
+            translated = self.translation_service.translate_batch(pending, target_lang, source_lang)
+            for sentence, translation in zip(pending, translated):
+                # translate_batch echoes segments it failed on; don't cache those.
+                if translation != sentence:
+                    self.translation_cache.set(misses[sentence], translation.encode("utf-8"))
+                misses[sentence] = translation
+
+        return [
+            result if result is not None else misses[sentence]
+            for sentence, result in zip(sentences, results)
+        ]
+
+    def synthesize(
+        self,
+        sentences: Sequence[str],
+        synthesize_fn: Callable[[str], bytes],
+        *,
+        voice: str,
+        pitch: str,
+        rate: str,
+        audio_format: str = "mp3",
+        provider: Optional[str] = None,
+    ) -> bytes:
+        """Synthesize each sentence (cached) and assemble the final clip.
+
+        With ``provider`` set, consecutive sentences are first joined into the
+        chunk sizes the provider's observed latency favours (see chunk_planner).
+        """
+        segments = self._synthesize_all(sentences, synthesize_fn, False, voice, pitch, rate, audio_format, provider)
+        return join_audio([segment.audio for segment in segments if segment.audio], audio_format)
+
+    def synthesize_timed(
+        self,
+        sentences: Sequence[str],
+        synthesize_fn: Callable[[str], object],
+        *,
+        voice: str,
+        pitch: str,
+        rate: str,
+        audio_format: str = "mp3",
+        provider: Optional[str] = None,
+    ) -> TimedAudio:
+        """Like ``synthesize``, and also return the clip's word timing track.
+
+        ``synthesize_fn`` may return ``TimedAudio``; segments without timings
+        (plain bytes, or audio cached before timings were kept) get an
+        estimated track. Each segment's words are offset by the duration of
+        the segments before it.
+        """
+        segments = self._synthesize_all(sentences, synthesize_fn, True, voice, pitch, rate, audio_format, provider)
+        words: List[WordTiming] = []
+        offset_ms = 0
+        for segment in segments:
+            if not segment.audio:
+                continue
+            words.extend(timings.shift(segment.words, offset_ms))
+            offset_ms += int(audio_duration(segment.audio, audio_format) * 1000)
+        return TimedAudio(join_audio([segment.audio for segment in segments if segment.audio], audio_format), words)
+
+    def _synthesize_all(self, sentences, synthesize_fn, timed, voice, pitch, rate, audio_format, provider):
+        if provider and adaptive_chunking_enabled():
+            sentences = self._plan_chunks(list(sentences), provider, voice, pitch, rate, audio_format)
+        return self._map(
+            lambda sentence: self._synthesize_one(
+                sentence, synthesize_fn, timed, voice=voice, pitch=pitch, rate=rate, audio_format=audio_format
+            ),
+            list(sentences),
+        )
+
+    def _plan_chunks(self, sentences, provider, voice, pitch, rate, audio_format) -> List[str]:
+        """Chunk boundaries for ``sentences``, kept in the audio cache next to the chunks.
+
+        The first plan for a text is stored in the (shared) cache and reused by
+        every process after it, so a text keeps the chunks its audio was
+        cached under even when the latency models of two workers disagree.
+        """
+        if len(sentences) <= 1:
+            return sentences
+        key = cache_key("plan", provider, voice, pitch, rate, audio_format, *sentences)
+        cached = self.audio_cache.get(key)
+        if cached is not None:
+            return json.loads(bytes(cached).decode("utf-8"))
+        chunks = get_planner().plan(sentences, provider, self.max_workers)
+        self.audio_cache.set(key, json.dumps(chunks, ensure_ascii=False).encode("utf-8"))
+        return chunks
+
+    def synthesize_one(
+        self,
+        sentence: str,
+        synthesize_fn: Callable[[str], bytes],
+        *,
+        voice: str,
+        pitch: str,
+        rate: str,
+        audio_format: str = "mp3",
+    ) -> bytes:
+        return self._synthesize_one(
+            sentence, synthesize_fn, False, voice=voice, pitch=pitch, rate=rate, audio_format=audio_format
+        ).audio
+
+    def _synthesize_one(
+        self,
+        sentence: str,
+        synthesize_fn: Callable[[str], object],
+        timed: bool,
+        *,
+        voice: str,
+        pitch: str,
+        rate: str,
+        audio_format: str,
+    ) -> TimedAudio:
+        key = cache_key("audio", sentence, voice, pitch, rate, audio_format)
+        words_key = cache_key("timings", key)
+        cached = self.audio_cache.get(key)
+        tracing.note("synthesize", hit=cached is not None)
+        if cached is not None:
+            if not timed:
+                return TimedAudio(cached, [])
+            cached_words = self.audio_cache.get(words_key)
+            if cached_words is not None:
+                return TimedAudio(cached, timings.decode(cached_words))
+            return TimedAudio(cached, self._estimate(sentence, cached, audio_format))
+
+        def _call() -> TimedAudio:
+            result = synthesize_fn(sentence)
+            if not isinstance(result, TimedAudio):
+                result = TimedAudio(result, [])
+            self.audio_cache.set(key, result.audio)
+            if result.words:
+                self.audio_cache.set(words_key, timings.encode(result.words))
+            return result
+
+        result = self.single_flight.do(key, _call)
+        if timed and not result.words and result.audio:
+            result = TimedAudio(result.audio, self._estimate(sentence, result.audio, audio_format))
+        return result
+
+    @staticmethod
+    def _estimate(sentence: str, audio: bytes, audio_format: str) -> List[WordTiming]:
+        return timings.estimate(sentence, int(audio_duration(audio, audio_format) * 1000))
+
+    def stream(
+        self,
+        sentences: Sequence[str],
+        target_lang: str,
+        source_lang: str,
+        synthesize_fn: Callable[[str], bytes],
+        *,
+        voice: str,
+        pitch: str,
+        rate: str,
+        audio_format: str = "mp3",
+        normalize_fn: Optional[Callable[[str], str]] = None,
+    ) -> Iterator[Tuple[str, int, object]]:
+        """Yield ``("translation", i, text)`` and ``("audio", i, bytes)`` events in order.
+
+        Sentence ``i`` is handed to synthesis as soon as its translation is
+        ready, and audio for the leading sentences is yielded while later
+        sentences are still being translated or synthesized. Translation and
+        synthesis run on separate executors, so the first sentence's audio
+        never queues behind the remaining translations. ``normalize_fn`` maps
+        a translation to the text that is spoken (and cached).
+        """
+        workers = max(1, self.max_workers)
+        translator = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="stream-translate")
+        synthesizer = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="stream-synthesize")
+        try:
+            translations = [
+                translator.submit(tracing.bind(self.translate_one), sentence, target_lang, source_lang)
+                for sentence in sentences
+            ]
+            audio: Deque[Future] = deque()
+            next_translation = next_audio = 0
+
+            while next_translation < len(translations) or audio:
+                if audio and audio[0].done():
+                    yield "audio", next_audio, audio.popleft().result()
+                    next_audio += 1
+                    continue
+                if next_translation < len(translations) and translations[next_translation].done():
+                    translated = translations[next_translation].result()
+                    yield "translation", next_translation, translated
+                    audio.append(
+                        synthesizer.submit(
+                            tracing.bind(self.synthesize_one),
+                            normalize_fn(translated) if normalize_fn else translated,
+                            synthesize_fn,
+                            voice=voice,
+                            pitch=pitch,
+                            rate=rate,
+                            audio_format=audio_format,
+                        )
+                    )
+                    next_translation += 1
+                    continue
+                # Block until the next translation or the leading audio is ready.
+                waiting = [audio[0]] if audio else []
+                if next_translation < len(translations):
+                    waiting.append(translations[next_translation])
+                wait(waiting, return_when=FIRST_COMPLETED)
+        finally:
+            # A closed stream (client gone) drops the work not yet started.
+            translator.shutdown(wait=False, cancel_futures=True)
+            synthesizer.shutdown(wait=False, cancel_futures=True)
+
+    def _map(self, fn: Callable, items: List[str]) -> List:
+        if len(items) <= 1 or self.max_workers <= 1:
+            return [fn(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as executor:
+            return list(executor.map(tracing.bind(fn), items))
+
+
+__all__ = ["LRUByteCache", "SentencePipeline", "cache_key", "join_audio", "join_sentences", "split_sentences"]
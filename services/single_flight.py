@@ -0,0 +1,190 @@
+"""Single-flight coalescing of identical concurrent work.
+
+Concurrent callers asking for the same key wait on one in-flight
+computation and share its result. Within a process this uses a per-key
+event; across gunicorn workers it optionally serialises on a local file lock
+and shares the leader's (JSON-serializable) result through a sidecar file.
+
+Shared results should be small: reference large payloads (audio) by the
+file they were written to rather than embedding them. Every worker taking
+part in a key holds a shared lock on ``<key>.users`` while it waits and
+reads; the last one to leave removes the result file. Lock files of keys
+left idle are swept periodically.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows has no flock
+    fcntl = None
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Run ``fn`` once per key for all callers that overlap in time.
+
+    Args:
+        lock_dir: Directory for cross-process lock and result files. When
+            omitted (or on platforms without ``fcntl``) coalescing is limited
+            to threads of the current process.
+        result_ttl: Seconds a leader's result stays reusable by workers that
+            were blocked on the file lock, in case the last one to read it
+            died before removing it.
+        sweep_interval: Seconds between sweeps of lock files for keys that
+            have been idle at least that long.
+    """
+
+    def __init__(self, lock_dir: Optional[str] = None, result_ttl: float = 30.0, sweep_interval: float = 300.0):
+        self.lock_dir = lock_dir if fcntl is not None else None
+        self.result_ttl = result_ttl
+        self.sweep_interval = sweep_interval
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+        if self.lock_dir:
+            os.makedirs(self.lock_dir, exist_ok=True)
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._run_shared(key, fn) if self.lock_dir else fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+        return call.result
+
+    def _run_shared(self, key: str, fn: Callable[[], Any]) -> Any:
+        self._maybe_sweep()
+        lock_path = os.path.join(self.lock_dir, f"{key}.lock")
+        users_path = os.path.join(self.lock_dir, f"{key}.users")
+        result_path = os.path.join(self.lock_dir, f"{key}.json")
+
+        with open(users_path, "a+") as users_handle, open(lock_path, "a+") as lock_handle:
+            # Registered before waiting, so the leader keeps the result for us.
+            fcntl.flock(users_handle, fcntl.LOCK_SH)
+            # mtime marks the key as recently used for the idle sweep.
+            os.utime(users_path)
+            os.utime(lock_path)
+            fcntl.flock(lock_handle, fcntl.LOCK_EX)
+            try:
+                cached = self._read_result(result_path)
+                if cached is not None:
+                    return cached["result"]
+
+                result = fn()
+                self._write_result(result_path, result)
+                return result
+            finally:
+                try:
+                    # Nobody else registered: no one is left to read the result.
+                    fcntl.flock(users_handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    _remove(result_path)
+                except OSError:
+                    pass
+                fcntl.flock(users_handle, fcntl.LOCK_UN)
+                fcntl.flock(lock_handle, fcntl.LOCK_UN)
+
+    def _maybe_sweep(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_sweep < self.sweep_interval:
+                return
+            self._last_sweep = now
+        self.sweep()
+
+    def sweep(self, max_idle: Optional[float] = None) -> int:
+        """Remove files of keys idle for ``max_idle`` seconds (default: the sweep interval).
+
+        A lock file is only removed while this process holds it, so a key in
+        use is never touched. Returns the number of files removed.
+        """
+        if not self.lock_dir:
+            return 0
+        cutoff = time.time() - (self.sweep_interval if max_idle is None else max_idle)
+        removed = 0
+        try:
+            names = os.listdir(self.lock_dir)
+        except OSError:
+            return 0
+        for name in names:
+            path = os.path.join(self.lock_dir, name)
+            try:
+                if os.path.getmtime(path) > cutoff:
+                    continue
+                if name.endswith((".json", ".tmp")):
+                    os.remove(path)
+                    removed += 1
+                elif name.endswith((".lock", ".users")):
+                    with open(path, "a+") as handle:
+                        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        os.remove(path)
+                    removed += 1
+            except OSError:
+                continue  # In use, or already gone
+        return removed
+
+    def _read_result(self, result_path: str) -> Optional[Dict[str, Any]]:
+        try:
+            if time.time() - os.path.getmtime(result_path) > self.result_ttl:
+                return None
+            with open(result_path, "r", encoding="utf-8") as file_handle:
+                return json.load(file_handle)
+        except (OSError, ValueError):
+            return None
+
+    def _write_result(self, result_path: str, result: Any) -> None:
+        try:
+            payload = json.dumps({"result": result})
+        except (TypeError, ValueError):
+            return  # Not shareable across processes; in-process waiters still get it.
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.lock_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file_handle:
+                file_handle.write(payload)
+            os.replace(tmp_path, result_path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+__all__ = ["SingleFlight"]
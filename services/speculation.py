@@ -0,0 +1,146 @@
+"""Opt-in speculative prefetch of likely follow-up requests.
+
+Dashboard users often regenerate the same text with the other voice gender
+or in another language right after a result comes back. With ``PREFETCH=1``
+a successful request records its target language and queues background jobs
+that warm the translation and audio caches for those variants, so the
+follow-up click is served from cache.
+
+Speculation only spends idle capacity: jobs run on one background thread,
+the queue is bounded (surplus variants are dropped rather than delayed),
+speculative provider calls run one at a time and only while the provider's
+limiter has headroom (``ProviderLimiter.has_headroom``), and long texts are
+never speculated on. Jobs are admitted as bulk work (see ``scheduler``).
+Callers must run speculative work through its own ``SingleFlight``:
+``SpeculationSkipped`` is raised inside the shared computation, and a live
+request coalesced onto it would otherwise receive that error.
+
+Configuration (environment):
+    PREFETCH            "1" enables speculation (default "0")
+    PREFETCH_LANGUAGES  how many likely next languages to warm (default 2)
+    PREFETCH_QUEUE      pending jobs kept before new ones are dropped (default 8)
+    PREFETCH_MAX_CHARS  longest input text speculated on (default 2000)
+    PREFETCH_RESERVE    share of provider capacity left to live traffic (default 0.5)
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Set
+
+from .rate_limiter import get_limiter
+from .scheduler import BULK, work_context
+
+# Clients whose last target language is remembered for transition counts.
+_MAX_CLIENTS = 10_000
+
+
+class SpeculationSkipped(RuntimeError):
+    """Raised inside a speculative job when the provider has no idle capacity."""
+
+
+class LanguageTransitions:
+    """Counts which target language users pick after another one."""
+
+    def __init__(self):
+        self._next: Dict[str, Counter] = {}
+        self._overall: Counter = Counter()
+        self._last_by_client: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, client: str, target_lang: str) -> None:
+        with self._lock:
+            self._overall[target_lang] += 1
+            previous = self._last_by_client.pop(client, None)
+            if previous and previous != target_lang:
+                self._next.setdefault(previous, Counter())[target_lang] += 1
+            self._last_by_client[client] = target_lang
+            while len(self._last_by_client) > _MAX_CLIENTS:
+                self._last_by_client.popitem(last=False)
+
+    def likely_next(self, target_lang: str, count: int, candidates: Optional[Iterable[str]] = None) -> List[str]:
+        """Languages most often chosen after ``target_lang``, then the most popular overall."""
+        allowed = set(candidates) if candidates is not None else None
+        with self._lock:
+            ranked = [lang for lang, _ in self._next.get(target_lang, Counter()).most_common()]
+            ranked += [lang for lang, _ in self._overall.most_common()]
+        languages: List[str] = []
+        for lang in ranked:
+            if lang == target_lang or lang in languages or (allowed is not None and lang not in allowed):
+                continue
+            languages.append(lang)
+            if len(languages) == count:
+                break
+        return languages
+
+
+class SpeculativePrefetcher:
+    """Bounded, single-threaded queue of cache warm-up jobs."""
+
+    def __init__(
+        self,
+        max_queue: Optional[int] = None,
+        max_chars: Optional[int] = None,
+        languages: Optional[int] = None,
+        reserve: Optional[float] = None,
+    ):
+        self.max_queue = max_queue or int(os.getenv("PREFETCH_QUEUE", "8"))
+        self.max_chars = max_chars or int(os.getenv("PREFETCH_MAX_CHARS", "2000"))
+        self.languages = languages if languages is not None else int(os.getenv("PREFETCH_LANGUAGES", "2"))
+        self.reserve = reserve if reserve is not None else float(os.getenv("PREFETCH_RESERVE", "0.5"))
+        self.transitions = LanguageTransitions()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: Set[Hashable] = set()
+        self._lock = threading.Lock()
+        # Speculative provider calls never overlap each other.
+        self._call_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return os.getenv("PREFETCH", "0") == "1"
+
+    def submit(self, key: Hashable, job: Callable[[], None]) -> bool:
+        """Queue ``job`` unless it is already pending or the queue is full."""
+        if not self.enabled:
+            return False
+        with self._lock:
+            if key in self._pending or len(self._pending) >= self.max_queue:
+                return False
+            self._pending.add(key)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
+            executor = self._executor
+        executor.submit(self._run, key, job)
+        return True
+
+    def _run(self, key: Hashable, job: Callable[[], None]) -> None:
+        try:
+            with work_context(BULK, "prefetch"):
+                job()
+        except SpeculationSkipped:
+            pass
+        except Exception as exc:
+            print(f"⚠️ Speculative prefetch failed: {exc}")
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+    def require_headroom(self, provider: str) -> None:
+        if not get_limiter(provider).has_headroom(self.reserve):
+            raise SpeculationSkipped(f"{provider} has no idle capacity")
+
+    def guard(self, provider: str, fn: Callable) -> Callable:
+        """Wrap a provider call so it runs serially and only on idle capacity."""
+
+        def _guarded(*args, **kwargs):
+            with self._call_lock:
+                self.require_headroom(provider)
+                return fn(*args, **kwargs)
+
+        return _guarded
+
+
+__all__ = ["LanguageTransitions", "SpeculationSkipped", "SpeculativePrefetcher"]
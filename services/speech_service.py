@@ -6,12 +6,18 @@ multiple text-to-speech engines can be selected at runtime.
 
 from __future__ import annotations
 
-import base64
 import os
 from typing import Dict, Optional
 
 from dotenv import load_dotenv
 
+from . import cpu_pool, timings, tracing
+from .audio_buffer import AudioBuffer
+from .audio_postprocess import postprocess_and_encode, postprocess_applies
+from .disk_cache import shared_cache
+from .rate_limiter import AdmissionTimeout, RateLimitedError, get_limiter
+from .sentence_cache import cache_key
+from .text_normalizer import normalize_for_speech
 from .tts_providers import (
     DEFAULT_PROVIDERS,
     BaseTTSProvider,
@@ -26,9 +32,16 @@ load_dotenv(env_path)
 class SpeechService:
     """Orchestrates synthesis calls across configured TTS providers."""
 
-    def __init__(self, output_dir: str = "output", providers: Optional[Dict[str, BaseTTSProvider]] = None):
+    def __init__(
+        self,
+        output_dir: str = "output",
+        providers: Optional[Dict[str, BaseTTSProvider]] = None,
+        cache=None,
+    ):
         self.output_dir = output_dir
         os.makedirs(self.output_dir, exist_ok=True)
+        # Host-wide audio cache (SHARED_CACHE_DIR) unless one is injected
+        self.cache = cache if cache is not None else shared_cache()
 
         # Lazy copy so each service instance can customise without mutating the default map
         self.providers: Dict[str, BaseTTSProvider] = providers.copy() if providers else DEFAULT_PROVIDERS.copy()
@@ -53,7 +66,13 @@ class SpeechService:
         gender: Optional[str] = None,
         rate: Optional[str] = None,
         pitch: Optional[str] = None,
+        audio_format: Optional[str] = None,
     ) -> Dict[str, object]:
+        """Synthesize ``text``; ``audio_format`` ('mp3', 'ogg', 'wav') re-encodes the provider output once.
+
+        Provider throttling (AdmissionTimeout, RateLimitedError) is raised
+        rather than reported as a failed result.
+        """
         if not text or not text.strip():
             return {
                 "file_path": None,
@@ -99,11 +118,34 @@ class SpeechService:
                         "normalized_text": None,
                     }
 
+        # Providers speak the expanded form (currency, dates, abbreviations)
+        text = normalize_for_speech(text, lang_code)
+
         file_path = os.path.join(self.output_dir, filename)
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
 
-        try:
-            provider_result = provider.synthesize(
+        key = cache_key("speech", tts_engine, text, lang_code, voice, gender, rate, pitch, audio_format)
+        words_key = cache_key("timings", key)
+        cached_audio = self.cache.get(key) if self.cache is not None else None
+        if self.cache is not None:
+            tracing.note(f"tts:{tts_engine}", hit=cached_audio is not None)
+        if cached_audio is not None:
+            AudioBuffer.write(cached_audio, file_path)
+            cached_words = self.cache.get(words_key)
+            return {
+                "file_path": file_path,
+                "filename": filename,
+                "success": True,
+                "message": "Synthesis successful.",
+                "tts_engine": tts_engine,
+                "audio_base64": cpu_pool.b64encode(cached_audio),
+                "normalized_text": text,
+                "format": audio_format or getattr(provider, "output_extension", None),
+                "word_timings": timings.decode(cached_words) if cached_words is not None else [],
+            }
+
+        def _synthesize():
+            return provider.synthesize(
                 text=text,
                 lang=lang_code,
                 gender=gender,
@@ -112,6 +154,16 @@ class SpeechService:
                 voice=voice,
                 output_path=file_path,
             )
+
+        try:
+            with tracing.span(f"tts:{tts_engine}", chars=len(text), voice=voice):
+                if provider.limiter:
+                    provider_result = get_limiter(provider.limiter).call(_synthesize, chars=len(text))
+                else:
+                    provider_result = _synthesize()
+        except (AdmissionTimeout, RateLimitedError):
+            # Throttling is reported as 503 + Retry-After by the caller.
+            raise
         except Exception as exc:
             return {
                 "file_path": None,
@@ -123,12 +175,13 @@ class SpeechService:
                 "normalized_text": None,
             }
 
-        audio_bytes = provider_result.get("audio_bytes") if provider_result else None
-        if audio_bytes is None and os.path.exists(file_path):
-            with open(file_path, "rb") as file_handle:
-                audio_bytes = file_handle.read()
+        # Providers write file_path themselves; the buffer maps that file
+        # rather than holding a second copy of it.
+        audio = provider_result.get("audio") if provider_result else None
+        if audio is None and os.path.exists(file_path):
+            audio = AudioBuffer.from_file(file_path)
 
-        if audio_bytes is None:
+        if audio is None:
             return {
                 "file_path": None,
                 "filename": filename,
@@ -139,11 +192,48 @@ class SpeechService:
                 "normalized_text": None,
             }
 
-        if not os.path.exists(file_path):
-            with open(file_path, "wb") as file_handle:
-                file_handle.write(audio_bytes)
+        source_format = (provider_result or {}).get("format") or getattr(provider, "output_extension", None)
+        target_format = audio_format or source_format
+        processed_bytes = audio.view
+        # Engines without boundary events leave this empty (see timings.estimate).
+        words = (provider_result or {}).get("words") or []
+        # Post-processing (decoding compressed output first) and the format
+        # conversion share one step, so the clip is encoded at most once.
+        if source_format and (postprocess_applies(source_format) or target_format != source_format):
+            try:
+                with tracing.span("postprocess", source=source_format, target=target_format):
+                    processed = cpu_pool.run_on_buffer(
+                        postprocess_and_encode, audio.view, source_format, target_format
+                    )
+                processed_bytes = processed.audio
+                # The track was timed against the untrimmed clip.
+                words = timings.shift(words, -processed.trimmed_ms) if processed.trimmed_ms else words
+            except Exception as exc:
+                audio.release()
+                return {
+                    "file_path": None,
+                    "filename": filename,
+                    "success": False,
+                    "message": str(exc),
+                    "tts_engine": tts_engine,
+                    "audio_base64": None,
+                    "normalized_text": None,
+                }
+
+        if processed_bytes is not audio.view or audio.path != file_path:
+            written = AudioBuffer.write(processed_bytes, file_path)
+            if processed_bytes is not audio.view:
+                audio.release()
+            audio = written
 
-        audio_base64 = base64.b64encode(audio_bytes).decode("utf-8")
+        if self.cache is not None:
+            self.cache.set(key, audio.view)
+            if words:
+                self.cache.set(words_key, timings.encode(words))
+        tracing.note(f"tts:{tts_engine}", nbytes=len(audio))
+
+        audio_base64 = audio.b64encode()
+        audio.release()
         normalized_text = provider_result.get("normalized_text") if provider_result else None
 
         return {
@@ -154,6 +244,8 @@ class SpeechService:
             "tts_engine": tts_engine,
             "audio_base64": audio_base64,
             "normalized_text": normalized_text or text,
+            "format": audio_format or source_format,
+            "word_timings": words,
         }
 
     @staticmethod
@@ -173,8 +265,13 @@ class SpeechService:
             },
         }
 
-    @staticmethod
-    def get_voice_by_gender_and_age(gender="Female", age_tone="Adult"):
+    def get_voice_by_gender_and_age(self, gender="Female", age_tone="Adult", tts_engine=None, lang_code=None):
+        """Pick a voice for the engine; Piper voices are returned as "<voice>:<speaker>"."""
+        if tts_engine == "piper":
+            piper_voice = self._get_piper_voice(gender, lang_code)
+            if piper_voice:
+                return piper_voice
+
         voice_map = {
             "Female": {
                 "Child": "nova",
@@ -197,6 +294,22 @@ class SpeechService:
             return "onyx"
         return "alloy"
 
+    def _get_piper_voice(self, gender, lang_code):
+        provider = self.providers.get("piper")
+        registry = getattr(provider, "registry", None)
+        if registry is None:
+            return None
+
+        voice = registry.resolve(lang_code or "")
+        if voice is None:
+            return None
+
+        speaker_id = registry.resolve_speaker(voice, gender=gender)
+        if speaker_id is None:
+            return voice.name
+        speaker_names = {speaker: name for name, speaker in voice.speaker_id_map.items()}
+        return f"{voice.name}:{speaker_names.get(speaker_id, speaker_id)}"
+
     def get_output_path(self, filename="output.mp3"):
         return os.path.join(self.output_dir, filename)
 
@@ -0,0 +1,297 @@
+"""Canonical text forms for translation, synthesis and cache keys.
+
+Two passes, both driven by precompiled regex tables and memoized:
+
+* ``canonicalize`` folds spellings that mean the same thing onto one form
+  (NFC, native digits to ASCII, digit grouping, ``Rs 100``/``INR 100``/
+  ``₹ 100/-`` to ``₹100``, whitespace). It runs before language detection and
+  translation, so equivalent inputs share translation and audio cache entries.
+* ``normalize_for_speech`` additionally expands currency, percentages, dates
+  and common abbreviations into words of the target language, for the
+  languages in ``LANGUAGE_CONFIG``. It runs right before synthesis and its
+  output is what providers speak and what ``normalized_text`` reports.
+
+Numbers are spelled out (Indian grouping: lakh, crore) with the
+``num2words`` package, for English, Bengali and Telugu only: num2words has
+no Hindi, Marathi, Gujarati, Punjabi, Odia, Assamese, Tamil, Malayalam or
+Urdu converter, and its Kannada output repeats words above 99,999. In those
+languages digits are left for the voice to read, which Azure's neural voices
+do natively. Digit runs longer than nine digits (phone and account numbers)
+and numbers with leading zeros are never spelled out.
+
+Configuration (environment):
+    TEXT_NORMALIZER_CACHE_SIZE  memoized texts per pass (default 4096)
+    TEXT_SPELL_NUMBERS          "0" keeps digits in every language (default "1")
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import unicodedata
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+from typing import Callable, Dict, FrozenSet, List, NamedTuple, Optional, Tuple, Union
+
+try:
+    from num2words import num2words
+except ImportError:  # pragma: no cover - optional dependency
+    num2words = None
+
+_CACHE_SIZE = int(os.getenv("TEXT_NORMALIZER_CACHE_SIZE", "4096"))
+
+# Zero of each native digit block used by the supported languages.
+_DIGIT_ZEROS = (
+    0x0660,  # Arabic-Indic
+    0x06F0,  # Extended Arabic-Indic (Urdu)
+    0x0966,  # Devanagari
+    0x09E6,  # Bengali / Assamese
+    0x0A66,  # Gurmukhi
+    0x0AE6,  # Gujarati
+    0x0B66,  # Odia
+    0x0BE6,  # Tamil
+    0x0C66,  # Telugu
+    0x0CE6,  # Kannada
+    0x0D66,  # Malayalam
+)
+_CANONICAL_CHARS = {zero + offset: str(offset) for zero in _DIGIT_ZEROS for offset in range(10)}
+_CANONICAL_CHARS.update({
+    0x200B: None,  # zero width space
+    0xFEFF: None,  # byte order mark
+    0x00A0: " ",
+    0x2018: "'",
+    0x2019: "'",
+    0x201C: '"',
+    0x201D: '"',
+})
+
+_NUMBER = r"\d+(?:\.\d+)?"
+
+Replacement = Union[str, Callable[["re.Match[str]"], str]]
+
+_CANONICAL_RULES: List[Tuple["re.Pattern[str]", Replacement]] = [
+    # Western (1,000,000) and Indian (10,00,000) digit grouping.
+    (
+        re.compile(r"\b\d{1,3}(?:,\d{3})+(?!\d)|\b\d{1,2}(?:,\d{2})+,\d{3}(?!\d)"),
+        lambda match: match.group(0).replace(",", ""),
+    ),
+    (
+        re.compile(rf"(?:₹|(?<![^\W\d_])(?:rs\.?|inr)|रु\.?|रू\.?)\s*({_NUMBER})(?:\s*/-)?", re.IGNORECASE),
+        r"₹\1",
+    ),
+    (re.compile(rf"({_NUMBER})\s+%"), r"\1%"),
+    (re.compile(r"[ \t]+"), " "),
+    (re.compile(r" ?\n ?"), "\n"),
+]
+
+
+class _LanguageRules(NamedTuple):
+    currency: str
+    percent: str
+    months: Tuple[str, ...]
+    abbreviations: Dict[str, str] = {}
+
+
+_LANGUAGE_RULES: Dict[str, _LanguageRules] = {
+    "as": _LanguageRules(
+        "টকা",
+        "শতাংশ",
+        ("জানুৱাৰী", "ফেব্ৰুৱাৰী", "মাৰ্চ", "এপ্ৰিল", "মে", "জুন",
+         "জুলাই", "আগষ্ট", "ছেপ্তেম্বৰ", "অক্টোবৰ", "নৱেম্বৰ", "ডিচেম্বৰ"),
+    ),
+    "bn": _LanguageRules(
+        "টাকা",
+        "শতাংশ",
+        ("জানুয়ারি", "ফেব্রুয়ারি", "মার্চ", "এপ্রিল", "মে", "জুন",
+         "জুলাই", "আগস্ট", "সেপ্টেম্বর", "অক্টোবর", "নভেম্বর", "ডিসেম্বর"),
+        {"ডঃ": "ডক্টর"},
+    ),
+    "en": _LanguageRules(
+        "rupees",
+        "percent",
+        ("January", "February", "March", "April", "May", "June",
+         "July", "August", "September", "October", "November", "December"),
+        {
+            "Dr.": "Doctor",
+            "Mr.": "Mister",
+            "Mrs.": "Missus",
+            "Prof.": "Professor",
+            "e.g.": "for example",
+            "i.e.": "that is",
+            "etc.": "et cetera",
+            "approx.": "approximately",
+        },
+    ),
+    "gu": _LanguageRules(
+        "રૂપિયા",
+        "ટકા",
+        ("જાન્યુઆરી", "ફેબ્રુઆરી", "માર્ચ", "એપ્રિલ", "મે", "જૂન",
+         "જુલાઈ", "ઑગસ્ટ", "સપ્ટેમ્બર", "ઑક્ટોબર", "નવેમ્બર", "ડિસેમ્બર"),
+        {"ડૉ.": "ડૉક્ટર"},
+    ),
+    "hi": _LanguageRules(
+        "रुपये",
+        "प्रतिशत",
+        ("जनवरी", "फ़रवरी", "मार्च", "अप्रैल", "मई", "जून",
+         "जुलाई", "अगस्त", "सितंबर", "अक्टूबर", "नवंबर", "दिसंबर"),
+        {"डॉ.": "डॉक्टर", "श्री.": "श्री", "कि.मी.": "किलोमीटर"},
+    ),
+    "kn": _LanguageRules(
+        "ರೂಪಾಯಿ",
+        "ಶೇಕಡಾ",
+        ("ಜನವರಿ", "ಫೆಬ್ರವರಿ", "ಮಾರ್ಚ್", "ಏಪ್ರಿಲ್", "ಮೇ", "ಜೂನ್",
+         "ಜುಲೈ", "ಆಗಸ್ಟ್", "ಸೆಪ್ಟೆಂಬರ್", "ಅಕ್ಟೋಬರ್", "ನವೆಂಬರ್", "ಡಿಸೆಂಬರ್"),
+        {"ಡಾ.": "ಡಾಕ್ಟರ್"},
+    ),
+    "ml": _LanguageRules(
+        "രൂപ",
+        "ശതമാനം",
+        ("ജനുവരി", "ഫെബ്രുവരി", "മാർച്ച്", "ഏപ്രിൽ", "മേയ്", "ജൂൺ",
+         "ജൂലൈ", "ഓഗസ്റ്റ്", "സെപ്റ്റംബർ", "ഒക്ടോബർ", "നവംബർ", "ഡിസംബർ"),
+        {"ഡോ.": "ഡോക്ടർ"},
+    ),
+    "mr": _LanguageRules(
+        "रुपये",
+        "टक्के",
+        ("जानेवारी", "फेब्रुवारी", "मार्च", "एप्रिल", "मे", "जून",
+         "जुलै", "ऑगस्ट", "सप्टेंबर", "ऑक्टोबर", "नोव्हेंबर", "डिसेंबर"),
+        {"डॉ.": "डॉक्टर"},
+    ),
+    "or": _LanguageRules(
+        "ଟଙ୍କା",
+        "ପ୍ରତିଶତ",
+        ("ଜାନୁଆରୀ", "ଫେବୃଆରୀ", "ମାର୍ଚ୍ଚ", "ଅପ୍ରେଲ", "ମଇ", "ଜୁନ",
+         "ଜୁଲାଇ", "ଅଗଷ୍ଟ", "ସେପ୍ଟେମ୍ବର", "ଅକ୍ଟୋବର", "ନଭେମ୍ବର", "ଡିସେମ୍ବର"),
+    ),
+    "pa": _LanguageRules(
+        "ਰੁਪਏ",
+        "ਪ੍ਰਤੀਸ਼ਤ",
+        ("ਜਨਵਰੀ", "ਫ਼ਰਵਰੀ", "ਮਾਰਚ", "ਅਪ੍ਰੈਲ", "ਮਈ", "ਜੂਨ",
+         "ਜੁਲਾਈ", "ਅਗਸਤ", "ਸਤੰਬਰ", "ਅਕਤੂਬਰ", "ਨਵੰਬਰ", "ਦਸੰਬਰ"),
+        {"ਡਾ.": "ਡਾਕਟਰ"},
+    ),
+    "ta": _LanguageRules(
+        "ரூபாய்",
+        "சதவீதம்",
+        ("ஜனவரி", "பிப்ரவரி", "மார்ச்", "ஏப்ரல்", "மே", "ஜூன்",
+         "ஜூலை", "ஆகஸ்ட்", "செப்டம்பர்", "அக்டோபர்", "நவம்பர்", "டிசம்பர்"),
+        {"டாக்.": "டாக்டர்"},
+    ),
+    "te": _LanguageRules(
+        "రూపాయలు",
+        "శాతం",
+        ("జనవరి", "ఫిబ్రవరి", "మార్చి", "ఏప్రిల్", "మే", "జూన్",
+         "జూలై", "ఆగస్టు", "సెప్టెంబర్", "అక్టోబర్", "నవంబర్", "డిసెంబర్"),
+        {"డా.": "డాక్టర్"},
+    ),
+    "ur": _LanguageRules(
+        "روپے",
+        "فیصد",
+        ("جنوری", "فروری", "مارچ", "اپریل", "مئی", "جون",
+         "جولائی", "اگست", "ستمبر", "اکتوبر", "نومبر", "دسمبر"),
+    ),
+}
+
+# Indian convention: day/month/year.
+_DATE = re.compile(r"\b(\d{1,2})[/.-](\d{1,2})[/.-](\d{4})\b")
+
+# num2words converters whose output was checked for each language (see above).
+_NUMBER_LANGUAGES = {"en": "en_IN", "bn": "bn", "te": "te"}
+# A standalone number of at most nine digits, without a leading zero.
+_SPOKEN_NUMBER = re.compile(r"(?<![\w.])(?!0\d)\d{1,9}(?:\.\d+)?(?!\w|\.\d)")
+
+
+def number_spelling_available(lang: Optional[str] = None) -> bool:
+    """True when numbers are spelled out (for ``lang``, if given)."""
+    if num2words is None or os.getenv("TEXT_SPELL_NUMBERS", "1") == "0":
+        return False
+    return lang is None or _language_key(lang) in _NUMBER_LANGUAGES
+
+
+def _language_key(lang: Optional[str]) -> str:
+    return (lang or "").replace("_", "-").split("-")[0].lower()
+
+
+@lru_cache(maxsize=None)
+def _speech_rules(lang: str) -> Tuple[Tuple["re.Pattern[str]", Replacement], ...]:
+    """Compile the expansion table for one language (once per process)."""
+    rules = _LANGUAGE_RULES.get(lang)
+    if rules is None:
+        return ()
+
+    def _expand_date(match: "re.Match[str]") -> str:
+        day, month, year = int(match.group(1)), int(match.group(2)), match.group(3)
+        if not (1 <= day <= 31 and 1 <= month <= 12):
+            return match.group(0)
+        return f"{day} {rules.months[month - 1]} {year}"
+
+    table: List[Tuple["re.Pattern[str]", Replacement]] = [
+        (_DATE, _expand_date),
+        (re.compile(rf"₹({_NUMBER})"), rf"\1 {rules.currency}"),
+        (re.compile(rf"({_NUMBER})%"), rf"\1 {rules.percent}"),
+    ]
+    if rules.abbreviations:
+        # Longest first so "e.g." is not shadowed by a shorter entry.
+        alternatives = sorted(rules.abbreviations, key=len, reverse=True)
+        pattern = re.compile(r"(?<!\w)(" + "|".join(re.escape(item) for item in alternatives) + r")(?=\s|$)")
+        table.append((pattern, lambda match: rules.abbreviations[match.group(1)]))
+    if number_spelling_available(lang):
+        converter = _NUMBER_LANGUAGES[lang]
+
+        def _spell_number(match: "re.Match[str]") -> str:
+            number = match.group(0)
+            try:
+                return num2words(Decimal(number) if "." in number else int(number), lang=converter)
+            except (NotImplementedError, InvalidOperation, OverflowError, ValueError):
+                return number
+
+        # Last, so currency, percentages and dates are expanded around their digits first.
+        table.append((_SPOKEN_NUMBER, _spell_number))
+    return tuple(table)
+
+
+# Characters that end a sentence in the supported scripts.
+SENTENCE_TERMINATORS = ".!?।॥۔"
+
+
+@lru_cache(maxsize=None)
+def sentence_abbreviations() -> FrozenSet[str]:
+    """Abbreviations of every supported language that end in a sentence terminator.
+
+    Sentence splitters must not break after these ("Dr. Rao", "e.g. this").
+    """
+    return frozenset(
+        abbreviation
+        for rules in _LANGUAGE_RULES.values()
+        for abbreviation in rules.abbreviations
+        if abbreviation[-1] in SENTENCE_TERMINATORS
+    )
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def canonicalize(text: str) -> str:
+    """Return the language-independent canonical form of ``text``."""
+    if not text:
+        return text
+    canonical = unicodedata.normalize("NFC", text).translate(_CANONICAL_CHARS)
+    for pattern, replacement in _CANONICAL_RULES:
+        canonical = pattern.sub(replacement, canonical)
+    return canonical.strip()
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def normalize_for_speech(text: str, lang: Optional[str]) -> str:
+    """Return ``text`` as it should be spoken in ``lang`` (canonicalized first)."""
+    spoken = canonicalize(text)
+    for pattern, replacement in _speech_rules(_language_key(lang)):
+        spoken = pattern.sub(replacement, spoken)
+    return spoken
+
+
+__all__ = [
+    "SENTENCE_TERMINATORS",
+    "canonicalize",
+    "normalize_for_speech",
+    "number_spelling_available",
+    "sentence_abbreviations",
+]
@@ -0,0 +1,118 @@
+"""Word-level timing tracks and subtitle export.
+
+A timing track is a list of ``WordTiming(start_ms, end_ms, text)`` entries,
+one per spoken word, in milliseconds from the start of the clip. Azure
+reports word boundaries while it synthesizes; for engines without boundary
+events (Piper) the track is estimated by spreading the clip's duration over
+its words in proportion to their phoneme counts (``estimate``).
+
+Tracks are small enough to return with every response (each entry
+serializes as ``[start_ms, end_ms, "word"]``) and to cache next to the audio
+(``encode``/``decode``). Clients use them to highlight and seek by word;
+``to_webvtt`` and ``to_srt`` render them as subtitle files.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Iterable, List, NamedTuple, Optional, Sequence
+from xml.sax.saxutils import escape
+
+# Subtitle cues are cut after this many words or this long, whichever comes first.
+_CUE_MAX_WORDS = 7
+_CUE_MAX_MS = 3500
+
+
+class WordTiming(NamedTuple):
+    start_ms: int
+    end_ms: int
+    text: str
+
+
+class TimedAudio(NamedTuple):
+    """Audio together with its word timing track."""
+
+    audio: bytes
+    words: List[WordTiming]
+
+
+def encode(words: Sequence[WordTiming]) -> bytes:
+    return json.dumps([list(word) for word in words], ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def decode(data: bytes) -> List[WordTiming]:
+    return [WordTiming(int(start), int(end), text) for start, end, text in json.loads(bytes(data).decode("utf-8"))]
+
+
+def shift(words: Iterable[WordTiming], offset_ms: int) -> List[WordTiming]:
+    """Move a track by ``offset_ms``, e.g. to place a segment within a joined clip.
+
+    A negative offset (leading silence trimmed off the clip) clamps at 0.
+    """
+    return [
+        WordTiming(max(0, word.start_ms + offset_ms), max(0, word.end_ms + offset_ms), word.text)
+        for word in words
+    ]
+
+
+def estimate(text: str, duration_ms: int, weights: Optional[Sequence[float]] = None) -> List[WordTiming]:
+    """Spread ``duration_ms`` over the words of ``text``.
+
+    ``weights`` gives each word's relative length (phoneme counts when the
+    engine can phonemize); without them, or when they do not line up with
+    the words, character counts are used.
+    """
+    words = text.split()
+    if not words or duration_ms <= 0:
+        return []
+    if weights is None or len(weights) != len(words) or not any(weights):
+        weights = [len(word) for word in words]
+
+    total = float(sum(weights))
+    track: List[WordTiming] = []
+    elapsed = 0.0
+    for word, weight in zip(words, weights):
+        start = elapsed
+        elapsed += duration_ms * weight / total
+        track.append(WordTiming(int(round(start)), int(round(elapsed)), word))
+    return track
+
+
+def _cues(words: Sequence[WordTiming]) -> List[List[WordTiming]]:
+    cues: List[List[WordTiming]] = []
+    for word in words:
+        if not cues or len(cues[-1]) >= _CUE_MAX_WORDS or word.end_ms - cues[-1][0].start_ms > _CUE_MAX_MS:
+            cues.append([])
+        cues[-1].append(word)
+    return cues
+
+
+def _timestamp(ms: int, separator: str) -> str:
+    hours, ms = divmod(max(0, int(ms)), 3_600_000)
+    minutes, ms = divmod(ms, 60_000)
+    seconds, ms = divmod(ms, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{separator}{ms:03d}"
+
+
+def to_webvtt(words: Sequence[WordTiming]) -> str:
+    """WebVTT with one cue per phrase and inline per-word timestamps for highlighting."""
+    lines = ["WEBVTT", ""]
+    for cue in _cues(words):
+        lines.append(f"{_timestamp(cue[0].start_ms, '.')} --> {_timestamp(cue[-1].end_ms, '.')}")
+        text = escape(cue[0].text)
+        for word in cue[1:]:
+            text += f" <{_timestamp(word.start_ms, '.')}>{escape(word.text)}"
+        lines.extend([text, ""])
+    return "\n".join(lines)
+
+
+def to_srt(words: Sequence[WordTiming]) -> str:
+    lines: List[str] = []
+    for index, cue in enumerate(_cues(words), start=1):
+        lines.append(str(index))
+        lines.append(f"{_timestamp(cue[0].start_ms, ',')} --> {_timestamp(cue[-1].end_ms, ',')}")
+        lines.extend([" ".join(word.text for word in cue), ""])
+    return "\n".join(lines)
+
+
+__all__ = ["TimedAudio", "WordTiming", "decode", "encode", "estimate", "shift", "to_srt", "to_webvtt"]
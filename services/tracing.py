@@ -0,0 +1,179 @@
+"""Opt-in per-request tracing.
+
+A request that asks for tracing (``X-Trace: 1`` header, ``"trace": true`` in
+the payload, or ``TRACING=1`` for every request) collects a span for each
+stage it runs: language detection, translation, synthesis, pitch shifting,
+file writes. Spans accumulate into a ``timings`` summary (milliseconds,
+cache hits/misses and bytes per stage) that the endpoint returns, and are
+appended to ``TRACE_LOG`` (default ``output/trace_events.json``) in the Chrome
+trace-event format, which chrome://tracing and https://ui.perfetto.dev open
+offline.
+
+When no trace is active every helper here is a cheap no-op.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+_current: "contextvars.ContextVar[Optional[Trace]]" = contextvars.ContextVar("trace", default=None)
+_log_lock = threading.Lock()
+
+
+class Trace:
+    """Spans and per-stage totals for one request."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.started = time.perf_counter()
+        self.started_epoch_us = int(time.time() * 1_000_000)
+        self.events: List[Dict[str, Any]] = []
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _stage(self, stage: str) -> Dict[str, float]:
+        return self.stages.setdefault(stage, {"ms": 0.0, "count": 0, "cache_hits": 0, "cache_misses": 0, "bytes": 0})
+
+    def add_span(self, stage: str, start: float, end: float, args: Dict[str, Any]) -> None:
+        with self._lock:
+            totals = self._stage(stage)
+            totals["ms"] += (end - start) * 1000
+            totals["count"] += 1
+            self.events.append({
+                "name": stage,
+                "cat": self.name,
+                "ph": "X",
+                "ts": self.started_epoch_us + int((start - self.started) * 1_000_000),
+                "dur": int((end - start) * 1_000_000),
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": dict(args, trace_id=self.trace_id),
+            })
+
+    def note(self, stage: str, *, hit: Optional[bool] = None, nbytes: Optional[int] = None) -> None:
+        with self._lock:
+            totals = self._stage(stage)
+            if hit is True:
+                totals["cache_hits"] += 1
+            elif hit is False:
+                totals["cache_misses"] += 1
+            if nbytes:
+                totals["bytes"] += nbytes
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "trace_id": self.trace_id,
+                "total_ms": round((time.perf_counter() - self.started) * 1000, 2),
+                "stages": {
+                    stage: dict(totals, ms=round(totals["ms"], 2)) for stage, totals in self.stages.items()
+                },
+            }
+
+
+class _Span:
+    __slots__ = ("args",)
+
+    def __init__(self, args: Dict[str, Any]):
+        self.args = args
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+def tracing_requested(headers: Any, payload: Any = None) -> bool:
+    """True when the environment, an ``X-Trace`` header or the payload asks for tracing.
+
+    ``payload`` is the request's parsed JSON; bodies that are not objects are
+    left for the view to reject.
+    """
+    if os.getenv("TRACING", "0") == "1":
+        return True
+    if str(headers.get("X-Trace", "")).lower() in {"1", "true", "yes"}:
+        return True
+    return isinstance(payload, dict) and bool(payload.get("trace"))
+
+
+@contextmanager
+def request_trace(name: str, enabled: bool) -> Iterator[Optional[Trace]]:
+    """Activate a trace for the enclosed request handling and log it afterwards."""
+    if not enabled:
+        yield None
+        return
+    trace = Trace(name)
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+        trace.add_span(name, trace.started, time.perf_counter(), {})
+        _write_events(trace.events)
+
+
+@contextmanager
+def span(stage: str, **args: Any) -> Iterator[_Span]:
+    """Time the enclosed block as ``stage``; extra keyword args land in the trace event."""
+    trace = _current.get()
+    current = _Span(args)
+    if trace is None:
+        yield current
+        return
+    start = time.perf_counter()
+    try:
+        yield current
+    finally:
+        trace.add_span(stage, start, time.perf_counter(), current.args)
+
+
+def note(stage: str, *, hit: Optional[bool] = None, nbytes: Optional[int] = None) -> None:
+    """Record a cache hit/miss and/or a byte count against ``stage``."""
+    trace = _current.get()
+    if trace is not None:
+        trace.note(stage, hit=hit, nbytes=nbytes)
+
+
+def bind(fn: Callable) -> Callable:
+    """Wrap ``fn`` so calls from worker threads run inside the caller's trace.
+
+    The whole context is carried over, so the caller's scheduling class and
+    tenant (see ``scheduler``) apply in the worker as well.
+    """
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.copy().run(fn, *args, **kwargs)
+
+
+def _write_events(events: List[Dict[str, Any]]) -> None:
+    # Chrome's JSON array format tolerates a missing closing bracket, so the
+    # log stays appendable: "[" once, then one event per line.
+    path = os.getenv("TRACE_LOG", os.path.join("output", "trace_events.json"))
+    lines = "".join(json.dumps(event, ensure_ascii=False) + ",\n" for event in events)
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with _log_lock, open(path, "a", encoding="utf-8") as file_handle:
+            if file_handle.tell() == 0:
+                file_handle.write("[\n")
+            file_handle.write(lines)
+    except OSError as exc:
+        print(f"⚠️ Could not write trace events: {exc}")
+
+
+__all__ = [
+    "Trace",
+    "bind",
+    "current_trace",
+    "note",
+    "request_trace",
+    "span",
+    "tracing_requested",
+]
@@ -0,0 +1,196 @@
+"""Pluggable machine-translation backends for ``TranslationService``.
+
+``GoogleTranslationBackend`` calls Google Translate through deep-translator
+(network round trip, shared rate limit). ``CTranslate2Backend`` runs a local
+multilingual model (e.g. NLLB-200 distilled, converted with
+``ct2-transformers-converter``) on the CPU: it is loaded once per process and
+translates lists of sentences in batched inference, so throughput is bounded
+by local cores rather than a remote quota.
+
+``TRANSLATION_BACKEND`` selects the chain:
+    google       Google only (default)
+    local        the CTranslate2 model only
+    auto         the local model for pairs it supports, Google otherwise
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from typing import List, Optional, Sequence
+
+from deep_translator import GoogleTranslator
+from deep_translator.exceptions import TooManyRequests
+
+from .rate_limiter import RateLimitedError, get_limiter
+
+try:
+    import ctranslate2
+    import sentencepiece
+except ImportError:  # pragma: no cover - optional dependency
+    ctranslate2 = None
+    sentencepiece = None
+
+
+# FLORES-200 codes used by NLLB for the application's languages.
+FLORES_CODES = {
+    "as": "asm_Beng",
+    "bn": "ben_Beng",
+    "en": "eng_Latn",
+    "gu": "guj_Gujr",
+    "hi": "hin_Deva",
+    "kn": "kan_Knda",
+    "ml": "mal_Mlym",
+    "mr": "mar_Deva",
+    "or": "ory_Orya",
+    "pa": "pan_Guru",
+    "ta": "tam_Taml",
+    "te": "tel_Telu",
+    "ur": "urd_Arab",
+}
+
+
+class BaseTranslationBackend:
+    """Common interface for translation backends."""
+
+    name: str = "base"
+    # True when translate_batch runs one batched inference rather than a loop.
+    batched: bool = False
+
+    def supports(self, source_lang: str, target_lang: str) -> bool:
+        return True
+
+    def count_tokens(self, text: str) -> int:
+        """Approximate subword count, used to size batches under a token budget."""
+        return len(text) // 4 + 1
+
+    def translate(self, text: str, source_lang: str, target_lang: str) -> str:
+        raise NotImplementedError
+
+    def translate_batch(self, texts: Sequence[str], source_lang: str, target_lang: str) -> List[str]:
+        return [self.translate(text, source_lang, target_lang) for text in texts]
+
+
+class GoogleTranslationBackend(BaseTranslationBackend):
+    """Google Translate via deep-translator, admitted through the 'google' limiter."""
+
+    name = "google"
+
+    def translate(self, text: str, source_lang: str, target_lang: str) -> str:
+        translator = GoogleTranslator(source=source_lang, target=target_lang)
+        return get_limiter("google").call(lambda: self._translate(translator, text), chars=len(text))
+
+    @staticmethod
+    def _translate(translator, text):
+        """Run a Google translation, surfacing throttling to the rate limiter."""
+        try:
+            return translator.translate(text)
+        except TooManyRequests as exc:
+            raise RateLimitedError(f"Google Translate was throttled: {exc}") from exc
+
+
+class CTranslate2Backend(BaseTranslationBackend):
+    """Local NLLB-style model served by CTranslate2 on the CPU."""
+
+    name = "ctranslate2"
+    batched = True
+
+    def __init__(
+        self,
+        model_dir: str,
+        tokenizer_path: Optional[str] = None,
+        inter_threads: Optional[int] = None,
+        intra_threads: int = 0,
+        max_batch_size: Optional[int] = None,
+        beam_size: Optional[int] = None,
+    ):
+        self.model_dir = model_dir
+        self.tokenizer_path = tokenizer_path or os.path.join(model_dir, "sentencepiece.bpe.model")
+        self.inter_threads = inter_threads or int(os.getenv("CT2_INTER_THREADS", "1"))
+        self.intra_threads = intra_threads
+        self.max_batch_size = max_batch_size or int(os.getenv("CT2_MAX_BATCH", "32"))
+        self.beam_size = beam_size or int(os.getenv("CT2_BEAM_SIZE", "2"))
+        self._translator = None
+        self._tokenizer = None
+        self._load_lock = threading.Lock()
+
+    @staticmethod
+    def available() -> bool:
+        return ctranslate2 is not None and sentencepiece is not None
+
+    def supports(self, source_lang: str, target_lang: str) -> bool:
+        # Without the runtime or the model every call would fail and fall back.
+        if not self.available() or not os.path.isdir(self.model_dir):
+            return False
+        return source_lang in FLORES_CODES and target_lang in FLORES_CODES
+
+    def _load(self):
+        if self._translator is None:
+            with self._load_lock:
+                if self._translator is None:
+                    if not self.available():
+                        raise RuntimeError(
+                            "Local translation requires 'ctranslate2' and 'sentencepiece'. "
+                            "Install them via 'pip install ctranslate2 sentencepiece'."
+                        )
+                    self._tokenizer = sentencepiece.SentencePieceProcessor(model_file=self.tokenizer_path)
+                    self._translator = ctranslate2.Translator(
+                        self.model_dir,
+                        device="cpu",
+                        inter_threads=self.inter_threads,
+                        intra_threads=self.intra_threads,
+                    )
+        return self._translator, self._tokenizer
+
+    def count_tokens(self, text: str) -> int:
+        if self._tokenizer is None:
+            return super().count_tokens(text)
+        # Language token and </s> on top of the pieces.
+        return len(self._tokenizer.encode(text)) + 2
+
+    def translate(self, text: str, source_lang: str, target_lang: str) -> str:
+        return self.translate_batch([text], source_lang, target_lang)[0]
+
+    def translate_batch(self, texts: Sequence[str], source_lang: str, target_lang: str) -> List[str]:
+        if not texts:
+            return []
+        translator, tokenizer = self._load()
+        source_code, target_code = FLORES_CODES[source_lang], FLORES_CODES[target_lang]
+
+        tokens = [[source_code] + tokenizer.encode(text, out_type=str) + ["</s>"] for text in texts]
+        # The model shares the host CPU with local TTS engines, so batches
+        # queue for it by priority like any upstream call.
+        results = get_limiter("local").call(
+            lambda: translator.translate_batch(
+                tokens,
+                target_prefix=[[target_code]] * len(tokens),
+                max_batch_size=self.max_batch_size,
+                beam_size=self.beam_size,
+            )
+        )
+        # Drop the forced target-language token before detokenizing.
+        return [tokenizer.decode(result.hypotheses[0][1:]) for result in results]
+
+
+def default_backends() -> List[BaseTranslationBackend]:
+    """Build the backend chain selected by ``TRANSLATION_BACKEND``."""
+    mode = os.getenv("TRANSLATION_BACKEND", "google").strip().lower()
+    backends: List[BaseTranslationBackend] = []
+    if mode in {"local", "auto"}:
+        model_dir = os.getenv("CT2_MODEL_DIR")
+        if model_dir:
+            backends.append(CTranslate2Backend(model_dir, tokenizer_path=os.getenv("CT2_TOKENIZER") or None))
+        else:
+            print("⚠️ TRANSLATION_BACKEND requests a local model but CT2_MODEL_DIR is not set.")
+    if mode != "local" or not backends:
+        backends.append(GoogleTranslationBackend())
+    return backends
+
+
+__all__ = [
+    "BaseTranslationBackend",
+    "CTranslate2Backend",
+    "FLORES_CODES",
+    "GoogleTranslationBackend",
+    "default_backends",
+]
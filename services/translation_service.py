@@ -1,25 +1,52 @@
 """
 Translation Service Module
-Handles language detection and text translation using deep-translator library.
-This library is Python 3.13 compatible and doesn't have the cgi module dependency issue.
+Handles language detection and text translation. Translation runs on a
+pluggable backend chain (see translation_backends): Google Translate via
+deep-translator by default, or a local CTranslate2 model for supported pairs.
 """
 
-from deep_translator import GoogleTranslator
+import os
+
 from langdetect import detect, detect_langs, DetectorFactory
 
+from . import cpu_pool, tracing
+from .disk_cache import shared_cache
+from .rate_limiter import AdmissionTimeout, RateLimitedError
+from .sentence_cache import cache_key
+from .translation_backends import default_backends
+
+
+def _detect_langs(text):
+    # Module-level so it can run in the CPU pool; pool workers need the seed too.
+    DetectorFactory.seed = 0
+    return detect_langs(text)
+
+
+def _detect(text):
+    DetectorFactory.seed = 0
+    return detect(text)
+
 
 class TranslationService:
     """
     Service class for handling language detection and translation operations.
-    Uses deep-translator for translation (Python 3.13 compatible).
+    Translation is delegated to the first backend supporting the language pair.
     """
     
-    def __init__(self):
+    def __init__(self, cache=None, backends=None):
         """
         Initialize the TranslationService.
+
+        Args:
+            cache: Optional byte cache with get/set; defaults to the host-wide
+                cache when SHARED_CACHE_DIR is configured
+            backends: Optional ordered list of translation backends; defaults to
+                the chain selected by TRANSLATION_BACKEND
         """
         # Set seed for consistent language detection
         DetectorFactory.seed = 0
+        self.cache = cache if cache is not None else shared_cache()
+        self.backends = backends if backends is not None else default_backends()
     
     def detect_language(self, text):
         """
@@ -54,7 +81,7 @@ class TranslationService:
         # Use detect_langs to get confidence scores for better accuracy
         try:
             # Use langdetect with confidence scores
-            detected_languages = detect_langs(text_clean)
+            detected_languages = cpu_pool.run(_detect_langs, text_clean)
             
             if detected_languages:
                 # Get the most likely language
@@ -69,7 +96,7 @@ class TranslationService:
                 }
             else:
                 # Fallback to simple detect if detect_langs returns empty
-                detected_lang_code = detect(text_clean)
+                detected_lang_code = cpu_pool.run(_detect, text_clean)
                 return {
                     'code': detected_lang_code,
                     'name': self._get_language_name(detected_lang_code),
@@ -78,7 +105,7 @@ class TranslationService:
         except Exception as e:
             # If detect_langs fails, try simple detect as fallback
             try:
-                detected_lang_code = detect(text_clean)
+                detected_lang_code = cpu_pool.run(_detect, text_clean)
                 print(f"Warning: Using fallback detection method. Error: {e}")
                 return {
                     'code': detected_lang_code,
@@ -109,6 +136,10 @@ class TranslationService:
                 - 'source_lang': Source language code
                 - 'target_lang': Target language code
                 - 'original_text': Original input text
+
+        Raises:
+            AdmissionTimeout, RateLimitedError: When the backend is throttled;
+            other failures return the original text
         
         Example:
             >>> service = TranslationService()
@@ -129,9 +160,21 @@ class TranslationService:
                     'original_text': text
                 }
             
-            # Translate the text to target language using deep-translator
-            translator = GoogleTranslator(source=source_lang_code, target=target_lang_code)
-            translated_text = translator.translate(text)
+            key = cache_key('translation', text, source_lang_code, target_lang_code)
+            cached = self.cache.get(key) if self.cache is not None else None
+            if self.cache is not None:
+                tracing.note('translate', hit=cached is not None)
+            if cached is not None:
+                return {
+                    'translated_text': cached.decode('utf-8'),
+                    'source_lang': source_lang_code,
+                    'target_lang': target_lang_code,
+                    'original_text': text
+                }
+
+            translated_text = self._translate_with_backends([text], source_lang_code, target_lang_code)[0]
+            if self.cache is not None and translated_text:
+                self.cache.set(key, translated_text.encode('utf-8'))
             
             return {
                 'translated_text': translated_text,
@@ -139,6 +182,10 @@ class TranslationService:
                 'target_lang': target_lang_code,
                 'original_text': text
             }
+        except (AdmissionTimeout, RateLimitedError):
+            # Throttling is the caller's to report (503 + Retry-After); echoing
+            # the source text here would pass it off as a translation.
+            raise
         except Exception as e:
             # If translation fails, return original text
             print(f"Error translating text: {e}")
@@ -149,6 +196,113 @@ class TranslationService:
                 'original_text': text
             }
     
+    def translate_batch(self, texts, target_lang_code, source_lang_code=None):
+        """
+        Translates a list of segments, batching inference where the backend supports it.
+
+        Segments are grouped by language pair (detected per segment when
+        source_lang_code is None), sorted by length so each batch holds
+        similarly sized inputs, and split into batches under the
+        TRANSLATION_BATCH_TOKENS budget. Cached segments are not re-translated.
+
+        Args:
+            texts (list[str]): The segments to translate
+            target_lang_code (str): Target language code
+            source_lang_code (str, optional): Source language code for every segment
+
+        Returns:
+            list[str]: Translations in the same order as texts; a segment whose
+            batch fails is returned unchanged, as translate_text does
+
+        Raises:
+            AdmissionTimeout, RateLimitedError: When the backend is throttled
+        """
+        results = list(texts)
+        groups = {}
+        for index, text in enumerate(texts):
+            if not text or not text.strip():
+                continue
+            source = source_lang_code or self.detect_language(text)['code']
+            if source == target_lang_code:
+                continue
+
+            key = cache_key('translation', text, source, target_lang_code)
+            cached = self.cache.get(key) if self.cache is not None else None
+            if self.cache is not None:
+                tracing.note('translate', hit=cached is not None)
+            if cached is not None:
+                results[index] = cached.decode('utf-8')
+            else:
+                groups.setdefault(source, []).append(index)
+
+        for source, indices in groups.items():
+            for batch in self._token_batches(indices, texts, source, target_lang_code):
+                segments = [texts[index] for index in batch]
+                try:
+                    translated = self._translate_with_backends(segments, source, target_lang_code)
+                except (AdmissionTimeout, RateLimitedError):
+                    raise
+                except Exception as e:
+                    print(f"Error translating batch: {e}")
+                    continue
+                for index, text, translated_text in zip(batch, segments, translated):
+                    results[index] = translated_text
+                    if self.cache is not None and translated_text:
+                        self.cache.set(cache_key('translation', text, source, target_lang_code),
+                                       translated_text.encode('utf-8'))
+        return results
+
+    def supports_batching(self, source_lang_code, target_lang_code):
+        """True when the backend serving this pair translates batches in one inference call."""
+        backend = self._backend_for(source_lang_code, target_lang_code)
+        return backend is not None and backend.batched
+
+    def _backend_for(self, source_lang_code, target_lang_code):
+        return next((b for b in self.backends if b.supports(source_lang_code, target_lang_code)), None)
+
+    def _token_batches(self, indices, texts, source_lang_code, target_lang_code):
+        """Split segment indices, shortest first, into batches under the token budget."""
+        backend = self._backend_for(source_lang_code, target_lang_code)
+        if backend is None or not backend.batched:
+            # Looping backends gain nothing from batching; keep one call per segment.
+            return [[index] for index in indices]
+
+        budget = int(os.getenv('TRANSLATION_BATCH_TOKENS', '2048'))
+        batches, current, longest = [], [], 0
+        for index in sorted(indices, key=lambda i: len(texts[i])):
+            tokens = backend.count_tokens(texts[index])
+            longest = max(longest, tokens)
+            # Batches are padded to their longest segment.
+            if current and longest * (len(current) + 1) > budget:
+                batches.append(current)
+                current, longest = [], tokens
+            current.append(index)
+        if current:
+            batches.append(current)
+        return batches
+
+    def _translate_with_backends(self, texts, source_lang_code, target_lang_code):
+        """
+        Translate on the first backend supporting the pair, falling through to
+        the next one if a backend fails (throttling is surfaced, not masked).
+        """
+        candidates = [b for b in self.backends if b.supports(source_lang_code, target_lang_code)]
+        if not candidates:
+            raise ValueError(f"No translation backend supports {source_lang_code} -> {target_lang_code}")
+
+        for index, backend in enumerate(candidates):
+            try:
+                with tracing.span(f'translate:{backend.name}', segments=len(texts),
+                                  chars=sum(len(text) for text in texts),
+                                  source=source_lang_code, target=target_lang_code):
+                    return backend.translate_batch(texts, source_lang_code, target_lang_code)
+            except RateLimitedError:
+                raise
+            except Exception as e:
+                if index == len(candidates) - 1:
+                    raise
+                print(f"⚠️ {backend.name} translation failed ({e}); trying {candidates[index + 1].name}")
+    
     def _get_language_name(self, lang_code):
         """
         Converts language code to readable language name.
@@ -6,10 +6,21 @@ import os
 import shutil
 import subprocess
 import tempfile
+import threading
+from contextlib import nullcontext
 from typing import Any, Dict, Iterable, Optional, Set
 
 from gtts import gTTS
-from openai import OpenAI
+from openai import OpenAI, RateLimitError
+
+from . import timings
+from .audio_buffer import AudioBuffer
+from .audio_encoding import audio_duration
+from .piper_batching import PiperBatchScheduler, PiperVoiceModel, batching_available
+from .rate_limiter import AdmissionTimeout, RateLimitedError, get_limiter
+from .voice_registry import VoiceRegistry, split_voice_id
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 
 class BaseTTSProvider:
@@ -17,6 +28,8 @@ class BaseTTSProvider:
 
     engine_key: str = "base"
     output_extension: str = "mp3"
+    # Limiter the engine's calls are admitted through; cloud engines admit themselves.
+    limiter: Optional[str] = "local"
 
     def synthesize(
         self,
@@ -35,6 +48,7 @@ class OpenAITTS(BaseTTSProvider):
     """OpenAI powered TTS provider. # cloud option"""
 
     engine_key = "openai"
+    limiter = None
 
     def __init__(self, model: str = "tts-1", default_voice: str = "alloy", api_key: Optional[str] = None):
         self.model = model
@@ -62,27 +76,41 @@ class OpenAITTS(BaseTTSProvider):
             raise RuntimeError("OpenAI TTS is not configured. Please provide a valid OPENAI_API_KEY.")
 
         voice_to_use = voice or self.default_voice
+
+        def _create() -> AudioBuffer:
+            try:
+                # Use streaming response so we can persist and read bytes reliably
+                with self._client.audio.speech.with_streaming_response.create(
+                    model=self.model,
+                    voice=voice_to_use,
+                    input=text,
+                ) as response:
+                    if output_path:
+                        response.stream_to_file(output_path)
+                        audio = AudioBuffer.from_file(output_path)
+                    else:
+                        audio = AudioBuffer(response.read())
+                return audio
+            except RateLimitError as exc:
+                retry_after = exc.response.headers.get("retry-after") if exc.response is not None else None
+                try:
+                    retry_seconds = float(retry_after) if retry_after else None
+                except ValueError:
+                    retry_seconds = None
+                raise RateLimitedError(f"OpenAI TTS was throttled: {exc}", retry_seconds) from exc
+
         try:
-            # Use streaming response so we can persist and read bytes reliably
-            with self._client.audio.speech.with_streaming_response.create(
-                model=self.model,
-                voice=voice_to_use,
-                input=text,
-            ) as response:
-                audio_bytes: bytes
-                if output_path:
-                    response.stream_to_file(output_path)
-                    with open(output_path, "rb") as file_handle:
-                        audio_bytes = file_handle.read()
-                else:
-                    audio_bytes = response.read()
+            audio = get_limiter("openai").call(_create, chars=len(text))
 
             return {
-                "audio_bytes": audio_bytes,
+                "audio": audio,
                 "normalized_text": text,
                 "format": self.output_extension,
                 "voice_used": voice_to_use,
             }
+        except (AdmissionTimeout, RateLimitedError):
+            # Throttling is reported as 503 + Retry-After, not as a failure.
+            raise
         except Exception as exc:
             raise RuntimeError(f"OpenAI TTS synthesis failed: {exc}") from exc
 
@@ -99,19 +127,37 @@ class PiperTTS(BaseTTSProvider):
         binary: str = "piper",
         supported_languages: Optional[Iterable[str]] = None,
         models_by_language: Optional[Dict[str, str]] = None,
+        batch_scheduler: Optional[PiperBatchScheduler] = None,
+        registry: Optional[VoiceRegistry] = None,
     ):
         self.model_path = model_path
         self.binary = binary
+        # Prefer in-process micro-batching when its dependencies are installed.
+        if batch_scheduler is None and os.getenv("PIPER_BATCHING", "1").strip() != "0" and batching_available():
+            batch_scheduler = PiperBatchScheduler()
+        self._batch_scheduler = batch_scheduler
+        # Resident models when there is no registry to own them.
+        self._models: Dict[str, PiperVoiceModel] = {}
+        self._models_lock = threading.Lock()
+
+        self.registry = registry
+        if self.registry is not None and self._batch_scheduler is not None:
+            if self.registry.loader is None:
+                self.registry.loader = PiperVoiceModel
+            self.registry.on_evict.append(self._batch_scheduler.release)
+
         self.models_by_language: Dict[str, str] = {
             key.lower(): path for key, path in models_by_language.items()
         } if models_by_language else {}
 
         if supported_languages is not None:
             self.supported_languages: Set[str] = {lang.lower() for lang in supported_languages}
-        elif self.models_by_language:
-            # Derive supported languages from explicit model mapping
+        elif self.models_by_language or self.registry is not None:
+            # Derive supported languages from explicit model mapping and the registry
             self.supported_languages = {key.split("-")[0] for key in self.models_by_language.keys()}
             self.supported_languages.update(self.models_by_language.keys())
+            if self.registry is not None:
+                self.supported_languages.update(self.registry.supported_languages())
         else:
             self.supported_languages = set()
 
@@ -125,9 +171,6 @@ class PiperTTS(BaseTTSProvider):
         voice: Optional[str] = None,
         output_path: Optional[str] = None,
     ) -> Dict[str, Any]:
-        if not shutil.which(self.binary):
-            raise RuntimeError("Piper binary not found. Install Piper and ensure it is on the PATH.")
-
         normalized_lang_full = (lang or "").lower()
         normalized_lang = normalized_lang_full.split("-")[0]
 
@@ -137,14 +180,49 @@ class PiperTTS(BaseTTSProvider):
                 model_path = self.models_by_language[candidate]
                 break
 
+        if not model_path and self.registry is not None:
+            registered_voice = self.registry.resolve(normalized_lang_full, voice=voice)
+            if registered_voice is not None:
+                model_path = registered_voice.model_path
+
         if not model_path:
             model_path = self.model_path
 
         if not os.path.exists(model_path):
             raise RuntimeError(f"Piper model not found at '{model_path}'.")
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_output:
-            tmp_out_path = temp_output.name
+        speaker_id = self._resolve_speaker(model_path, voice, gender)
+
+        if self._batch_scheduler is not None:
+            # The registry keeps the model pinned (not evictable) until the batch is done.
+            if self.registry is not None:
+                model_scope = self.registry.use(model_path)
+            else:
+                model_scope = nullcontext(self._resident_model(model_path))
+            with model_scope as model:
+                audio_bytes = self._batch_scheduler.synthesize(model, text, speaker_id)
+                # Piper has no boundary events; weight words by their phoneme counts.
+                words = timings.estimate(
+                    text,
+                    int(audio_duration(audio_bytes, self.output_extension) * 1000),
+                    weights=model.word_phoneme_counts(text),
+                )
+            return {
+                "audio": AudioBuffer.write(audio_bytes, output_path) if output_path else AudioBuffer(audio_bytes),
+                "normalized_text": text,
+                "format": self.output_extension,
+                "words": words,
+            }
+
+        if not shutil.which(self.binary):
+            raise RuntimeError("Piper binary not found. Install Piper and ensure it is on the PATH.")
+
+        # Piper writes straight to the output file when there is one.
+        if output_path:
+            tmp_out_path = None
+        else:
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_output:
+                tmp_out_path = temp_output.name
 
         try:
             command = [
@@ -152,32 +230,52 @@ class PiperTTS(BaseTTSProvider):
                 "--model",
                 model_path,
                 "--output_file",
-                tmp_out_path,
+                output_path or tmp_out_path,
             ]
+            if speaker_id is not None:
+                command.extend(["--speaker", str(speaker_id)])
             subprocess.run(
                 command,
                 input=text.encode("utf-8"),
                 check=True,
             )
 
-            with open(tmp_out_path, "rb") as file_handle:
-                audio_bytes = file_handle.read()
-
             if output_path:
-                with open(output_path, "wb") as target:
-                    target.write(audio_bytes)
+                audio = AudioBuffer.from_file(output_path)
+            else:
+                with open(tmp_out_path, "rb") as file_handle:
+                    audio = AudioBuffer(file_handle.read())
 
             return {
-                "audio_bytes": audio_bytes,
+                "audio": audio,
                 "normalized_text": text,
                 "format": self.output_extension,
+                "words": timings.estimate(text, int(audio_duration(audio.view, self.output_extension) * 1000)),
             }
         except subprocess.CalledProcessError as exc:
             raise RuntimeError(f"Piper synthesis failed: {exc}") from exc
         finally:
-            if os.path.exists(tmp_out_path):
+            if tmp_out_path and os.path.exists(tmp_out_path):
                 os.remove(tmp_out_path)
 
+    def _resident_model(self, model_path: str) -> PiperVoiceModel:
+        """Load a model once and keep it, so its session and batch queue are reused."""
+        with self._models_lock:
+            model = self._models.get(model_path)
+            if model is None:
+                model = self._models[model_path] = PiperVoiceModel(model_path)
+            return model
+
+    def _resolve_speaker(self, model_path: str, voice: Optional[str], gender: Optional[str]) -> Optional[int]:
+        """Pick the speaker of a multi-speaker model from ``voice`` ("name:speaker") or gender."""
+        if self.registry is None:
+            return None
+        registered_voice = self.registry.voice_for_model(model_path)
+        if registered_voice is None:
+            return None
+        speaker = split_voice_id(voice)[1] if voice else None
+        return self.registry.resolve_speaker(registered_voice, speaker, gender)
+
 
 class IndicTTSProvider(BaseTTSProvider):
     """Wrapper around the IIT Madras Indic TTS models (expects external setup)."""
@@ -213,18 +311,17 @@ class IndicTTSProvider(BaseTTSProvider):
 
             if output_path:
                 tts.save(output_path)
-                with open(output_path, "rb") as file_handle:
-                    audio_bytes = file_handle.read()
+                audio = AudioBuffer.from_file(output_path)
             else:
                 with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as temp_file:
                     tts.save(temp_file.name)
                     temp_file.flush()
                     with open(temp_file.name, "rb") as file_handle:
-                        audio_bytes = file_handle.read()
+                        audio = AudioBuffer(file_handle.read())
                 os.remove(temp_file.name)
 
             return {
-                "audio_bytes": audio_bytes,
+                "audio": audio,
                 "normalized_text": text,
                 "format": "mp3",
             }
@@ -274,14 +371,15 @@ class CoquiTTSProvider(BaseTTSProvider):
 
         tts.tts_to_file(text=text, file_path=target_path)
 
-        with open(target_path, "rb") as file_handle:
-            audio_bytes = file_handle.read()
-
-        if not output_path and os.path.exists(target_path):
+        if output_path:
+            audio = AudioBuffer.from_file(output_path)
+        else:
+            with open(target_path, "rb") as file_handle:
+                audio = AudioBuffer(file_handle.read())
             os.remove(target_path)
 
         return {
-            "audio_bytes": audio_bytes,
+            "audio": audio,
             "normalized_text": text,
             "format": self.output_extension,
         }
@@ -290,12 +388,9 @@ class CoquiTTSProvider(BaseTTSProvider):
 DEFAULT_PROVIDERS = {
     "openai": OpenAITTS(),
     "piper": PiperTTS(
-        "voices/hi_IN-pratham-medium.onnx",
+        os.path.join(project_root, "voices", "hi_IN-pratham-medium.onnx"),
         binary=r"D:\tools\piper\piper.exe",
-        models_by_language={
-            "hi": "voices/hi_IN-pratham-medium.onnx",
-            "en": "voices/en_GB-southern_english_female-low.onnx",
-        },
+        registry=VoiceRegistry(os.path.join(project_root, "voices")),
     ),
     "indic": IndicTTSProvider("hi"),
     "coqui": CoquiTTSProvider("tts_models/multilingual/your_model_here"),
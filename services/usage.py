@@ -0,0 +1,361 @@
+"""Per-user usage accounting and daily quotas.
+
+Every request records the characters it translated, the characters it
+synthesized and the seconds of audio it produced. ``UsageMeter.record`` only
+adds to in-memory counters; a background thread flushes them to SQLite every
+``USAGE_FLUSH_SECONDS`` (and once more at exit), so accounting costs a dict
+update per request rather than a write transaction.
+
+Usage is bucketed per user and UTC day. ``UsageMeter.check`` compares what a
+user has used today (flushed totals, unflushed counters and amounts reserved
+by requests still in flight) plus what a request is about to use against the
+user's daily quota, and raises ``QuotaExceeded`` at admission so one heavy
+user cannot drain the shared provider quota. An admitted request's expected
+amounts are reserved in the same step, so concurrent requests cannot all pass
+on the same headroom; ``record`` settles the reservation with the actual
+amounts and ``release`` returns whatever was not used. Totals flushed by
+other worker processes are picked up when this process re-reads them, at
+most one flush interval later.
+
+Per-user limits live in the ``quotas`` table (``UsageMeter.set_quota``); a
+missing or NULL limit falls back to the environment default.
+
+Configuration (environment):
+    USAGE_DB                              SQLite file (default output/usage.sqlite3)
+    USAGE_FLUSH_SECONDS                   seconds between flushes (default 10)
+    QUOTA_TRANSLATED_CHARS_PER_DAY        default daily limit, 0 = unlimited (default 0)
+    QUOTA_SYNTHESIZED_CHARS_PER_DAY       default daily limit, 0 = unlimited (default 0)
+    QUOTA_AUDIO_SECONDS_PER_DAY           default daily limit, 0 = unlimited (default 0)
+"""
+
+from __future__ import annotations
+
+import atexit
+import calendar
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+METRICS = ("translated_chars", "synthesized_chars", "audio_seconds")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage (
+    user TEXT NOT NULL,
+    day TEXT NOT NULL,
+    translated_chars INTEGER NOT NULL DEFAULT 0,
+    synthesized_chars INTEGER NOT NULL DEFAULT 0,
+    audio_seconds REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (user, day)
+);
+CREATE TABLE IF NOT EXISTS quotas (
+    user TEXT PRIMARY KEY,
+    translated_chars INTEGER,
+    synthesized_chars INTEGER,
+    audio_seconds REAL
+);
+"""
+
+_UPSERT = """
+INSERT INTO usage (user, day, translated_chars, synthesized_chars, audio_seconds)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (user, day) DO UPDATE SET
+    translated_chars = translated_chars + excluded.translated_chars,
+    synthesized_chars = synthesized_chars + excluded.synthesized_chars,
+    audio_seconds = audio_seconds + excluded.audio_seconds
+"""
+
+# Users whose flushed totals and limits are kept in memory.
+_MAX_CACHED_USERS = 10_000
+
+
+class QuotaExceeded(RuntimeError):
+    """Raised at admission when a request would exceed the user's daily quota."""
+
+    def __init__(self, message: str, metric: str, retry_after: float):
+        super().__init__(message)
+        self.metric = metric
+        self.retry_after = retry_after
+
+
+class Reservation:
+    """Amounts held against a user's quota between admission and ``record``."""
+
+    __slots__ = ("key", "amounts")
+
+    def __init__(self, key: Tuple[str, str], amounts: Dict[str, float]):
+        self.key = key
+        self.amounts = amounts
+
+
+def _today() -> str:
+    return time.strftime("%Y-%m-%d", time.gmtime())
+
+
+def _seconds_until_reset() -> float:
+    now = time.time()
+    midnight = calendar.timegm(time.gmtime(now)[:3] + (0, 0, 0, 0, 0, 0))
+    return midnight + 86400 - now
+
+
+def _default_limits() -> Dict[str, float]:
+    return {
+        "translated_chars": float(os.getenv("QUOTA_TRANSLATED_CHARS_PER_DAY", "0")),
+        "synthesized_chars": float(os.getenv("QUOTA_SYNTHESIZED_CHARS_PER_DAY", "0")),
+        "audio_seconds": float(os.getenv("QUOTA_AUDIO_SECONDS_PER_DAY", "0")),
+    }
+
+
+class UsageMeter:
+    """In-memory usage counters with periodic SQLite persistence."""
+
+    def __init__(
+        self,
+        path: str,
+        flush_interval: Optional[float] = None,
+        default_limits: Optional[Dict[str, float]] = None,
+    ):
+        self.path = path
+        self.flush_interval = flush_interval or float(os.getenv("USAGE_FLUSH_SECONDS", "10"))
+        self.default_limits = default_limits if default_limits is not None else _default_limits()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._pending: Dict[Tuple[str, str], Dict[str, float]] = {}
+        # Counters being written by flush(), still counted until the write lands.
+        self._flushing: Dict[Tuple[str, str], Dict[str, float]] = {}
+        # Amounts admitted by check() and not yet recorded or released.
+        self._reserved: Dict[Tuple[str, str], Dict[str, float]] = {}
+        # Bumped whenever flushed totals change, so check() never pairs stale
+        # totals with counters that have already moved into them.
+        self._generation = 0
+        # (user, day) -> (loaded at, flushed totals); user -> (loaded at, limits)
+        self._flushed: Dict[Tuple[str, str], Tuple[float, Dict[str, float]]] = {}
+        self._limits: Dict[str, Tuple[float, Dict[str, float]]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._local = threading.local()
+        self._flusher: Optional[threading.Thread] = None
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread, reopened after a fork (gunicorn --preload).
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def record(self, user: str, reservation: Optional[Reservation] = None, **amounts: float) -> None:
+        """Add ``amounts`` (keyword per metric) to ``user``'s usage today.
+
+        With ``reservation``, the recorded amounts are taken out of what
+        ``check`` reserved; any remainder stays held until ``release``.
+        """
+        key = (user, _today())
+        with self._lock:
+            counters = self._pending.setdefault(key, dict.fromkeys(METRICS, 0.0))
+            for metric, amount in amounts.items():
+                if metric in counters and amount:
+                    counters[metric] += amount
+            if reservation is not None:
+                self._settle(reservation, amounts)
+            self._start_flusher()
+
+    def release(self, reservation: Optional[Reservation]) -> None:
+        """Return what is left of ``reservation``; safe to call more than once."""
+        if reservation is None:
+            return
+        with self._lock:
+            self._settle(reservation, reservation.amounts)
+
+    def _settle(self, reservation: Reservation, amounts: Dict[str, float]) -> None:
+        # Called with self._lock held.
+        reserved = self._reserved.get(reservation.key)
+        for metric, held in reservation.amounts.items():
+            taken = min(held, max(0.0, amounts.get(metric) or 0.0))
+            if not taken:
+                continue
+            reservation.amounts[metric] = held - taken
+            if reserved is not None:
+                reserved[metric] = max(0.0, reserved[metric] - taken)
+        if reserved is not None and not any(reserved.values()):
+            del self._reserved[reservation.key]
+
+    def usage(self, user: str) -> Dict[str, float]:
+        """Today's usage for ``user``, including counters not yet flushed."""
+        key = (user, _today())
+        totals = dict(self._flushed_totals(key))
+        with self._lock:
+            self._add_unflushed(key, totals)
+        return totals
+
+    def _add_unflushed(self, key: Tuple[str, str], totals: Dict[str, float], reserved: bool = False) -> None:
+        # Called with self._lock held.
+        sources = [self._pending.get(key), self._flushing.get(key)]
+        if reserved:
+            sources.append(self._reserved.get(key))
+        for counters in sources:
+            for metric, amount in (counters or {}).items():
+                totals[metric] += amount
+
+    def limits(self, user: str) -> Dict[str, float]:
+        """Daily limits for ``user``; 0 means unlimited."""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._limits.get(user)
+        if cached is not None and now - cached[0] < self.flush_interval:
+            return cached[1]
+
+        limits = dict(self.default_limits)
+        row = self._connection().execute(
+            "SELECT translated_chars, synthesized_chars, audio_seconds FROM quotas WHERE user = ?", (user,)
+        ).fetchone()
+        if row is not None:
+            limits.update({metric: value for metric, value in zip(METRICS, row) if value is not None})
+        with self._lock:
+            if len(self._limits) >= _MAX_CACHED_USERS:
+                self._limits.clear()
+            self._limits[user] = (now, limits)
+        return limits
+
+    def check(self, user: str, **amounts: float) -> Reservation:
+        """Reserve ``amounts`` for ``user``, or raise QuotaExceeded if they would pass a daily limit.
+
+        Metrics without an amount are still checked, so a user who has used
+        up a limit is rejected even when the request's share is unknown. The
+        returned reservation counts against later checks until it is passed
+        to ``record`` or ``release``.
+        """
+        key = (user, _today())
+        reservation = Reservation(key, {metric: float(amounts.get(metric) or 0) for metric in METRICS})
+        limits = self.limits(user)
+        if not any(limits.values()):
+            return reservation  # Unlimited: nothing to hold back.
+        while True:
+            generation = self._generation
+            flushed = self._flushed_totals(key)
+            with self._lock:
+                if generation != self._generation:
+                    continue  # A flush landed in between; re-read the totals.
+                used = dict(flushed)
+                self._add_unflushed(key, used, reserved=True)
+                for metric in METRICS:
+                    limit = limits.get(metric) or 0
+                    if not limit:
+                        continue
+                    amount = reservation.amounts[metric]
+                    if used[metric] + amount > limit if amount else used[metric] >= limit:
+                        raise QuotaExceeded(
+                            f"Daily {metric.replace('_', ' ')} quota of {limit:g} reached "
+                            f"({used[metric]:g} used).",
+                            metric,
+                            _seconds_until_reset(),
+                        )
+                reserved = self._reserved.setdefault(key, dict.fromkeys(METRICS, 0.0))
+                for metric, amount in reservation.amounts.items():
+                    reserved[metric] += amount
+                return reservation
+
+    def set_quota(self, user: str, **limits: Optional[float]) -> None:
+        """Set per-user daily limits; None restores the default for that metric."""
+        values = [limits.get(metric) for metric in METRICS]
+        self._connection().execute(
+            "INSERT OR REPLACE INTO quotas (user, translated_chars, synthesized_chars, audio_seconds) "
+            "VALUES (?, ?, ?, ?)",
+            (user, *values),
+        )
+        with self._lock:
+            self._limits.pop(user, None)
+
+    def flush(self) -> None:
+        """Write the pending counters to SQLite."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._flushing = pending
+            if not pending:
+                return
+            rows = [
+                (user, day, int(counters["translated_chars"]), int(counters["synthesized_chars"]),
+                 counters["audio_seconds"])
+                for (user, day), counters in pending.items()
+            ]
+            connection = self._connection()
+            try:
+                with connection:
+                    connection.execute("BEGIN")
+                    connection.executemany(_UPSERT, rows)
+            except sqlite3.DatabaseError as exc:
+                print(f"⚠️ Usage flush failed, keeping counters for the next attempt: {exc}")
+                self._restore(pending)
+                return
+            with self._lock:
+                self._flushing = {}
+                self._generation += 1
+                # Flushed totals changed underneath the cache.
+                for key in pending:
+                    self._flushed.pop(key, None)
+
+    def _restore(self, pending: Dict[Tuple[str, str], Dict[str, float]]) -> None:
+        with self._lock:
+            self._flushing = {}
+            for key, counters in pending.items():
+                current = self._pending.setdefault(key, dict.fromkeys(METRICS, 0.0))
+                for metric, amount in counters.items():
+                    current[metric] += amount
+
+    def _flushed_totals(self, key: Tuple[str, str]) -> Dict[str, float]:
+        now = time.monotonic()
+        with self._lock:
+            cached = self._flushed.get(key)
+        if cached is not None and now - cached[0] < self.flush_interval:
+            return cached[1]
+
+        row = self._connection().execute(
+            "SELECT translated_chars, synthesized_chars, audio_seconds FROM usage WHERE user = ? AND day = ?",
+            key,
+        ).fetchone()
+        totals = dict(zip(METRICS, row)) if row is not None else dict.fromkeys(METRICS, 0.0)
+        with self._lock:
+            if len(self._flushed) >= _MAX_CACHED_USERS:
+                self._flushed.clear()
+            self._flushed[key] = (now, totals)
+        return totals
+
+    def _start_flusher(self) -> None:
+        # Called with self._lock held.
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        self._flusher = threading.Thread(target=self._flush_loop, name="usage-flush", daemon=True)
+        self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as exc:  # pragma: no cover - keep the flusher alive
+                print(f"⚠️ Usage flush failed: {exc}")
+
+
+_meter: Optional[UsageMeter] = None
+_meter_lock = threading.Lock()
+
+
+def get_meter() -> UsageMeter:
+    """Return the process-wide meter, flushed once more at interpreter exit."""
+    global _meter
+    with _meter_lock:
+        if _meter is None:
+            _meter = UsageMeter(os.getenv("USAGE_DB") or os.path.join("output", "usage.sqlite3"))
+            atexit.register(_meter.flush)
+        return _meter
+
+
+__all__ = ["METRICS", "QuotaExceeded", "Reservation", "UsageMeter", "get_meter"]
@@ -0,0 +1,134 @@
+"""Immutable catalog of every voice the service can synthesize with.
+
+The catalog is built once at startup from ``LANGUAGE_CONFIG``/``AZURE_VOICES``,
+the Piper voice configs in ``voices/*.onnx.json`` and the OpenAI voices, and
+indexed by (language code, gender), locale and provider. The JSON responses
+for ``/api/languages`` and ``/api/voices`` are serialized once, together with
+their ETags, so serving them is a constant-time byte copy.
+"""
+
+from __future__ import annotations
+
+import glob
+import hashlib
+import json
+import os
+from types import MappingProxyType
+from typing import Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+
+class Voice(NamedTuple):
+    provider: str
+    name: str
+    language: str
+    locale: str
+    gender: Optional[str]
+    description: str = ""
+
+
+def discover_piper_voices(voice_dir: str) -> List[Dict[str, object]]:
+    """Read the metadata of every ``*.onnx.json`` Piper config in ``voice_dir``."""
+    voices = []
+    for config_path in sorted(glob.glob(os.path.join(voice_dir, "*.onnx.json"))):
+        try:
+            with open(config_path, "r", encoding="utf-8") as file_handle:
+                config = json.load(file_handle)
+        except (OSError, ValueError) as exc:
+            print(f"⚠️ Skipping unreadable Piper config '{config_path}': {exc}")
+            continue
+
+        language = config.get("language") or {}
+        audio = config.get("audio") or {}
+        code = language.get("code") or os.path.basename(config_path).split("-")[0]
+        voices.append({
+            "name": os.path.basename(config_path)[: -len(".onnx.json")],
+            "config_path": config_path,
+            "model_path": config_path[: -len(".json")],
+            "language": language.get("family") or code.split("_")[0],
+            "locale": code.replace("_", "-"),
+            "quality": audio.get("quality"),
+            "sample_rate": audio.get("sample_rate"),
+            "dataset": config.get("dataset"),
+            "num_speakers": int(config.get("num_speakers") or 1),
+            "speaker_id_map": config.get("speaker_id_map") or {},
+        })
+    return voices
+
+
+def _serialize(payload: object) -> Tuple[bytes, str]:
+    body = json.dumps(payload, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    return body, hashlib.sha1(body).hexdigest()
+
+
+class VoiceCatalog:
+    """Read-only voice index plus pre-serialized API responses."""
+
+    def __init__(
+        self,
+        language_config: Mapping[str, Mapping[str, object]],
+        openai_voices: Optional[Mapping[str, Mapping[str, str]]] = None,
+        piper_voice_dir: Optional[str] = "voices",
+    ):
+        voices: List[Voice] = []
+        languages_payload: Dict[str, Dict[str, object]] = {}
+
+        for code, config in language_config.items():
+            azure_voices = dict(config.get("voices") or {})
+            languages_payload[code] = {
+                "code": code,
+                "name": config["name"],
+                "voices": azure_voices,
+                "available_genders": [gender for gender, voice_name in azure_voices.items() if voice_name],
+            }
+            for gender, voice_name in azure_voices.items():
+                if voice_name:
+                    locale = "-".join(voice_name.split("-")[:2])
+                    voices.append(Voice("azure", voice_name, code, locale, gender.lower()))
+
+        for piper_voice in discover_piper_voices(piper_voice_dir) if piper_voice_dir else []:
+            voices.append(
+                Voice(
+                    "piper",
+                    str(piper_voice["name"]),
+                    str(piper_voice["language"]),
+                    str(piper_voice["locale"]),
+                    None,
+                    f"{piper_voice['dataset']} ({piper_voice['quality']}, {piper_voice['sample_rate']} Hz)",
+                )
+            )
+
+        for gender, named_voices in (openai_voices or {}).items():
+            for voice_name, description in named_voices.items():
+                # OpenAI voices are multilingual; '*' matches any language.
+                voices.append(Voice("openai", voice_name, "*", "*", gender.lower(), description))
+
+        self.voices: Tuple[Voice, ...] = tuple(voices)
+        self.by_language_gender = self._index(lambda voice: (voice.language, voice.gender))
+        self.by_locale = self._index(lambda voice: voice.locale)
+        self.by_provider = self._index(lambda voice: voice.provider)
+
+        self.languages_json, self.languages_etag = _serialize(languages_payload)
+        self.voices_json, self.voices_etag = _serialize({
+            "voices": [voice._asdict() for voice in self.voices],
+            "languages": languages_payload,
+        })
+
+    def _index(self, key_fn) -> Mapping[object, Tuple[Voice, ...]]:
+        index: Dict[object, List[Voice]] = {}
+        for voice in self.voices:
+            index.setdefault(key_fn(voice), []).append(voice)
+        return MappingProxyType({key: tuple(value) for key, value in index.items()})
+
+    def find(self, language: str, gender: Optional[str] = None, provider: Optional[str] = None) -> Tuple[Voice, ...]:
+        """Return voices for a language (and optional gender/provider)."""
+        gender_key = gender.lower() if gender else None
+        if gender_key is None:
+            candidates = tuple(voice for voice in self.voices if voice.language == language)
+        else:
+            candidates = self.by_language_gender.get((language, gender_key), ())
+        if provider:
+            candidates = tuple(voice for voice in candidates if voice.provider == provider)
+        return candidates
+
+
+__all__ = ["Voice", "VoiceCatalog", "discover_piper_voices"]
@@ -0,0 +1,261 @@
+"""Registry of Piper voice models with lazy loading under a memory budget.
+
+The registry scans a voice directory for ``*.onnx`` + ``*.onnx.json`` pairs
+and indexes them by language, locale, quality, speaker and sample rate from
+the config's ``language`` and ``audio`` blocks. Models are loaded on first use
+and the least recently used ones are evicted once the resident models exceed
+``PIPER_MEMORY_BUDGET_MB`` (default 1024), so one node can offer many voices.
+
+``acquire`` pins a model until the matching ``release``; pinned models are
+never evicted, so a batch in flight keeps its session even when the budget is
+exceeded for a while. A relative voice directory is resolved against the
+project root, not the working directory.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from .voice_catalog import discover_piper_voices
+
+# Preferred quality when a request does not ask for one.
+_QUALITY_ORDER = ("high", "medium", "low", "x_low")
+
+# An ONNX Runtime session holds the weights plus arena/working buffers;
+# budget each model at a multiple of its file size.
+_SESSION_OVERHEAD = 1.5
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class PiperVoice(NamedTuple):
+    name: str
+    model_path: str
+    config_path: str
+    language: str
+    locale: str
+    quality: Optional[str]
+    sample_rate: Optional[int]
+    num_speakers: int
+    speaker_id_map: Dict[str, int]
+
+
+class VoiceRegistry:
+    """Index of available Piper voices plus an LRU cache of loaded models."""
+
+    def __init__(
+        self,
+        voice_dir: str = "voices",
+        memory_budget_bytes: Optional[int] = None,
+        loader: Optional[Callable[[str], object]] = None,
+    ):
+        if memory_budget_bytes is None:
+            memory_budget_bytes = int(float(os.getenv("PIPER_MEMORY_BUDGET_MB", "1024")) * 1024 * 1024)
+
+        self.voice_dir = os.path.join(_PROJECT_ROOT, voice_dir)
+        self.memory_budget_bytes = memory_budget_bytes
+        self.loader = loader
+        self.on_evict: List[Callable[[str], None]] = []
+
+        self.voices: Dict[str, PiperVoice] = {}
+        self.by_language: Dict[str, List[PiperVoice]] = {}
+        self._loaded: "OrderedDict[str, object]" = OrderedDict()
+        self._resident: Dict[str, int] = {}
+        self._pins: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self.scan()
+
+    def scan(self) -> None:
+        """(Re)index the voice directory."""
+        voices: Dict[str, PiperVoice] = {}
+        by_language: Dict[str, List[PiperVoice]] = {}
+        for metadata in discover_piper_voices(self.voice_dir):
+            voice = PiperVoice(
+                name=str(metadata["name"]),
+                model_path=str(metadata["model_path"]),
+                config_path=str(metadata["config_path"]),
+                language=str(metadata["language"]).lower(),
+                locale=str(metadata["locale"]).lower(),
+                quality=metadata.get("quality"),
+                sample_rate=metadata.get("sample_rate"),
+                num_speakers=int(metadata.get("num_speakers") or 1),
+                speaker_id_map=dict(metadata.get("speaker_id_map") or {}),
+            )
+            voices[voice.name] = voice
+            for key in {voice.language, voice.locale}:
+                by_language.setdefault(key, []).append(voice)
+
+        for candidates in by_language.values():
+            candidates.sort(key=lambda voice: _quality_rank(voice.quality))
+
+        with self._lock:
+            self.voices = voices
+            self.by_language = by_language
+
+    def supported_languages(self) -> Set[str]:
+        return set(self.by_language.keys())
+
+    def resolve(self, lang: str, quality: Optional[str] = None, voice: Optional[str] = None) -> Optional[PiperVoice]:
+        """Pick a voice by exact name, else by locale/language and quality.
+
+        ``voice`` may carry a speaker suffix (``"<voice>:<speaker>"``).
+        """
+        voice_name = split_voice_id(voice)[0] if voice else None
+        if voice_name and voice_name in self.voices:
+            return self.voices[voice_name]
+
+        normalized = (lang or "").lower().replace("_", "-")
+        for key in (normalized, normalized.split("-")[0]):
+            candidates = self.by_language.get(key)
+            if not candidates:
+                continue
+            if quality:
+                for candidate in candidates:
+                    if candidate.quality == quality:
+                        return candidate
+            return candidates[0]
+        return None
+
+    def resolve_speaker(
+        self,
+        voice: PiperVoice,
+        speaker: Optional[str] = None,
+        gender: Optional[str] = None,
+    ) -> Optional[int]:
+        """Map a speaker name/id (or, failing that, a gender) to a speaker id.
+
+        Returns None for single-speaker models. Gender matching looks for the
+        gender in the speaker names, which is how multi-speaker Piper datasets
+        commonly label them; otherwise speaker 0 is used.
+        """
+        if voice.num_speakers <= 1:
+            return None
+        if speaker:
+            if speaker in voice.speaker_id_map:
+                return int(voice.speaker_id_map[speaker])
+            if speaker.isdigit() and int(speaker) < voice.num_speakers:
+                return int(speaker)
+        gender_key = (gender or "").lower()
+        if gender_key:
+            for name, speaker_id in voice.speaker_id_map.items():
+                tokens = re.split(r"[^a-z]+", name.lower())
+                if gender_key in tokens:
+                    return int(speaker_id)
+        return 0
+
+    def voice_for_model(self, model_path: str) -> Optional[PiperVoice]:
+        for voice in self.voices.values():
+            if os.path.normpath(voice.model_path) == os.path.normpath(model_path):
+                return voice
+        return None
+
+    def acquire(self, model_path: str) -> object:
+        """Return the loaded model for ``model_path`` (loading it on first use) and pin it.
+
+        Every ``acquire`` must be paired with ``release(model_path)`` once the
+        work using the model has completed; ``use`` does both.
+        """
+        if self.loader is None:
+            raise RuntimeError("VoiceRegistry has no model loader configured.")
+
+        with self._lock:
+            model = self._pin_loaded(model_path)
+            if model is not None:
+                return model
+            load_lock = self._load_locks.setdefault(model_path, threading.Lock())
+
+        # Load outside the registry lock so other voices stay available.
+        with load_lock:
+            with self._lock:
+                model = self._pin_loaded(model_path)
+                if model is not None:
+                    return model
+
+            model = self.loader(model_path)
+            footprint = int(_file_size(model_path) * _SESSION_OVERHEAD)
+
+            with self._lock:
+                self._loaded[model_path] = model
+                self._resident[model_path] = footprint
+                self._pins[model_path] = self._pins.get(model_path, 0) + 1
+                evicted = self._evict_over_budget()
+
+        self._notify_evicted(evicted)
+        return model
+
+    def release(self, model_path: str) -> None:
+        """Unpin a model taken with ``acquire``; it becomes evictable at zero pins."""
+        with self._lock:
+            pins = self._pins.get(model_path, 0) - 1
+            if pins > 0:
+                self._pins[model_path] = pins
+                return
+            self._pins.pop(model_path, None)
+            # Models kept over budget while pinned are dropped now.
+            evicted = self._evict_over_budget()
+        self._notify_evicted(evicted)
+
+    @contextmanager
+    def use(self, model_path: str) -> Iterator[object]:
+        """Hold the model for ``model_path`` pinned for the enclosed work."""
+        model = self.acquire(model_path)
+        try:
+            yield model
+        finally:
+            self.release(model_path)
+
+    def _pin_loaded(self, model_path: str) -> Optional[object]:
+        model = self._loaded.get(model_path)
+        if model is not None:
+            self._loaded.move_to_end(model_path)
+            self._pins[model_path] = self._pins.get(model_path, 0) + 1
+        return model
+
+    def _notify_evicted(self, evicted: List[str]) -> None:
+        for path in evicted:
+            for callback in self.on_evict:
+                callback(path)
+
+    def resident_bytes(self) -> int:
+        with self._lock:
+            return sum(self._resident.values())
+
+    def _evict_over_budget(self) -> List[str]:
+        """Drop least recently used unpinned models until the budget is met."""
+        evicted = []
+        resident = sum(self._resident.values())
+        for path in list(self._loaded):
+            if resident <= self.memory_budget_bytes:
+                break
+            if self._pins.get(path):
+                continue
+            del self._loaded[path]
+            resident -= self._resident.pop(path, 0)
+            evicted.append(path)
+        return evicted
+
+
+def split_voice_id(voice_id: str) -> Tuple[str, Optional[str]]:
+    """Split ``"<voice>:<speaker>"`` into its voice name and optional speaker."""
+    name, _, speaker = voice_id.partition(":")
+    return name, speaker or None
+
+
+def _quality_rank(quality: Optional[str]) -> int:
+    return _QUALITY_ORDER.index(quality) if quality in _QUALITY_ORDER else len(_QUALITY_ORDER)
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+__all__ = ["PiperVoice", "VoiceRegistry", "split_voice_id"]
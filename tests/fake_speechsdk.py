@@ -0,0 +1,150 @@
+"""In-process stand-in for ``azure.cognitiveservices.speech``.
+
+Implements only the surface ``services.azure_tts_service`` touches, so the
+streaming path can be exercised without credentials or network access.
+Each test sets ``scenario`` to describe what the "service" does: the clip it
+produces, how many starts are answered with HTTP 429, and after how many
+bytes a stream is cancelled.
+"""
+
+from __future__ import annotations
+
+import ctypes
+from typing import Callable, List, Optional
+
+
+class Scenario:
+    def __init__(self, audio: bytes = b"", throttled_starts: int = 0, cancel_after: Optional[int] = None):
+        self.audio = audio
+        self.throttled_starts = throttled_starts
+        self.cancel_after = cancel_after
+        self.synthesizers: List["SpeechSynthesizer"] = []
+
+
+scenario = Scenario()
+
+
+class ResultReason:
+    SynthesizingAudioStarted = "SynthesizingAudioStarted"
+    SynthesizingAudioCompleted = "SynthesizingAudioCompleted"
+    Canceled = "Canceled"
+
+
+class StreamStatus:
+    NoData = "NoData"
+    PartialData = "PartialData"
+    AllData = "AllData"
+    Canceled = "Canceled"
+
+
+class CancellationErrorCode:
+    NoError = "NoError"
+    TooManyRequests = "TooManyRequests"
+    ServiceError = "ServiceError"
+
+
+class SpeechSynthesisOutputFormat:
+    Audio16Khz32KBitrateMonoMp3 = "Audio16Khz32KBitrateMonoMp3"
+    Ogg16Khz16BitMonoOpus = "Ogg16Khz16BitMonoOpus"
+    Riff24Khz16BitMonoPcm = "Riff24Khz16BitMonoPcm"
+
+
+class SpeechSynthesisBoundaryType:
+    Word = "Word"
+    Punctuation = "Punctuation"
+
+
+class SpeechConfig:
+    def __init__(self, subscription: str, region: str):
+        self.subscription = subscription
+        self.region = region
+        self.speech_synthesis_voice_name = None
+        self.output_format = None
+
+    def set_speech_synthesis_output_format(self, output_format) -> None:
+        self.output_format = output_format
+
+
+class CancellationDetails:
+    def __init__(self, error_code: str, error_details: str):
+        self.error_code = error_code
+        self.error_details = error_details
+
+
+class _Signal:
+    def __init__(self):
+        self.callbacks: List[Callable] = []
+
+    def connect(self, callback: Callable) -> None:
+        self.callbacks.append(callback)
+
+
+class _Future:
+    def __init__(self, value):
+        self._value = value
+
+    def get(self):
+        return self._value
+
+
+class SpeechSynthesisResult:
+    def __init__(self, reason: str, audio_data: bytes = b"", cancellation_details=None):
+        self.reason = reason
+        self.audio_data = audio_data
+        self.cancellation_details = cancellation_details
+
+
+class SpeechSynthesizer:
+    def __init__(self, speech_config: SpeechConfig, audio_config=None):
+        self.speech_config = speech_config
+        self.synthesis_word_boundary = _Signal()
+        self.starts = 0
+        self.stopped = False
+        scenario.synthesizers.append(self)
+
+    def _throttled(self) -> Optional[SpeechSynthesisResult]:
+        self.starts += 1
+        if scenario.throttled_starts:
+            scenario.throttled_starts -= 1
+            return SpeechSynthesisResult(
+                ResultReason.Canceled,
+                cancellation_details=CancellationDetails(CancellationErrorCode.TooManyRequests, "HTTP 429"),
+            )
+        return None
+
+    def start_speaking_ssml_async(self, ssml: str) -> _Future:
+        result = self._throttled() or SpeechSynthesisResult(ResultReason.SynthesizingAudioStarted, scenario.audio)
+        return _Future(result)
+
+    def speak_ssml_async(self, ssml: str) -> _Future:
+        result = self._throttled() or SpeechSynthesisResult(ResultReason.SynthesizingAudioCompleted, scenario.audio)
+        return _Future(result)
+
+    def stop_speaking_async(self) -> _Future:
+        self.stopped = True
+        return _Future(None)
+
+
+class AudioDataStream:
+    def __init__(self, result: SpeechSynthesisResult):
+        self._audio = result.audio_data
+        self._position = 0
+        self.status = StreamStatus.PartialData
+        self.cancellation_details = None
+
+    def read_data(self, buffer: bytes) -> int:
+        """Copy the next bytes into ``buffer`` in place, as the SDK does through ctypes."""
+        end = len(self._audio)
+        if scenario.cancel_after is not None and self._position >= scenario.cancel_after:
+            self.status = StreamStatus.Canceled
+            self.cancellation_details = CancellationDetails(CancellationErrorCode.ServiceError, "connection reset")
+            return 0
+        if scenario.cancel_after is not None:
+            end = min(end, scenario.cancel_after)
+        chunk = self._audio[self._position:min(end, self._position + len(buffer))]
+        if not chunk:
+            self.status = StreamStatus.AllData
+            return 0
+        ctypes.memmove(ctypes.c_char_p(buffer), chunk, len(chunk))
+        self._position += len(chunk)
+        return len(chunk)
@@ -0,0 +1,73 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_state_dir = tempfile.TemporaryDirectory()
+os.environ.setdefault("USAGE_DB", os.path.join(_state_dir.name, "usage.sqlite3"))
+
+try:
+    import app as server
+except ImportError:  # Flask or a provider SDK is not installed
+    server = None
+
+if server is not None:
+    import openai
+
+    from services.tts_providers import OpenAITTS
+
+
+@unittest.skipIf(server is None, "the API's dependencies are not installed")
+class ThrottledProviderTest(unittest.TestCase):
+    def test_openai_429_is_a_503_with_retry_after(self):
+        provider = OpenAITTS(api_key="test")
+        throttled = openai.RateLimitError(
+            "slow down", response=mock.Mock(status_code=429, headers={"retry-after": "30"}), body=None
+        )
+        provider._client = mock.Mock()
+        provider._client.audio.speech.with_streaming_response.create.side_effect = throttled
+
+        with mock.patch.dict(server.speech_service.providers, {"openai": provider}):
+            response = server.app.test_client().post("/api/translate-and-speak", json={
+                "text": "Hello there, how are you today?",
+                "target_lang": "en",
+                "tts_engine": "openai",
+                "audio_format": "mp3",
+            })
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["Retry-After"], "30")
+
+
+
+@unittest.skipIf(server is None, "the API's dependencies are not installed")
+class RequestValidationTest(unittest.TestCase):
+    def test_json_that_is_not_an_object_gets_the_views_400(self):
+        response = server.app.test_client().post("/api/translate-and-speak", json=["hi"])
+        self.assertEqual(response.status_code, 400)
+
+    def test_empty_fan_out_is_rejected_not_expanded(self):
+        client = server.app.test_client()
+        for target_langs in ([], [" "], "hi"):
+            response = client.post("/api/translate-and-speak/multi", json={"text": "Namaste", "target_langs": target_langs})
+            self.assertEqual(response.status_code, 400, target_langs)
+
+
+@unittest.skipIf(server is None, "the API's dependencies are not installed")
+class PrefetchTest(unittest.TestCase):
+    def test_only_the_other_gender_is_queued(self):
+        prefetcher = mock.Mock(enabled=True, max_chars=2000, languages=0)
+        prefetcher.transitions.likely_next.return_value = []
+
+        with mock.patch.object(server, "prefetcher", prefetcher), server.app.test_request_context():
+            server._schedule_prefetch("Namaste.", "en", "hi", "Male", "+0st", "+0%", "mp3")
+
+        queued = [call.args[0][2] for call in prefetcher.submit.call_args_list]
+        self.assertEqual(queued, [server._resolve_azure_voice(server.LANGUAGE_CONFIG["hi"], "female")])
+
+
+if __name__ == "__main__":
+    unittest.main()
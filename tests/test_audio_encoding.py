@@ -0,0 +1,78 @@
+import os
+import struct
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.audio_encoding import _ogg_page, audio_duration, concat_ogg
+from services.sentence_cache import join_audio
+
+PRE_SKIP = 312
+# TOC byte for one 20 ms CELT frame (960 samples at 48 kHz).
+PACKET = bytes([19 << 3]) + b"\x55" * 40
+
+
+def _opus_stream(serial, packets_per_page, pages, trimmed=0):
+    head = b"OpusHead" + struct.pack("<BBHIhB", 1, 1, PRE_SKIP, 24000, 0, 0)
+    tags = b"OpusTags" + struct.pack("<I", 0) + struct.pack("<I", 0)
+    out = [
+        _ogg_page(0x02, 0, serial, 0, bytes([len(head)]), head),
+        _ogg_page(0, 0, serial, 1, bytes([len(tags)]), tags),
+    ]
+    granule = 0
+    for index in range(pages):
+        granule += 960 * packets_per_page
+        last = index == pages - 1
+        out.append(_ogg_page(
+            0x04 if last else 0,
+            granule - (trimmed if last else 0),
+            serial,
+            index + 2,
+            bytes([len(PACKET)] * packets_per_page),
+            PACKET * packets_per_page,
+        ))
+    return b"".join(out)
+
+
+def _pages(data):
+    pages, offset = [], 0
+    while offset < len(data):
+        flags, granule, serial, sequence, crc = struct.unpack_from("<BqIII", data, offset + 5)
+        count = data[offset + 26]
+        size = 27 + count + sum(data[offset + 27:offset + 27 + count])
+        page = data[offset:offset + size]
+        pages.append((flags, granule, serial, sequence, crc, page))
+        offset += size
+    return pages
+
+
+class ConcatOggTest(unittest.TestCase):
+    def test_segments_become_one_logical_stream(self):
+        first = _opus_stream(1111, 5, 2, trimmed=100)
+        second = _opus_stream(2222, 5, 3)
+        joined = join_audio([first, second], "ogg")
+
+        pages = _pages(joined)
+        self.assertEqual({serial for _, _, serial, _, _, _ in pages}, {1111})
+        self.assertEqual([sequence for _, _, _, sequence, _, _ in pages], list(range(len(pages))))
+        # Headers once, then 2 + 3 audio pages; only the final page ends the stream.
+        self.assertEqual(len(pages), 7)
+        self.assertEqual([flags & 0x04 for flags, _, _, _, _, _ in pages], [0] * 6 + [0x04])
+        # The inner clip ends at its full packet length, not its trimmed granule.
+        self.assertEqual([granule for _, granule, _, _, _, _ in pages][2:], [4800, 9600, 14400, 19200, 24000])
+        self.assertAlmostEqual(audio_duration(joined, "ogg"), 0.5)
+
+        for _, _, _, _, crc, page in pages:
+            rebuilt = _ogg_page(page[5], *struct.unpack_from("<qII", page, 6), page[27:27 + page[26]],
+                                page[27 + page[26]:])
+            self.assertEqual(struct.unpack_from("<I", rebuilt, 22)[0], crc)
+
+    def test_mismatched_segments_are_chained(self):
+        first = _opus_stream(1111, 5, 1)
+        vorbis = _ogg_page(0x02 | 0x04, 0, 3333, 0, bytes([7]), b"\x01vorbis")
+        self.assertEqual(concat_ogg([first, vorbis]), first + vorbis)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import io
+import os
+import sys
+import unittest
+import wave
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import audio_postprocess, timings
+from services.audio_postprocess import PostProcessSettings
+
+np = audio_postprocess.np
+
+
+def _tone(frequency, sample_rate, seconds=0.5):
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+    return (0.5 * np.sin(2 * np.pi * frequency * t))[:, None]
+
+
+def _peak_frequency(samples, sample_rate):
+    spectrum = np.abs(np.fft.rfft(samples[:, 0]))
+    return np.fft.rfftfreq(samples.shape[0], d=1.0 / sample_rate)[int(np.argmax(spectrum))]
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class ResampleTest(unittest.TestCase):
+    def test_in_band_tone_is_preserved(self):
+        resampled = audio_postprocess._resample(_tone(1000, 44100), 44100, 16000)
+
+        self.assertEqual(resampled.shape[0], 8000)
+        self.assertAlmostEqual(_peak_frequency(resampled, 16000), 1000, delta=5)
+        self.assertAlmostEqual(float(np.max(np.abs(resampled))), 0.5, delta=0.02)
+
+    def test_content_above_new_nyquist_is_removed_not_aliased(self):
+        # 10 kHz at 16 kHz would fold down to 6 kHz without band-limiting.
+        resampled = audio_postprocess._resample(_tone(10000, 44100), 44100, 16000)
+
+        self.assertLess(float(np.max(np.abs(resampled))), 1e-3)
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TrimOffsetTest(unittest.TestCase):
+    def test_process_wav_reports_the_trimmed_lead(self):
+        sample_rate = 16000
+        clip = np.concatenate([np.zeros((int(0.3 * sample_rate), 1)), _tone(440, sample_rate)])
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as writer:
+            writer.setnchannels(1)
+            writer.setsampwidth(2)
+            writer.setframerate(sample_rate)
+            writer.writeframes((clip * 32767).astype("<i2").tobytes())
+
+        settings = PostProcessSettings(target_lufs=None, sample_rate=None, trim_db=-50.0, fade_ms=0.0)
+        processed = audio_postprocess.process_wav(buffer.getvalue(), settings)
+
+        # One quiet 10 ms frame is kept ahead of the onset.
+        self.assertEqual(processed.trimmed_samples, int(0.29 * sample_rate))
+        self.assertEqual(processed.trimmed_ms, 290)
+        words = timings.shift([timings.WordTiming(0, 250, "um"), timings.WordTiming(300, 700, "hello")], -290)
+        self.assertEqual(words, [timings.WordTiming(0, 0, "um"), timings.WordTiming(10, 410, "hello")])
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class CompressedPassthroughTest(unittest.TestCase):
+    def test_compressed_clips_kept_in_their_format_skip_ffmpeg(self):
+        with mock.patch.dict(os.environ, {"AUDIO_POSTPROCESS": "1"}), \
+                mock.patch.object(audio_postprocess, "encode_audio", side_effect=lambda data, source, target: data) as encode:
+            os.environ.pop("AUDIO_POSTPROCESS_COMPRESSED", None)
+            self.assertFalse(audio_postprocess.postprocess_applies("mp3"))
+            self.assertTrue(audio_postprocess.postprocess_applies("wav"))
+            processed = audio_postprocess.postprocess_and_encode(b"ID3 mp3", "mp3", "mp3")
+
+            self.assertEqual(processed.audio, b"ID3 mp3")
+            encode.assert_called_once_with(b"ID3 mp3", "mp3", "mp3")
+
+            os.environ["AUDIO_POSTPROCESS_COMPRESSED"] = "1"
+            self.assertTrue(audio_postprocess.postprocess_applies("mp3"))
+
+
+class SettingsStageTest(unittest.TestCase):
+    def test_segment_and_edge_stages_split_the_chain(self):
+        settings = PostProcessSettings(target_lufs=-16.0, sample_rate=24000, trim_db=-50.0, fade_ms=10.0)
+
+        self.assertEqual(settings.segment(), PostProcessSettings(-16.0, 24000, None, 0.0))
+        self.assertEqual(settings.edges(), PostProcessSettings(None, None, -50.0, 10.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import importlib
+import os
+import sys
+import types
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tests import fake_speechsdk
+
+
+def _import_with_fake_sdk():
+    azure = types.ModuleType("azure")
+    cognitiveservices = types.ModuleType("azure.cognitiveservices")
+    azure.cognitiveservices = cognitiveservices
+    cognitiveservices.speech = fake_speechsdk
+    modules = {
+        "azure": azure,
+        "azure.cognitiveservices": cognitiveservices,
+        "azure.cognitiveservices.speech": fake_speechsdk,
+    }
+    with mock.patch.dict(sys.modules, modules):
+        sys.modules.pop("services.azure_tts_service", None)
+        # Not ``from services import ...``: that returns a module already imported with the real SDK.
+        azure_tts_service = importlib.import_module("services.azure_tts_service")
+    sys.modules.pop("services.azure_tts_service", None)
+    return azure_tts_service
+
+
+azure_tts_service = _import_with_fake_sdk()
+CHUNK = azure_tts_service._STREAM_READ_SIZE
+
+
+@mock.patch.dict(os.environ, {"AZURE_SPEECH_KEY": "key", "AZURE_SPEECH_REGION": "centralindia"})
+class StreamSpeechTest(unittest.TestCase):
+    def setUp(self):
+        self.audio = bytes(range(256)) * ((CHUNK * 5 // 2) // 256)
+        fake_speechsdk.scenario = fake_speechsdk.Scenario(audio=self.audio)
+        self.limiter = azure_tts_service.get_limiter("azure")
+
+    def _stream(self):
+        return azure_tts_service.stream_speech("Namaste", "hi-IN-SwaraNeural", "+0st", "+0%", audio_format="mp3")
+
+    def test_chunks_reassemble_the_clip(self):
+        with mock.patch.object(azure_tts_service.chunk_planner, "observe") as observe:
+            chunks = list(self._stream())
+
+        self.assertEqual([len(chunk) for chunk in chunks], [CHUNK, CHUNK, len(self.audio) - 2 * CHUNK])
+        self.assertEqual(b"".join(chunks), self.audio)
+        # Client pacing must not reach the latency model.
+        observe.assert_not_called()
+
+    def test_admission_is_held_until_the_stream_ends(self):
+        stream = self._stream()
+        next(stream)
+        self.assertEqual(self.limiter.scheduler.in_flight, 1)
+        list(stream)
+        self.assertEqual(self.limiter.scheduler.in_flight, 0)
+
+    def test_early_close_stops_synthesis_and_releases_admission(self):
+        stream = self._stream()
+        next(stream)
+        stream.close()
+
+        synthesizer = fake_speechsdk.scenario.synthesizers[-1]
+        self.assertTrue(synthesizer.stopped)
+        self.assertEqual(self.limiter.scheduler.in_flight, 0)
+
+    def test_cancellation_mid_stream_raises_after_delivered_chunks(self):
+        fake_speechsdk.scenario.cancel_after = CHUNK
+        stream = self._stream()
+
+        self.assertEqual(next(stream), self.audio[:CHUNK])
+        with self.assertRaisesRegex(RuntimeError, "cancelled mid-stream: connection reset"):
+            next(stream)
+        self.assertFalse(fake_speechsdk.scenario.synthesizers[-1].stopped)
+        self.assertEqual(self.limiter.scheduler.in_flight, 0)
+
+    def test_throttled_start_is_retried(self):
+        fake_speechsdk.scenario.throttled_starts = 1
+        with mock.patch.object(self.limiter, "_penalize"):
+            chunks = list(self._stream())
+
+        self.assertEqual(b"".join(chunks), self.audio)
+        self.assertEqual(fake_speechsdk.scenario.synthesizers[-1].starts, 2)
+
+
+class VoiceForGenderTest(unittest.TestCase):
+    def test_unexpected_gender_values_fall_back(self):
+        voices = azure_tts_service.AZURE_VOICES["Hindi"]
+        self.assertEqual(azure_tts_service.get_voice_for_gender("Hindi", " Male "), voices["male"])
+        for gender in (None, ["male"], {"male": 1}, 1, "robot"):
+            self.assertEqual(azure_tts_service.get_voice_for_gender("Hindi", gender), voices["female"])
+
+    def test_unknown_language_raises(self):
+        for language in ("Klingon", ["Hindi"]):
+            with self.assertRaises(KeyError):
+                azure_tts_service.get_voice_for_gender(language, "female")
+
+
+if __name__ == "__main__":
+    unittest.main()
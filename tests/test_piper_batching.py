@@ -0,0 +1,79 @@
+import os
+import sys
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import piper_batching, tts_providers
+from services.piper_batching import HOP_LENGTH, PiperBatchScheduler, trim_padding
+
+np = piper_batching.np
+
+
+class _StockModel:
+    """Stands in for a stock Piper export: audio output only, no lengths."""
+
+    model_path = "voices/stock.onnx"
+    reports_lengths = False
+
+    def __init__(self):
+        self.batches = []
+
+    def phoneme_ids(self, text):
+        return [ord(char) for char in text]
+
+    def infer_batch(self, id_sequences, speaker_ids=None):
+        self.batches.append(list(id_sequences))
+        return [bytes(sequence) for sequence in id_sequences]
+
+    def to_wav_bytes(self, samples):
+        return samples
+
+
+class SchedulerTest(unittest.TestCase):
+    def test_concurrent_requests_share_one_inference(self):
+        model = _StockModel()
+        scheduler = PiperBatchScheduler(window_ms=200, max_batch_size=2)
+        self.addCleanup(scheduler.release, model.model_path)
+        results = {}
+
+        threads = [
+            threading.Thread(target=lambda text=text: results.update({text: scheduler.synthesize(model, text)}))
+            for text in ("ab", "cde")
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(model.batches), 1)
+        self.assertEqual(sorted(map(len, model.batches[0])), [2, 3])
+        self.assertEqual(results, {"ab": b"ab", "cde": b"cde"})
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TrimPaddingTest(unittest.TestCase):
+    def test_padded_tail_is_cut_after_the_speech(self):
+        sample_rate = 22050
+        speech = 0.5 * np.sin(np.linspace(0, 400 * np.pi, 40 * HOP_LENGTH))
+        padding = np.full(60 * HOP_LENGTH, 1e-5)
+        trimmed = trim_padding(np.concatenate([speech, padding]), sample_rate)
+
+        tail = -(-int(sample_rate * 0.1) // HOP_LENGTH) * HOP_LENGTH
+        self.assertEqual(trimmed.size, speech.size + tail)
+
+
+class ResidentModelTest(unittest.TestCase):
+    def test_models_are_loaded_once_without_a_registry(self):
+        provider = tts_providers.PiperTTS("voices/stock.onnx", batch_scheduler=PiperBatchScheduler())
+        with mock.patch.object(tts_providers, "PiperVoiceModel") as loader:
+            first = provider._resident_model("voices/stock.onnx")
+            second = provider._resident_model("voices/stock.onnx")
+        loader.assert_called_once_with("voices/stock.onnx")
+        self.assertIs(first, second)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.sentence_cache import join_sentences, split_sentences
+
+
+class SplitSentencesTest(unittest.TestCase):
+    def test_abbreviations_do_not_end_sentences(self):
+        text = "Dr. Rao met Mr. Shah. They talked (e.g. about rain). डॉ. शर्मा आए। ठीक है।"
+        self.assertEqual(
+            split_sentences(text),
+            ["Dr. Rao met Mr. Shah.", "They talked (e.g. about rain).", "डॉ. शर्मा आए।", "ठीक है।"],
+        )
+
+    def test_line_breaks_end_sentences(self):
+        self.assertEqual(split_sentences("First line\nSecond. Third.\n\n"), ["First line", "Second.", "Third."])
+
+
+class JoinSentencesTest(unittest.TestCase):
+    def test_paragraph_breaks_of_the_source_are_kept(self):
+        source = "One. Two.\n\nThree.\nFour."
+        translated = ["Ek.", "Do.", "Teen.", "Char."]
+        self.assertEqual(join_sentences(translated, source), "Ek. Do.\n\nTeen.\nChar.")
+
+    def test_mismatched_counts_fall_back_to_spaces(self):
+        self.assertEqual(join_sentences(["a", "b"], "One.\nTwo.\nThree."), "a b")
+
+
+if __name__ == "__main__":
+    unittest.main()
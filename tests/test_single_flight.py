@@ -0,0 +1,52 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.single_flight import SingleFlight, fcntl
+
+
+@unittest.skipIf(fcntl is None, "cross-process coalescing needs fcntl")
+class SharedSingleFlightTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_workers_share_one_call_and_leave_no_result_behind(self):
+        # Separate instances stand in for separate workers: each goes through the file lock.
+        workers = [SingleFlight(lock_dir=self.tmp.name) for _ in range(4)]
+        calls = []
+        results = []
+
+        def render():
+            calls.append(1)
+            time.sleep(0.2)
+            return {"file_path": "output/clip.mp3"}
+
+        threads = [threading.Thread(target=lambda flight=flight: results.append(flight.do("key", render)))
+                   for flight in workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"file_path": "output/clip.mp3"}] * 4)
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ["key.lock", "key.users"])
+
+    def test_sweep_removes_idle_keys_only(self):
+        flight = SingleFlight(lock_dir=self.tmp.name)
+        flight.do("idle", lambda: 1)
+        users_path = os.path.join(self.tmp.name, "busy.users")
+        with open(users_path, "a+") as busy:
+            fcntl.flock(busy, fcntl.LOCK_SH)
+            self.assertEqual(flight.sweep(max_idle=0), 2)
+        self.assertEqual(os.listdir(self.tmp.name), ["busy.users"])
+
+
+if __name__ == "__main__":
+    unittest.main()
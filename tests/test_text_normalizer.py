@@ -0,0 +1,28 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.text_normalizer import normalize_for_speech, number_spelling_available
+
+
+@unittest.skipUnless(number_spelling_available(), "num2words is not installed")
+class SpellNumbersTest(unittest.TestCase):
+    def test_numbers_use_indian_grouping(self):
+        self.assertEqual(
+            normalize_for_speech("Pay ₹1,25,000, 12.5% off.", "en"),
+            "Pay one lakh, twenty-five thousand rupees, twelve point five percent off.",
+        )
+        self.assertEqual(normalize_for_speech("৫০০ টাকা", "bn"), "পাঁচশত টাকা")
+
+    def test_identifiers_stay_digits(self):
+        text = "Call 9876543210, room 007, v1.2."
+        self.assertEqual(normalize_for_speech(text, "en"), text)
+
+    def test_unsupported_languages_keep_digits(self):
+        self.assertEqual(normalize_for_speech("100 दें", "hi"), "100 दें")
+
+
+if __name__ == "__main__":
+    unittest.main()
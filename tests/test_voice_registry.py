@@ -0,0 +1,57 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.voice_registry import VoiceRegistry
+
+
+class VoiceRegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.paths = []
+        for name in ("a", "b", "c"):
+            path = os.path.join(self.tmp.name, f"{name}.onnx")
+            with open(path, "wb") as file_handle:
+                file_handle.write(b"\0" * 1000)
+            self.paths.append(path)
+        self.evicted = []
+        # Room for two models (1500 bytes each with session overhead).
+        self.registry = VoiceRegistry(self.tmp.name, memory_budget_bytes=3000, loader=lambda path: object())
+        self.registry.on_evict.append(self.evicted.append)
+
+    def test_least_recently_used_unpinned_model_is_evicted(self):
+        a, b, c = self.paths
+        for path in (a, b):
+            with self.registry.use(path):
+                pass
+        with self.registry.use(c):
+            pass
+        self.assertEqual(self.evicted, [a])
+        self.assertEqual(self.registry.resident_bytes(), 3000)
+
+    def test_pinned_models_survive_until_released(self):
+        a, b, c = self.paths
+        self.registry.acquire(a)
+        self.registry.acquire(b)
+        self.registry.acquire(c)
+        self.assertEqual(self.evicted, [])
+        self.assertEqual(self.registry.resident_bytes(), 4500)
+
+        self.registry.release(b)
+        self.assertEqual(self.evicted, [b])
+        self.registry.release(a)
+        self.registry.release(c)
+        self.assertEqual(self.evicted, [b])
+
+    def test_relative_voice_dir_is_resolved_against_project_root(self):
+        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        registry = VoiceRegistry("voices", loader=lambda path: object())
+        self.assertEqual(registry.voice_dir, os.path.join(project_root, "voices"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,10 +3,21 @@ Multilingual Text-to-Speech Translation Module
 This module provides functions for language detection, translation, and text-to-speech conversion.
 """
 
-from googletrans import Translator
 from gtts import gTTS
 import os
 
+from services.translation_service import TranslationService
+
+_translation_service = None
+
+
+def _get_translation_service():
+    """Create the shared TranslationService (and its backends) on first use."""
+    global _translation_service
+    if _translation_service is None:
+        _translation_service = TranslationService()
+    return _translation_service
+
 
 def detect_language(text):
     """
@@ -18,10 +29,8 @@ def detect_language(text):
     Returns:
         str: Language code (e.g., 'en', 'es', 'hi', 'te')
     """
-    translator = Translator()
     try:
-        detected = translator.detect(text)
-        return detected.lang
+        return _get_translation_service().detect_language(text)['code']
     except Exception as e:
         print(f"Error detecting language: {e}")
         return 'en'  # Default to English if detection fails
@@ -38,10 +47,8 @@ def translate_text(text, target_lang):
     Returns:
         str: Translated text
     """
-    translator = Translator()
     try:
-        translated = translator.translate(text, dest=target_lang)
-        return translated.text
+        return _get_translation_service().translate_text(text, target_lang)['translated_text']
     except Exception as e:
         print(f"Error translating text: {e}")
         return text  # Return original text if translation fails